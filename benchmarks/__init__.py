@@ -0,0 +1,89 @@
+"""
+Benchmarks for the FinWell API.
+
+Each module is a standalone script, e.g. ``python -m benchmarks.pagination``. They run
+against a throwaway test database (in-memory SQLite by default) created from the
+project settings, so they never touch ``db.sqlite3``.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finwell_api.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """Create a fresh test database for the duration of a benchmark run."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def time_calls(func, repeat):
+    """Call ``func`` ``repeat`` times and return the per-call durations in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def summarize(durations):
+    ordered = sorted(durations)
+    return {
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+    }
+
+
+def count_queries(func):
+    """Run ``func`` once and return how many SQL queries it executed."""
+    from django.db import connection
+
+    executed = []
+
+    def counter(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        func()
+    return len(executed)
+
+
+def compare(old, new):
+    """Rows of ``(name, old_p50, new_p50, change_percent, old_queries, new_queries)`` for two result files."""
+    rows = []
+    for name, result in new['results'].items():
+        before = old['results'].get(name)
+        if before is None:
+            rows.append((name, None, result['p50_ms'], None, None, result['queries']))
+            continue
+        change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else None
+        rows.append((name, before['p50_ms'], result['p50_ms'], change, before['queries'], result['queries']))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'endpoint':<24} {'old p50':>10} {'new p50':>10} {'change':>8} {'queries':>9}"]
+    for name, old_p50, new_p50, change, old_queries, new_queries in rows:
+        old_text = f'{old_p50:10.2f}' if old_p50 is not None else f"{'-':>10}"
+        change_text = f'{change:+7.1f}%' if change is not None else f"{'-':>8}"
+        queries = f'{old_queries}->{new_queries}' if old_queries is not None else f'{new_queries}'
+        lines.append(f'{name:<24} {old_text} {new_p50:10.2f} {change_text} {queries:>9}')
+    return '\n'.join(lines)
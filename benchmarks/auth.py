@@ -0,0 +1,53 @@
+"""
+Per-request cost of JWT authentication, with and without the user cache.
+
+    python -m benchmarks.auth --repeat 500
+
+Sends real ``Authorization: Bearer`` requests to GET /api/profile/, a cheap endpoint
+whose cost is dominated by authentication, once with simplejwt's ``JWTAuthentication``
+and once with ``CachedJWTAuthentication``. The cached run should save one query per
+request after the first.
+"""
+import argparse
+
+from benchmarks import benchmark_database, count_queries, setup_django, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIClient
+    from rest_framework.views import APIView
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import AccessToken
+    from users.authentication import CachedJWTAuthentication, user_cache
+
+    results = {}
+    with benchmark_database():
+        user = User.objects.create_user(username='bench', password='bench-password')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        url = '/api/profile/'
+
+        original = APIView.authentication_classes
+        try:
+            for name, authentication in (('jwt', JWTAuthentication), ('cached_jwt', CachedJWTAuthentication)):
+                APIView.authentication_classes = [authentication]
+                user_cache.clear()
+                client.get(url)
+                queries = count_queries(lambda: client.get(url))
+                results[name] = {**summarize(time_calls(lambda: client.get(url), args.repeat)), 'queries': queries}
+        finally:
+            APIView.authentication_classes = original
+
+    print(f"GET {url} repeat={args.repeat}")
+    for name, stats in results.items():
+        print(f"{name:>10}: p50={stats['p50_ms']:8.3f} ms  p95={stats['p95_ms']:8.3f} ms  queries={stats['queries']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""
+Compare two endpoint benchmark result files.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+from benchmarks import compare, format_comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('old')
+    parser.add_argument('new')
+    args = parser.parse_args()
+    with open(args.old) as old, open(args.new) as new:
+        print(format_comparison(compare(json.load(old), json.load(new))))
+
+
+if __name__ == '__main__':
+    main()
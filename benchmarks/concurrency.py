@@ -0,0 +1,145 @@
+"""
+Throughput under concurrent reads and writes.
+
+    python -m benchmarks.concurrency --workers 8 --requests 200
+    DATABASE_ENGINE=postgresql DATABASE_NAME=finwell python -m benchmarks.concurrency
+
+Every worker thread has its own user and database connection. It sends a mix of
+POST /api/transactions/ and GET /api/transactions/ calls, ``--write-ratio`` of them
+writes. On SQLite the run is repeated with the untuned defaults (rollback journal,
+deferred transactions, no PRAGMAs) against the tuned profile from ``utils.database``.
+SQLite uses a temporary database file, because an in-memory database would hide the
+writer lock. PostgreSQL runs once with the profile from the environment.
+"""
+import argparse
+import copy
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date
+
+from benchmarks import benchmark_database, setup_django, summarize
+
+UNTUNED_PRAGMAS = {'journal_mode': 'DELETE'}
+
+
+def worker(user, category, requests, write_ratio, seed, barrier, results):
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    rng = random.Random(seed)
+    durations, errors = [], 0
+    barrier.wait()
+    try:
+        for number in range(requests):
+            start = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    response = client.post('/api/transactions/', {
+                        'category_id': category.id,
+                        'amount': f'{rng.randint(100, 20000) / 100:.2f}',
+                        'date': date(2025, rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+                        'description': f'bench {number}',
+                    }, format='json')
+                else:
+                    response = client.get('/api/transactions/', {'page_size': 20})
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                # "database is locked" surfaces as an OperationalError out of the view
+                errors += 1
+            durations.append((time.perf_counter() - start) * 1000)
+    finally:
+        connection.close()
+    results.append((durations, errors))
+
+
+def run(profile, args):
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from categories.models import Category
+
+    results = []
+    with benchmark_database():
+        users = []
+        for index in range(args.workers):
+            user = User.objects.create_user(username=f'bench{index}', password='bench-password')
+            users.append((user, Category.objects.create(user=user, name='Food', type='expense')))
+        barrier = threading.Barrier(args.workers)
+        threads = [
+            threading.Thread(target=worker, args=(user, category, args.requests, args.write_ratio,
+                                                   args.seed + index, barrier, results))
+            for index, (user, category) in enumerate(users)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        journal = None
+        if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+            from django.db import connection
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal = cursor.fetchone()[0]
+
+    durations = [value for worker_durations, _ in results for value in worker_durations]
+    return {
+        'profile': profile,
+        'journal': journal,
+        'requests': len(durations),
+        'errors': sum(errors for _, errors in results),
+        'throughput': len(durations) / elapsed,
+        **summarize(durations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='requests per worker')
+    parser.add_argument('--write-ratio', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connections
+    from django.test.utils import override_settings
+
+    database = settings.DATABASES['default']
+    profiles = ['environment']
+    if database['ENGINE'].endswith('sqlite3'):
+        profiles = ['untuned', 'tuned']
+        database.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.mkdtemp(), 'finwell-bench.sqlite3')
+
+    original = copy.deepcopy(database)
+    summaries = []
+    for profile in profiles:
+        database.clear()
+        database.update(copy.deepcopy(original))
+        overrides = {}
+        if profile == 'untuned':
+            database['OPTIONS'] = {}
+            overrides['SQLITE_PRAGMAS'] = UNTUNED_PRAGMAS
+        # Drop the main-thread connection so the next one is built from this profile
+        connections['default'].close()
+        del connections['default']
+        with override_settings(**overrides):
+            summaries.append(run(profile, args))
+
+    print(f"{database['ENGINE'].rsplit('.', 1)[-1]} workers={args.workers} "
+          f"requests/worker={args.requests} write_ratio={args.write_ratio}")
+    for summary in summaries:
+        journal = f" journal={summary['journal']}" if summary['journal'] else ''
+        print(f"{summary['profile']:>11}: {summary['throughput']:8.1f} req/s  p50={summary['p50_ms']:8.2f} ms  "
+              f"p95={summary['p95_ms']:8.2f} ms  errors={summary['errors']}/{summary['requests']}{journal}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Seeded synthetic data for benchmarks.
+
+    generate(users=10, transactions=1000000)
+
+Creates users, an income and several expense categories per user, monthly budgets for
+the expense categories and ``transactions`` rows spread evenly over the users and the
+last ``months`` months, all through ``bulk_create``. The spend rollup is rebuilt at the
+end. The same seed always produces the same data.
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+EXPENSE_CATEGORIES = ['Food', 'Rent', 'Transport', 'Utilities', 'Health', 'Entertainment', 'Shopping', 'Travel']
+INCOME_CATEGORIES = ['Salary', 'Freelance']
+
+
+@dataclass
+class Dataset:
+    users: list
+    categories: int
+    budgets: int
+    transactions: int
+    start: date
+    end: date
+
+    @property
+    def user(self):
+        """The user benchmarks act as"""
+        return self.users[0]
+
+
+def month_starts(end, months):
+    year, month = end.year, end.month
+    starts = []
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def generate(users=10, transactions=100000, months=24, expense_categories=6, end=None, seed=42, batch_size=10000):
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from budgets.models import Budget
+    from categories.models import Category
+    from transactions.models import SpendRollup, Transaction
+
+    rng = random.Random(seed)
+    end = end or date.today()
+    periods = month_starts(end, months)
+    start = periods[0]
+    span = (end - start).days
+
+    password = make_password('bench')
+    User.objects.bulk_create([
+        User(username=f'bench{index}', password=password, email=f'bench{index}@example.com')
+        for index in range(users)
+    ], batch_size=batch_size)
+    user_list = list(User.objects.filter(username__startswith='bench').order_by('id'))
+
+    categories = Category.objects.bulk_create([
+        Category(user=user, name=name, type=kind)
+        for user in user_list
+        for name, kind in [(name, 'expense') for name in EXPENSE_CATEGORIES[:expense_categories]]
+        + [(name, 'income') for name in INCOME_CATEGORIES]
+    ], batch_size=batch_size)
+    expenses, incomes = {}, {}
+    for category in categories:
+        (expenses if category.type == 'expense' else incomes).setdefault(category.user_id, []).append(category)
+
+    budgets = 0
+    batch = []
+    for user in user_list:
+        for category in expenses[user.id]:
+            amount = Decimal(rng.randint(100, 2000))
+            for period in periods:
+                batch.append(Budget(user=user, category=category, amount=amount, period=period.strftime('%Y-%m')))
+        if len(batch) >= batch_size:
+            Budget.objects.bulk_create(batch)
+            budgets += len(batch)
+            batch = []
+    Budget.objects.bulk_create(batch)
+    budgets += len(batch)
+
+    batch = []
+    for index in range(transactions):
+        user = user_list[index % users]
+        # Roughly one income row for every twenty expenses
+        pool = incomes[user.id] if rng.random() < 0.05 else expenses[user.id]
+        amount = Decimal(rng.randint(100, 50000)) / 100
+        batch.append(Transaction(
+            user=user,
+            category=rng.choice(pool),
+            amount=amount,
+            currency='USD',
+            home_amount=amount,
+            date=start + timedelta(days=rng.randint(0, span)),
+            description=f'Synthetic {index}'
+        ))
+        if len(batch) >= batch_size:
+            Transaction.objects.bulk_create(batch)
+            batch = []
+    Transaction.objects.bulk_create(batch)
+
+    # bulk_create skips Transaction.save(), so the rollup is rebuilt in one pass
+    SpendRollup.objects.rebuild()
+    return Dataset(
+        users=user_list,
+        categories=len(categories),
+        budgets=budgets,
+        transactions=transactions,
+        start=start,
+        end=end
+    )
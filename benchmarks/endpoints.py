@@ -0,0 +1,153 @@
+"""
+Latency and query counts for every API endpoint.
+
+    python -m benchmarks.endpoints --rows 100000 --output results.json
+    python -m benchmarks.endpoints --rows 100000 --compare results.json
+
+Seeds a synthetic dataset (see ``benchmarks.data``), then calls each endpoint through the
+Django test client as the first generated user. It records p50/p95/mean latency and the
+number of SQL queries per call. The report cache is cleared before every call unless
+``--warm-cache`` is given. Currency conversion uses a static rate table, so no network
+is involved. Results are written as JSON, and ``--compare`` prints the change against an
+earlier file, e.g. one produced on another commit.
+"""
+import argparse
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from benchmarks import (
+    benchmark_database, compare, count_queries, format_comparison, setup_django, summarize, time_calls
+)
+
+STATIC_RATES = {
+    'PROVIDER': 'utils.rates.StaticRateProvider',
+    'OPTIONS': {'rates': {'EUR': '0.92', 'GBP': '0.79', 'KES': '129.5', 'JPY': '149.2'}, 'base': 'USD'},
+    'BASE_CURRENCY': 'USD',
+    'TTL': 3600,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def endpoint_cases(dataset):
+    from budgets.models import Budget
+    from categories.models import Category
+    from transactions.models import Transaction
+
+    user = dataset.user
+    transaction = Transaction.objects.filter(user=user).order_by('-date', '-id').first()
+    budget = Budget.objects.filter(user=user).order_by('-period').first()
+    category = Category.objects.filter(user=user, type='expense').order_by('id').first()
+    last_month = dataset.end.replace(day=1)
+    year = {'start_date': f'{dataset.end.year - 1}-01-01', 'end_date': f'{dataset.end.year - 1}-12-31'}
+
+    return {
+        'transactions_list': ('get', '/api/transactions/', {}),
+        'transactions_list_500': ('get', '/api/transactions/', {'page_size': 500}),
+        'transaction_detail': ('get', f'/api/transactions/{transaction.id}/', {}),
+        'transaction_create': ('post', '/api/transactions/', {
+            'category_id': category.id, 'amount': '12.50', 'date': dataset.end.isoformat()
+        }),
+        'transactions_export': ('get', '/api/transactions/export/', {
+            'start_date': last_month.isoformat(), 'end_date': dataset.end.isoformat()
+        }),
+        'budgets_list': ('get', '/api/budgets/', {}),
+        'budget_detail': ('get', f'/api/budgets/{budget.id}/', {}),
+        'categories_list': ('get', '/api/categories/', {}),
+        'report_summary': ('get', '/api/reports/summary/', {}),
+        'report_summary_month': ('get', '/api/reports/summary/', {
+            'month': dataset.end.month, 'year': dataset.end.year
+        }),
+        'report_summary_range': ('get', '/api/reports/summary/', year),
+        'report_trends_month': ('get', '/api/reports/trends/', {**year, 'interval': 'month'}),
+        'report_trends_week': ('get', '/api/reports/trends/', {**year, 'interval': 'week'}),
+        'report_cash_flow': ('get', '/api/reports/cash-flow/', {}),
+        'health_score': ('get', '/api/reports/health-score/', {}),
+        'convert': ('get', '/api/convert/', {'from': 'EUR', 'to': 'KES', 'amount': '125.50'}),
+    }
+
+
+def run_case(client, method, url, params, warm_cache):
+    from django.core.cache import cache
+
+    def call():
+        if not warm_cache:
+            cache.clear()
+        response = getattr(client, method)(url, params)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method.upper()} {url} returned {response.status_code}: {response.content[:200]}')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help='Transactions to generate (1k to 10M)')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--only', action='append', help='Only run this endpoint case (repeatable)')
+    parser.add_argument('--warm-cache', action='store_true', help='Keep cached report results between calls')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--compare', help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+    from benchmarks.data import generate
+
+    with benchmark_database(), override_settings(EXCHANGE_RATES=STATIC_RATES):
+        dataset = generate(users=args.users, transactions=args.rows, months=args.months, seed=args.seed)
+        client = APIClient()
+        client.force_authenticate(user=dataset.user)
+
+        results = {}
+        for name, (method, url, params) in endpoint_cases(dataset).items():
+            if args.only and name not in args.only:
+                continue
+            call = run_case(client, method, url, params, args.warm_cache)
+            call()  # warm up connections, imports and the rate table
+            queries = count_queries(call)
+            results[name] = {**summarize(time_calls(call, args.repeat)), 'queries': queries}
+            print(f"{name:<24} p50={results[name]['p50_ms']:9.2f} ms  p95={results[name]['p95_ms']:9.2f} ms  "
+                  f"queries={queries}")
+
+    output = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'rows': args.rows,
+            'users': args.users,
+            'months': args.months,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'warm_cache': args.warm_cache,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(output, handle, indent=2)
+    if args.compare:
+        with open(args.compare) as handle:
+            print()
+            print(format_comparison(compare(json.load(handle), output)))
+
+
+if __name__ == '__main__':
+    main()
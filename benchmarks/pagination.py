@@ -0,0 +1,66 @@
+"""
+Keyset vs offset pagination on GET /api/transactions/.
+
+    python -m benchmarks.pagination --rows 200000
+
+Times the first page and a page near the end of the history with both strategies.
+Offset pagination has to walk past every skipped row, keyset pagination seeks straight
+to the cursor position, so its deep page should cost about the same as the first one.
+"""
+import argparse
+import base64
+import json
+
+from benchmarks import benchmark_database, setup_django, summarize, time_calls
+
+
+def keyset_cursor(txn, page_size):
+    payload = json.dumps({'p': [txn.date.isoformat(), txn.id], 'r': 0}, separators=(',', ':'))
+    return {'cursor': base64.urlsafe_b64encode(payload.encode()).decode(), 'page_size': page_size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.pagination import LimitOffsetPagination
+    from benchmarks.data import generate
+    from rest_framework.test import APIClient
+    from transactions.models import Transaction
+    from transactions.views import TransactionListCreateView
+
+    with benchmark_database():
+        user = generate(users=1, transactions=args.rows, months=120).user
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = '/api/transactions/'
+        deep_offset = max(0, args.rows - 2 * args.page_size)
+        anchor = Transaction.objects.filter(user=user).order_by('-date', '-id')[deep_offset]
+
+        results = {
+            'keyset_first': time_calls(lambda: client.get(url, {'page_size': args.page_size}), args.repeat),
+            'keyset_deep': time_calls(lambda: client.get(url, keyset_cursor(anchor, args.page_size)), args.repeat),
+        }
+
+        original = TransactionListCreateView.pagination_class
+        TransactionListCreateView.pagination_class = LimitOffsetPagination
+        try:
+            results['offset_first'] = time_calls(
+                lambda: client.get(url, {'limit': args.page_size, 'offset': 0}), args.repeat)
+            results['offset_deep'] = time_calls(
+                lambda: client.get(url, {'limit': args.page_size, 'offset': deep_offset}), args.repeat)
+        finally:
+            TransactionListCreateView.pagination_class = original
+
+    print(f"rows={args.rows} page_size={args.page_size} deep_offset={deep_offset}")
+    for name, durations in results.items():
+        stats = summarize(durations)
+        print(f"{name:>13}: p50={stats['p50_ms']:9.2f} ms  p95={stats['p95_ms']:9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
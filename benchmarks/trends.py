@@ -0,0 +1,58 @@
+"""
+Spending trends endpoint vs one summary request per month.
+
+    python -m benchmarks.trends --rows 1000000
+
+Times GET /api/reports/trends/ for a 12-month monthly chart, weekly and daily charts over
+the same year, and the old client-side approach of calling /api/reports/summary/ once
+per month. The report cache is cleared before every request so each call hits the database.
+"""
+import argparse
+
+from benchmarks import benchmark_database, count_queries, setup_django, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from rest_framework.test import APIClient
+    from benchmarks.data import generate
+
+    def uncached(url, params=None):
+        cache.clear()
+        response = client.get(url, params)
+        assert response.status_code == 200, response.content
+        return response
+
+    def summary_per_month():
+        for month in range(1, 13):
+            uncached('/api/reports/summary/', {'start_date': f'2023-{month:02d}-01', 'end_date': f'2023-{month:02d}-28'})
+
+    with benchmark_database():
+        user = generate(users=1, transactions=args.rows, months=120).user
+        client = APIClient()
+        client.force_authenticate(user=user)
+        year = {'start_date': '2023-01-01', 'end_date': '2023-12-31'}
+        cases = {
+            'trends_month': lambda: uncached('/api/reports/trends/', {**year, 'interval': 'month'}),
+            'trends_week': lambda: uncached('/api/reports/trends/', {**year, 'interval': 'week'}),
+            'trends_day': lambda: uncached('/api/reports/trends/', {**year, 'interval': 'day'}),
+            'summary_x12': summary_per_month,
+        }
+        results = {}
+        for name, func in cases.items():
+            results[name] = (time_calls(func, args.repeat), count_queries(func))
+
+    print(f"rows={args.rows}")
+    for name, (durations, queries) in results.items():
+        stats = summarize(durations)
+        print(f"{name:>13}: p50={stats['p50_ms']:9.2f} ms  p95={stats['p95_ms']:9.2f} ms  queries={queries}")
+
+
+if __name__ == '__main__':
+    main()
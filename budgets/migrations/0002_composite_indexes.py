@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0001_initial'),
+        ('categories', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['user', 'period'], name='budget_user_period_idx'),
+        ),
+    ]
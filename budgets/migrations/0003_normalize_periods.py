@@ -0,0 +1,31 @@
+from datetime import datetime
+from django.db import migrations
+
+
+def normalize_periods(apps, schema_editor):
+    # Periods used to be validated with strptime('%Y-%m'), which also accepts 2025-7. The spend
+    # rollup is keyed on the zero-padded form, so such budgets never matched any spend.
+    Budget = apps.get_model('budgets', 'Budget')
+    for budget in Budget.objects.exclude(period__regex=r'^[0-9]{4}-[0-9]{2}$'):
+        try:
+            parsed = datetime.strptime(budget.period, '%Y-%m')
+        except ValueError:
+            continue
+        period = f'{parsed.year:04d}-{parsed.month:02d}'
+        if Budget.objects.filter(user_id=budget.user_id, category_id=budget.category_id, period=period).exists():
+            # The well-formed budget is the one every report already showed
+            budget.delete()
+        else:
+            budget.period = period
+            budget.save(update_fields=['period'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_periods, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,68 @@
+from datetime import date, timedelta
+from decimal import Decimal
 from django.db import models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from categories.models import Category
+from transactions.models import SpendRollup
+from utils.cache import bump_data_version
+from utils.periods import period_bounds
+from utils.rates import STORED_PLACES, historical_rate, quantize_amount
+
+class BudgetQuerySet(models.QuerySet):
+    def with_spent(self):
+        """Annotate each budget with its period's spend (``spent_total``) in the same SELECT"""
+        spent = SpendRollup.objects.filter(
+            user=OuterRef('user'),
+            category=OuterRef('category'),
+            period=OuterRef('period')
+        ).values('total')[:1]
+        return self.annotate(spent_total=Coalesce(
+            Subquery(spent),
+            Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2)
+        ))
+
+    def upsert(self, user_id, amounts):
+        """
+        Create or update one budget per ``(category_id, period): amount`` item with a single
+        INSERT ... ON CONFLICT over the (user, category, period) constraint; returns the budgets.
+        """
+        budgets = [
+            self.model(user_id=user_id, category_id=category_id, period=period, amount=amount)
+            for (category_id, period), amount in amounts.items()
+        ]
+        self.bulk_create(
+            budgets,
+            update_conflicts=True,
+            unique_fields=['user', 'category', 'period'],
+            update_fields=['amount', 'updated_at']
+        )
+        # bulk_create bypasses Budget.save()
+        bump_data_version(user_id)
+        return budgets
+
+    def converted_to(self, from_currency, to_currency):
+        """
+        The matched budgets with ``amount`` converted between home currencies, not saved.
+        Each period converts at the rate of its last day, or today for current and future
+        periods and periods that do not parse.
+        """
+        budgets = list(self.only('id', 'user', 'amount', 'period'))
+        rates = {}
+        for budget in budgets:
+            try:
+                end = period_bounds(budget.period)[1]
+            except ValueError:
+                # A period saved before validation normalized it; still convert the amount,
+                # at today's rate, rather than fail the whole currency change
+                end = None
+            day = min(end - timedelta(days=1), date.today()) if end else date.today()
+            if day not in rates:
+                rates[day] = historical_rate(from_currency, to_currency, day)
+            budget.amount = quantize_amount(budget.amount * rates[day], to_currency, STORED_PLACES)
+        return budgets
 
 class Budget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets')
@@ -10,8 +72,23 @@ class Budget(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BudgetQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'category', 'period')
+        indexes = [
+            # (user, category, period) lookups use the unique constraint's index
+            models.Index(fields=['user', 'period'], name='budget_user_period_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.category.name} - {self.period}: {self.amount}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_data_version(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_data_version(self.user_id)
+        return result
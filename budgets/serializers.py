@@ -2,12 +2,33 @@ from rest_framework import serializers
 from budgets.models import Budget
 from categories.serializers import CategorySerializer
 from categories.models import Category
-from transactions.models import Transaction
-from django.db.models import Sum
+from transactions.models import SpendRollup
+from datetime import datetime
 from decimal import Decimal
 from drf_spectacular.utils import extend_schema_field
+from utils.periods import format_period, parse_period
+from utils.profiling import ProfiledSerializerMixin
 
-class BudgetSerializer(serializers.ModelSerializer):
+class BudgetFieldValidationMixin:
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Amount must be positive.')
+        return value
+
+    def validate_period(self, value):
+        # Always stored zero-padded, the spend rollup is keyed on the exact YYYY-MM string
+        try:
+            year, month = parse_period(value)
+        except ValueError:
+            # An unpadded month (2025-7) has always been accepted, store it as 2025-07
+            try:
+                parsed = datetime.strptime(value, '%Y-%m')
+            except ValueError:
+                raise serializers.ValidationError('Period must be in YYYY-MM format.')
+            year, month = parsed.year, parsed.month
+        return format_period(year, month)
+
+class BudgetSerializer(BudgetFieldValidationMixin, ProfiledSerializerMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.none(), 
@@ -28,20 +49,6 @@ class BudgetSerializer(serializers.ModelSerializer):
         if user:
             self.fields['category_id'].queryset = user.categories.all()
 
-    def validate_amount(self, value):
-        if value <= 0:
-            raise serializers.ValidationError('Amount must be positive.')
-        return value
-
-    def validate_period(self, value):
-        # Validate YYYY-MM format
-        try:
-            from datetime import datetime
-            datetime.strptime(value, '%Y-%m')
-        except ValueError:
-            raise serializers.ValidationError('Period must be in YYYY-MM format.')
-        return value
-
     def validate(self, data):
         user = self.context['request'].user
         category = data['category']
@@ -54,19 +61,81 @@ class BudgetSerializer(serializers.ModelSerializer):
         
         return data
 
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        # A category/period change invalidates the annotated spend
+        instance.__dict__.pop('spent_total', None)
+        return instance
+
     @extend_schema_field(serializers.DecimalField(max_digits=12, decimal_places=2))
     def get_total_spent(self, obj):
-        # Calculate total spent in this category for this period
-        year, month = obj.period.split('-')
-        spent = Transaction.objects.filter(
-            user=obj.user,
-            category=obj.category,
-            date__year=year,
-            date__month=month
-        ).aggregate(total=Sum('amount'))['total']
-        return spent or Decimal('0.00')
+        # Views annotate spent_total via Budget.objects.with_spent(); fall back to the rollup
+        spent = getattr(obj, 'spent_total', None)
+        if spent is None:
+            spent = SpendRollup.objects.filter(
+                user_id=obj.user_id,
+                category_id=obj.category_id,
+                period=obj.period
+            ).values_list('total', flat=True).first() or Decimal('0.00')
+            obj.spent_total = spent
+        return spent
 
     @extend_schema_field(serializers.DecimalField(max_digits=12, decimal_places=2))
     def get_remaining(self, obj):
-        total_spent = self.get_total_spent(obj)
-        return obj.amount - total_spent
+        return obj.amount - self.get_total_spent(obj)
+
+
+class BudgetBulkItemSerializer(BudgetFieldValidationMixin, serializers.Serializer):
+    category_id = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    period = serializers.CharField(max_length=7)
+
+class BudgetBulkSerializer(serializers.Serializer):
+    """Validate many budgets with one category lookup and one existence query"""
+    budgets = BudgetBulkItemSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def validate_budgets(self, items):
+        user = self.context['request'].user
+        category_ids = {item['category_id'] for item in items}
+        owned = set(user.categories.filter(id__in=category_ids).values_list('id', flat=True))
+
+        # Keyed by row index, like DRF's own errors for nested lists
+        errors = {}
+        seen = set()
+        for index, item in enumerate(items):
+            key = (item['category_id'], item['period'])
+            if item['category_id'] not in owned:
+                errors[index] = {'category_id': ['Invalid category.']}
+            elif key in seen:
+                errors[index] = {'non_field_errors': ['Duplicate category and period in this request.']}
+            seen.add(key)
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        self.existing = existing_budget_keys(user, seen)
+        return items
+
+class BudgetCopySerializer(BudgetFieldValidationMixin, serializers.Serializer):
+    source_period = serializers.CharField(max_length=7)
+    target_period = serializers.CharField(max_length=7)
+    overwrite = serializers.BooleanField(default=False)
+
+    def validate_source_period(self, value):
+        return self.validate_period(value)
+
+    def validate_target_period(self, value):
+        return self.validate_period(value)
+
+    def validate(self, data):
+        if data['source_period'] == data['target_period']:
+            raise serializers.ValidationError('source_period and target_period must differ.')
+        return data
+
+def existing_budget_keys(user, keys):
+    """Which ``(category_id, period)`` keys already have a budget, in one query"""
+    category_ids = {category_id for category_id, _ in keys}
+    periods = {period for _, period in keys}
+    rows = Budget.objects.filter(
+        user=user, category_id__in=category_ids, period__in=periods
+    ).values_list('category_id', 'period')
+    return {row for row in rows if row in keys}
@@ -6,6 +6,8 @@ from categories.models import Category
 from budgets.models import Budget
 from transactions.models import Transaction
 from decimal import Decimal
+from importlib import import_module
+from django.apps import apps
 
 class BudgetAPITests(APITestCase):
     def setUp(self):
@@ -33,8 +35,8 @@ class BudgetAPITests(APITestCase):
         url = reverse('budget-list-create')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        budget_data = response.data[0]
+        self.assertEqual(len(response.data['results']), 1)
+        budget_data = response.data['results'][0]
         self.assertEqual(budget_data['total_spent'], Decimal('100.00'))
         self.assertEqual(budget_data['remaining'], Decimal('400.00'))
 
@@ -77,3 +79,163 @@ class BudgetAPITests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('period', response.data)
+
+    def test_unpadded_period_is_stored_padded_and_matches_spend(self):
+        Transaction.objects.create(user=self.user, category=self.category, amount=90, date='2025-07-10')
+        response = self.client.post(reverse('budget-list-create'), {'category_id': self.category.id, 'amount': 100, 'period': '2025-7'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['period'], response.data['total_spent']), ('2025-07', Decimal('90.00')))
+        response = self.client.post(reverse('budget-list-create'), {'category_id': self.category.id, 'amount': 100, 'period': '2025-07'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_migration_pads_stored_periods(self):
+        normalize_periods = import_module('budgets.migrations.0003_normalize_periods').normalize_periods
+        rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        Budget.objects.bulk_create([
+            Budget(user=self.user, category=self.category, amount=100, period='2025-7'),
+            Budget(user=self.user, category=rent, amount=100, period='2025-7'),
+            Budget(user=self.user, category=rent, amount=200, period='2025-07'),
+        ])
+        normalize_periods(apps, None)
+        self.assertEqual(
+            sorted(Budget.objects.values_list('category__name', 'period', 'amount')),
+            [('Food', '2025-07', Decimal('100.00')), ('Rent', '2025-07', Decimal('200.00'))]
+        )
+
+    def test_list_budgets_is_cursor_paginated_by_period(self):
+        for month in range(1, 8):
+            Budget.objects.create(user=self.user, category=self.category, amount=100, period=f'2025-{month:02d}')
+        url = reverse('budget-list-create')
+        first = self.client.get(url, {'page_size': 4})
+        self.assertEqual([row['period'] for row in first.data['results']], ['2025-07', '2025-06', '2025-05', '2025-04'])
+        second = self.client.get(first.data['next'])
+        self.assertEqual([row['period'] for row in second.data['results']], ['2025-03', '2025-02', '2025-01'])
+        self.assertIsNone(second.data['next'])
+
+    def test_update_moving_period_recomputes_spend(self):
+        budget = Budget.objects.create(user=self.user, category=self.category, amount=300, period='2025-08')
+        Transaction.objects.create(user=self.user, category=self.category, amount=100, date='2025-08-15')
+        url = reverse('budget-detail', args=[budget.id])
+        response = self.client.put(url, {'category_id': self.category.id, 'amount': 300, 'period': '2025-09'})
+        self.assertEqual(response.data['total_spent'], Decimal('0.00'))
+        self.assertEqual(response.data['remaining'], Decimal('300.00'))
+
+
+class BudgetQueryCountTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='countuser', password='countpass')
+        self.client.force_authenticate(user=self.user)
+        self.categories = Category.objects.bulk_create([
+            Category(name=f'Category {i}', type='expense', user=self.user) for i in range(10)
+        ])
+
+    def _create_budgets(self, count):
+        Budget.objects.bulk_create([
+            Budget(
+                user=self.user,
+                category=self.categories[i % 10],
+                amount=100,
+                period=f'{2000 + i // 120}-{(i // 10) % 12 + 1:02d}'
+            )
+            for i in range(count)
+        ])
+        Transaction.objects.create(user=self.user, category=self.categories[0], amount=40, date='2000-01-05')
+
+    def _assert_list_queries(self, count):
+        self._create_budgets(count)
+        url, spent = reverse('budget-list-create') + '?page_size=500', {}
+        while url:
+            # One SELECT returns each page of budgets together with their spend
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertLessEqual(len(response.data['results']), 500)
+            spent.update((row['id'], row['total_spent']) for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(spent), count)
+        first = Budget.objects.get(user=self.user, category=self.categories[0], period='2000-01')
+        self.assertEqual(spent.pop(first.id), Decimal('40.00'))
+        self.assertEqual(set(spent.values()) - {Decimal('0.00')}, set())
+
+    def test_list_query_count_1_budget(self):
+        self._assert_list_queries(1)
+
+    def test_list_query_count_10_budgets(self):
+        self._assert_list_queries(10)
+
+    def test_list_query_count_1000_budgets(self):
+        self._assert_list_queries(1000)
+
+    def test_detail_is_a_single_query(self):
+        self._create_budgets(1)
+        budget = Budget.objects.get()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('budget-detail', args=[budget.id]))
+        self.assertEqual(response.data['remaining'], Decimal('60.00'))
+
+class BudgetBulkTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bulkbudget', password='bulkpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        self.rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        self.other = Category.objects.create(name='Other', type='expense', user=User.objects.create_user(username='bulkother'))
+
+    def test_bulk_creates_and_updates(self):
+        existing = Budget.objects.create(user=self.user, category=self.food, amount=100, period='2025-08')
+        Transaction.objects.create(user=self.user, category=self.food, amount=30, date='2025-08-10')
+        payload = {'budgets': [
+            {'category_id': self.food.id, 'amount': '150.00', 'period': '2025-08'},
+            {'category_id': self.rent.id, 'amount': '900.00', 'period': '2025-08'},
+            {'category_id': self.food.id, 'amount': '120.00', 'period': '2025-09'},
+        ]}
+        # Categories, existence check, upsert and re-read
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse('budget-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['updated']), (2, 1))
+        self.assertEqual(len(response.data['budgets']), 3)
+        existing.refresh_from_db()
+        self.assertEqual(existing.amount, Decimal('150.00'))
+        self.assertEqual(response.data['budgets'][0]['total_spent'], Decimal('30.00'))
+        self.assertEqual(Budget.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_rejects_invalid_rows_without_writing(self):
+        payload = {'budgets': [
+            {'category_id': self.food.id, 'amount': '150.00', 'period': '2025-08'},
+            {'category_id': self.other.id, 'amount': '10.00', 'period': '2025-08'},
+            {'category_id': self.food.id, 'amount': '-1', 'period': 'August'},
+            {'category_id': self.food.id, 'amount': '20.00', 'period': '2025-08'},
+        ]}
+        response = self.client.post(reverse('budget-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data['budgets']
+        self.assertEqual(set(errors), {2})
+        self.assertEqual(set(errors[2]), {'amount', 'period'})
+        self.assertFalse(Budget.objects.exists())
+
+        payload['budgets'] = [payload['budgets'][0], payload['budgets'][1], payload['budgets'][3]]
+        errors = self.client.post(reverse('budget-bulk'), payload, format='json').data['budgets']
+        self.assertEqual(errors[1], {'category_id': ['Invalid category.']})
+        self.assertEqual(set(errors), {1, 2})
+        self.assertIn('non_field_errors', errors[2])
+
+    def test_copy_period(self):
+        Budget.objects.create(user=self.user, category=self.food, amount=100, period='2025-08')
+        Budget.objects.create(user=self.user, category=self.rent, amount=900, period='2025-08')
+        Budget.objects.create(user=self.user, category=self.rent, amount=950, period='2025-09')
+
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('budget-copy'), {'source_period': '2025-08', 'target_period': '2025-09'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['skipped']), (1, 0, 1))
+        self.assertEqual(Budget.objects.get(category=self.rent, period='2025-09').amount, Decimal('950.00'))
+        self.assertEqual(Budget.objects.get(category=self.food, period='2025-09').amount, Decimal('100.00'))
+
+        response = self.client.post(reverse('budget-copy'), {
+            'source_period': '2025-08', 'target_period': '2025-09', 'overwrite': True
+        })
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['skipped']), (0, 2, 0))
+        self.assertEqual(Budget.objects.get(category=self.rent, period='2025-09').amount, Decimal('900.00'))
+
+        response = self.client.post(reverse('budget-copy'), {'source_period': '2025-08', 'target_period': '2025-08'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
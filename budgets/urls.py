@@ -1,7 +1,9 @@
 from django.urls import path
-from budgets.views import BudgetListCreateView, BudgetDetailView
+from budgets.views import BudgetBulkUpsertView, BudgetCopyPeriodView, BudgetListCreateView, BudgetDetailView
 
 urlpatterns = [
     path('', BudgetListCreateView.as_view(), name='budget-list-create'),
     path('<int:pk>/', BudgetDetailView.as_view(), name='budget-detail'),
+    path('bulk/', BudgetBulkUpsertView.as_view(), name='budget-bulk'),
+    path('copy/', BudgetCopyPeriodView.as_view(), name='budget-copy'),
 ]
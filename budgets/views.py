@@ -1,10 +1,17 @@
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from budgets.models import Budget
-from budgets.serializers import BudgetSerializer
+from budgets.serializers import BudgetBulkSerializer, BudgetCopySerializer, BudgetSerializer
+from utils.conditional import ConditionalGetMixin
+from utils.pagination import KeysetPagination
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
-class BudgetListCreateView(generics.ListCreateAPIView):
+class BudgetListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 6
+    pagination_class = KeysetPagination
+    ordering = ('-period', '-id')
 
     def get_serializer(self, *args, **kwargs):
         kwargs['user'] = self.request.user
@@ -12,15 +19,15 @@ class BudgetListCreateView(generics.ListCreateAPIView):
         return BudgetSerializer(*args, **kwargs)
 
     def get_queryset(self):
-        # Optimize with select_related to reduce N+1 queries
-        return Budget.objects.filter(user=self.request.user).select_related('category', 'user')
+        # select_related avoids N+1 category lookups, with_spent annotates spend in the same query
+        return Budget.objects.filter(user=self.request.user).select_related('category').with_spent()
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
     @extend_schema(
         summary="List user budgets",
-        description="Retrieve all budgets for the authenticated user with spending calculations.",
+        description="Retrieve the authenticated user's budgets with spending calculations, latest period first. Results are cursor-paginated; follow the `next` link for earlier periods.",
         responses={
             200: BudgetSerializer(many=True),
             401: OpenApiResponse(description="Authentication required")
@@ -42,8 +49,9 @@ class BudgetListCreateView(generics.ListCreateAPIView):
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
-class BudgetDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BudgetDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 6
 
     def get_serializer(self, *args, **kwargs):
         kwargs['user'] = self.request.user
@@ -51,8 +59,8 @@ class BudgetDetailView(generics.RetrieveUpdateDestroyAPIView):
         return BudgetSerializer(*args, **kwargs)
 
     def get_queryset(self):
-        # Optimize with select_related to reduce N+1 queries
-        return Budget.objects.filter(user=self.request.user).select_related('category', 'user')
+        # select_related avoids N+1 category lookups, with_spent annotates spend in the same query
+        return Budget.objects.filter(user=self.request.user).select_related('category').with_spent()
 
     @extend_schema(
         summary="Get budget details",
@@ -91,3 +99,82 @@ class BudgetDetailView(generics.RetrieveUpdateDestroyAPIView):
     )
     def delete(self, request, *args, **kwargs):
         return super().delete(request, *args, **kwargs)
+
+
+def upsert_response(user, amounts, existing, skipped=0):
+    budgets = Budget.objects.upsert(user.id, amounts)
+    budgets = Budget.objects.filter(
+        id__in=[budget.pk for budget in budgets]
+    ).select_related('category').with_spent().order_by('period', 'category__name', 'id')
+    return Response({
+        'created': len(amounts) - len(existing),
+        'updated': len(existing),
+        'skipped': skipped,
+        'budgets': BudgetSerializer(budgets, many=True).data,
+    }, status=status.HTTP_200_OK)
+
+class BudgetBulkUpsertView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 8
+
+    @extend_schema(
+        summary="Create or update budgets in bulk",
+        description=(
+            "Create or update up to 1000 budgets in one request. An existing budget for the same "
+            "category and period gets the new amount. Either every row is written or none is."
+        ),
+        request=BudgetBulkSerializer,
+        responses={
+            200: OpenApiResponse(description="Counts of created and updated budgets plus the written budgets"),
+            400: OpenApiResponse(description="Bad request - per-row validation errors"),
+            401: OpenApiResponse(description="Authentication required")
+        }
+    )
+    def post(self, request):
+        serializer = BudgetBulkSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        amounts = {
+            (item['category_id'], item['period']): item['amount']
+            for item in serializer.validated_data['budgets']
+        }
+        return upsert_response(request.user, amounts, serializer.existing)
+
+class BudgetCopyPeriodView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 8
+
+    @extend_schema(
+        summary="Copy budgets to another period",
+        description=(
+            "Roll budgets forward by copying every budget of `source_period` to `target_period`. "
+            "Budgets that already exist in the target period are kept unless `overwrite` is true."
+        ),
+        request=BudgetCopySerializer,
+        responses={
+            200: OpenApiResponse(description="Counts of created, updated and skipped budgets plus the written budgets"),
+            400: OpenApiResponse(description="Bad request - validation errors"),
+            401: OpenApiResponse(description="Authentication required")
+        }
+    )
+    def post(self, request):
+        serializer = BudgetCopySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        source, target = serializer.validated_data['source_period'], serializer.validated_data['target_period']
+
+        # One query reads the source budgets and the target budgets that already exist
+        amounts, existing = {}, set()
+        for category_id, period, amount in Budget.objects.filter(
+            user=request.user, period__in=[source, target]
+        ).values_list('category_id', 'period', 'amount'):
+            if period == source:
+                amounts[(category_id, target)] = amount
+            else:
+                existing.add((category_id, target))
+        existing &= set(amounts)
+
+        skipped = 0
+        if not serializer.validated_data['overwrite']:
+            for key in existing:
+                del amounts[key]
+            skipped, existing = len(existing), set()
+        return upsert_response(request.user, amounts, existing, skipped)
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from utils.cache import bump_data_version
 
 class Category(models.Model):
 	CATEGORY_TYPES = (
@@ -12,3 +13,12 @@ class Category(models.Model):
 
 	def __str__(self):
 		return self.name
+
+	def save(self, *args, **kwargs):
+		super().save(*args, **kwargs)
+		bump_data_version(self.user_id)
+
+	def delete(self, *args, **kwargs):
+		result = super().delete(*args, **kwargs)
+		bump_data_version(self.user_id)
+		return result
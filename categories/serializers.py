@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from categories.models import Category
+from utils.profiling import ProfiledSerializerMixin
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
 	class Meta:
 		model = Category
 		fields = ['id', 'name', 'type']
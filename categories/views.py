@@ -1,10 +1,12 @@
 from rest_framework import generics, permissions
 from categories.models import Category
 from categories.serializers import CategorySerializer
+from utils.conditional import ConditionalGetMixin
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
 	serializer_class = CategorySerializer
 	permission_classes = [permissions.IsAuthenticated]
+	query_budget = 4
 
 	def get_queryset(self):
 		return Category.objects.filter(user=self.request.user)
@@ -12,9 +14,10 @@ class CategoryListCreateView(generics.ListCreateAPIView):
 	def perform_create(self, serializer):
 		serializer.save(user=self.request.user)
 
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
 	serializer_class = CategorySerializer
 	permission_classes = [permissions.IsAuthenticated]
+	query_budget = 8
 
 	def get_queryset(self):
 		return Category.objects.filter(user=self.request.user)
@@ -1,5 +1,7 @@
 
+import os
 from pathlib import Path
+from utils.database import database_config, env_flag
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -35,6 +37,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'utils.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'finwell_api.urls'
@@ -57,11 +60,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'finwell_api.wsgi.application'
 
+# SQLite by default; DATABASE_ENGINE=postgresql and the other DATABASE_* variables select
+# PostgreSQL with persistent connections or a pool (see utils/database.py). New SQLite
+# connections get utils.database.SQLITE_PRAGMAS unless a SQLITE_PRAGMAS setting overrides them
 DATABASES = {
-	'default': {
-		'ENGINE': 'django.db.backends.sqlite3',
-		'NAME': BASE_DIR / 'db.sqlite3',
-	}
+	'default': database_config(os.environ, BASE_DIR),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -86,15 +89,74 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'finwell',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Report results are cached per user and invalidated by a data version bumped on every write.
+# LocMemCache keeps versions per process, so a write in one worker does not invalidate
+# another worker's entries; point REPORT_CACHE_ALIAS at a shared cache (Redis, Memcached)
+# when running more than one process
+REPORT_CACHE_ALIAS = 'default'
+REPORT_CACHE_TIMEOUT = 300
+
+# Request profiling: query count plus DB, serializer and view time as a Server-Timing header
+# and a JSON line on the 'finwell.profiling' logger. Views over their query_budget log a
+# warning, or raise QueryBudgetExceeded with QUERY_BUDGET_RAISE (the test runner sets both).
+REQUEST_PROFILING = False
+QUERY_BUDGET_RAISE = False
+TEST_RUNNER = 'utils.test_runner.ProfilingTestRunner'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Authenticated users are cached in-process (LRU of AUTH_USER_CACHE_SIZE users) for
+# AUTH_USER_CACHE_TTL seconds; saving a user invalidates its entry in the same process
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60
+
+# Cursor pagination for list endpoints (?page_size= is capped at API_MAX_PAGE_SIZE)
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
+# Bulk transaction import (POST /api/transactions/import/)
+TRANSACTION_IMPORT_BATCH_SIZE = 1000
+TRANSACTION_IMPORT_MAX_BATCH_SIZE = 10000
+TRANSACTION_IMPORT_MAX_ERRORS = 1000
+
+# Rows fetched per round trip by the streaming export (GET /api/transactions/export/)
+TRANSACTION_EXPORT_CHUNK_SIZE = 2000
+
+# Serve /api/convert/, /api/reports/summary/ and /api/reports/health-score/ with their async
+# views. Meant for ASGI deployments (finwell_api.asgi); under WSGI each request would pay
+# for an async_to_sync hop instead
+ASYNC_VIEWS = env_flag(os.environ, 'ASYNC_VIEWS')
+
+# Currency of a user's home_amount totals until they choose one on their profile
+DEFAULT_HOME_CURRENCY = 'USD'
+
+# Exchange rates: one live base-currency table cached for TTL seconds, plus the stored
+# history (manage.py load_exchange_rates) whose lookups an LRU of HISTORY_CACHE_SIZE
+# entries keeps for HISTORY_CACHE_TTL seconds
+EXCHANGE_RATES = {
+    'PROVIDER': 'utils.rates.ExchangeRateHostProvider',
+    'OPTIONS': {'timeout': 10},
+    'BASE_CURRENCY': 'USD',
+    'TTL': 3600,
+    'HISTORY_CACHE_SIZE': 4096,
+    'HISTORY_CACHE_TTL': 300,
+}
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'FinWell API - Personal Finance Wellness Tracker',
     'DESCRIPTION': 'A comprehensive API for managing personal finances, including user authentication, categories, transactions, budgets, and financial reports with real-time budget alerts.',
@@ -0,0 +1,108 @@
+"""
+Financial health scoring.
+
+A score as of a day compares the month's expenses dated up to that day with the month's
+budgets. ``score_users`` scores a whole id range of users with three grouped queries, which
+serves both the live score for one user and the nightly snapshot job over user-id shards.
+"""
+from decimal import Decimal
+import django
+from django.contrib.auth.models import User
+from django.db.models import Q, Sum
+from budgets.models import Budget
+from reports.models import HealthScoreSnapshot
+from transactions.models import SpendRollup, Transaction, spend_period
+from utils.periods import month_bounds
+
+
+def health_score(spent, budget_total):
+    """0-100, losing one point per percent spent over budget"""
+    overspending = 0
+    if budget_total > 0:
+        overspending = max(0, (spent - budget_total) / budget_total)
+    return max(0, 100 - int(overspending * 100))
+
+
+def health_message(score):
+    if score >= 90:
+        return "Excellent! You're well within your budgets."
+    if score >= 75:
+        return "Good job! You're within most of your budgets."
+    if score >= 50:
+        return "Caution: You're approaching your budget limits."
+    return "Warning: You're overspending. Review your budgets."
+
+
+def score_querysets(first_id, last_id, day):
+    """The user ids, expense totals, later expenses and budget totals ``score_users`` folds together"""
+    user_ids = User.objects.filter(id__gte=first_id, id__lte=last_id).values_list('id', flat=True)
+    # Only expenses count against budgets, income is ignored
+    spent = SpendRollup.objects.filter(
+        user_id__gte=first_id, user_id__lte=last_id, period=spend_period(day)
+    ).values('user_id').annotate(
+        total=Sum('total', filter=Q(category__type='expense'))
+    ).values_list('user_id', 'total').order_by()
+    # The rollup covers the whole month, a score as of ``day`` leaves out expenses dated after
+    # it (today's, when the nightly job scores yesterday, or anything newer when backfilling)
+    later = Transaction.objects.filter(
+        user_id__gte=first_id, user_id__lte=last_id, category__type='expense', date__gt=day
+    )
+    month_end = month_bounds(day.year, day.month)[1]
+    if month_end is not None:
+        later = later.filter(date__lt=month_end)
+    later = later.values('user_id').annotate(total=Sum('home_amount')).values_list('user_id', 'total').order_by()
+    budgets = Budget.objects.filter(
+        user_id__gte=first_id, user_id__lte=last_id, period=spend_period(day)
+    ).values('user_id').annotate(total=Sum('amount')).values_list('user_id', 'total').order_by()
+    return user_ids, spent, later, budgets
+
+
+def build_snapshots(user_ids, spent, later, budgets, day):
+    snapshots = []
+    for user_id in user_ids:
+        user_spent = (spent.get(user_id) or Decimal('0.00')) - (later.get(user_id) or Decimal('0.00'))
+        user_budget = budgets.get(user_id) or Decimal('0.00')
+        snapshots.append(HealthScoreSnapshot(
+            user_id=user_id,
+            date=day,
+            score=health_score(user_spent, user_budget),
+            spent=user_spent,
+            budget=user_budget
+        ))
+    return snapshots
+
+
+def score_users(first_id, last_id, day):
+    """Unsaved snapshots for every user with ``first_id <= id <= last_id`` as of ``day``"""
+    user_ids, spent, later, budgets = score_querysets(first_id, last_id, day)
+    return build_snapshots(list(user_ids), dict(spent), dict(later), dict(budgets), day)
+
+
+async def ascore_users(first_id, last_id, day):
+    """``score_users`` on the async ORM"""
+    user_ids, spent, later, budgets = score_querysets(first_id, last_id, day)
+    return build_snapshots(
+        [user_id async for user_id in user_ids],
+        {user_id: total async for user_id, total in spent},
+        {user_id: total async for user_id, total in later},
+        {user_id: total async for user_id, total in budgets},
+        day
+    )
+
+
+def snapshot_shard(first_id, last_id, day):
+    """Score and store one user-id shard; returns the number of snapshots written"""
+    snapshots = score_users(first_id, last_id, day)
+    HealthScoreSnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user', 'date'],
+        update_fields=['score', 'spent', 'budget']
+    )
+    return len(snapshots)
+
+
+def init_worker():
+    """Process pool initializer, spawned workers start without Django configured"""
+    django.setup()
@@ -0,0 +1,44 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import repeat
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+from reports.health import init_worker, snapshot_shard
+
+
+class Command(BaseCommand):
+	help = "Store every user's financial health score for a day (default: yesterday)."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--date', help='Day to snapshot (YYYY-MM-DD)')
+		parser.add_argument('--shard-size', type=int, default=1000, help='User ids per shard')
+		parser.add_argument('--workers', type=int, default=1, help='Worker processes; 1 runs in this process')
+
+	def handle(self, *args, **options):
+		try:
+			day = date.fromisoformat(options['date']) if options['date'] else date.today() - timedelta(days=1)
+		except ValueError:
+			raise CommandError('--date must be in YYYY-MM-DD format.')
+		if options['shard_size'] < 1 or options['workers'] < 1:
+			raise CommandError('--shard-size and --workers must be positive.')
+
+		bounds = User.objects.aggregate(first=Min('id'), last=Max('id'))
+		if bounds['first'] is None:
+			self.stdout.write('No users to snapshot.')
+			return
+		size = options['shard_size']
+		firsts = list(range(bounds['first'], bounds['last'] + 1, size))
+		lasts = [min(first + size - 1, bounds['last']) for first in firsts]
+
+		if options['workers'] == 1:
+			written = sum(map(snapshot_shard, firsts, lasts, repeat(day)))
+		else:
+			# Workers open their own connections, never share the parent's
+			connections.close_all()
+			with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+				written = sum(pool.map(snapshot_shard, firsts, lasts, repeat(day)))
+		self.stdout.write(self.style.SUCCESS(
+			f"Stored {written} health score snapshots for {day} in {len(firsts)} shards."
+		))
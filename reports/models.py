@@ -1 +1,19 @@
-# Placeholder for Report models
+from decimal import Decimal
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class HealthScoreSnapshot(models.Model):
+	"""A user's financial health score at the end of a day, written by snapshot_health_scores"""
+	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='health_snapshots')
+	date = models.DateField()
+	score = models.PositiveSmallIntegerField()
+	spent = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+	budget = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+	class Meta:
+		# The unique index also serves the per-user history, newest first
+		unique_together = ('user', 'date')
+
+	def __str__(self):
+		return f"{self.user.username} {self.date}: {self.score}"
@@ -3,6 +3,7 @@
 from rest_framework import serializers
 
 class ReportSummarySerializer(serializers.Serializer):
+	category_id = serializers.IntegerField()
 	category = serializers.CharField()
 	spent = serializers.FloatField()
 	budget = serializers.FloatField()
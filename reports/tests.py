@@ -0,0 +1,436 @@
+import json
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction as db_transaction
+from django.test import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, force_authenticate
+from rest_framework import status
+from budgets.models import Budget
+from categories.models import Category
+from transactions.models import Transaction
+from reports.health import score_users, snapshot_shard
+from reports.models import HealthScoreSnapshot
+from reports.views import AsyncFinancialHealthScoreView, AsyncReportSummaryView
+from utils.periods import BucketMonth, BucketWeek, bucket_start
+from utils.cache import get_data_version, report_cache_stats, reset_report_cache_stats
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+
+class ReportPeriodFilterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reportuser', password='reportpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        for txn_date, amount in [
+            (date(2023, 8, 31), 10), (date(2024, 8, 1), 20), (date(2024, 9, 1), 40), (date(2025, 8, 15), 80),
+        ]:
+            Transaction.objects.create(user=self.user, category=self.food, amount=amount, date=txn_date)
+
+    def _spent(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/reports/summary/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for query in ctx.captured_queries:
+            # No per-row EXTRACT(); filters must be plain range/equality comparisons
+            self.assertNotIn('django_date_extract', query['sql'])
+            self.assertNotIn('LIKE', query['sql'])
+        return response.json()['totals']['spent']
+
+    def test_month_only_filter_spans_every_year(self):
+        self.assertEqual(self._spent({'month': 8}), 110.0)
+        self.assertEqual(self._spent({'month': 8, 'start_date': '2024-01-01', 'end_date': '2030-01-01'}), 100.0)
+
+    def test_month_and_year_filters(self):
+        self.assertEqual(self._spent({'month': 8, 'year': 2024}), 20.0)
+        self.assertEqual(self._spent({'year': 2024}), 60.0)
+        self.assertEqual(self._spent({'year': 2024, 'start_date': '2024-08-02'}), 40.0)
+
+    def test_invalid_month_is_rejected(self):
+        response = self.client.get('/api/reports/summary/', {'month': 13})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_years_outside_the_date_range_are_rejected(self):
+        for url in ('/api/reports/summary/', '/api/reports/cash-flow/', '/api/transactions/export/'):
+            for year in (0, 10000):
+                response = self.client.get(url, {'start_date': '2025-01-01', 'year': year})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, (url, year))
+            # The last representable year has no next year to end its range on
+            response = self.client.get(url, {'start_date': '2025-01-01', 'year': 9999, 'month': 12})
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+
+
+class ReportSummaryAggregationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='summaryuser', password='summarypass')
+        self.client.force_authenticate(user=self.user)
+        self.period = date.today().strftime('%Y-%m')
+
+    def test_same_named_categories_and_budget_only_rows(self):
+        first = Category.objects.create(name='Food', type='expense', user=self.user)
+        second = Category.objects.create(name='Food', type='expense', user=self.user)
+        unused = Category.objects.create(name='Travel', type='expense', user=self.user)
+        Category.objects.create(name='Idle', type='expense', user=self.user)
+        Transaction.objects.create(user=self.user, category=first, amount=10, date=date.today())
+        Budget.objects.create(user=self.user, category=second, amount=40, period=self.period)
+        Budget.objects.create(user=self.user, category=unused, amount=25, period=self.period)
+
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/reports/summary/').json()
+        self.assertEqual(data['summary'], [
+            {'category_id': first.id, 'category': 'Food', 'spent': 10.0, 'budget': 0.0, 'remaining': -10.0},
+            {'category_id': second.id, 'category': 'Food', 'spent': 0.0, 'budget': 40.0, 'remaining': 40.0},
+            {'category_id': unused.id, 'category': 'Travel', 'spent': 0.0, 'budget': 25.0, 'remaining': 25.0},
+        ])
+        self.assertEqual(data['totals'], {'spent': 10.0, 'budget': 65.0, 'remaining': 55.0})
+
+    def test_amounts_are_exact(self):
+        food = Category.objects.create(name='Food', type='expense', user=self.user)
+        for _ in range(10):
+            Transaction.objects.create(user=self.user, category=food, amount='0.10', date=date.today())
+        Budget.objects.create(user=self.user, category=food, amount='1.30', period=self.period)
+
+        for params in [{}, {'start_date': date.today().replace(day=1).isoformat()}]:
+            cache.clear()
+            data = self.client.get('/api/reports/summary/', params).json()
+            self.assertEqual(data['summary'][0]['spent'], 1.0)
+            self.assertEqual(data['totals'], {'spent': 1.0, 'budget': 1.3, 'remaining': 0.3})
+
+class ReportCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_report_cache_stats()
+        self.user = User.objects.create_user(username='cacheuser', password='cachepass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        Transaction.objects.create(user=self.user, category=self.food, amount=10, date=date.today())
+
+    def _summary(self, **params):
+        return self.client.get('/api/reports/summary/', params).json()
+
+    def test_repeated_requests_hit_the_cache(self):
+        first = self._summary(month=8, year=2025)
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/reports/summary/', {'year': 2025, 'month': 8}).json()
+        self.assertEqual(first, second)
+        self.assertEqual(report_cache_stats(), {'hits': 1, 'misses': 1})
+
+        # Different parameters are a different entry
+        self._summary(year=2025)
+        self.assertEqual(report_cache_stats(), {'hits': 1, 'misses': 2})
+
+    def test_transaction_writes_invalidate(self):
+        self.assertEqual(self._summary()['totals']['spent'], 10.0)
+        response = self.client.post('/api/transactions/', {
+            'category_id': self.food.id, 'amount': 5, 'date': date.today().isoformat()
+        })
+        self.assertEqual(self._summary()['totals']['spent'], 15.0)
+
+        txn_id = response.data['id']
+        self.client.put(f'/api/transactions/{txn_id}/', {
+            'category_id': self.food.id, 'amount': 7, 'date': date.today().isoformat()
+        })
+        self.assertEqual(self._summary()['totals']['spent'], 17.0)
+
+        self.client.delete(f'/api/transactions/{txn_id}/')
+        self.assertEqual(self._summary()['totals']['spent'], 10.0)
+
+    def test_budget_and_category_writes_invalidate(self):
+        self.assertEqual(self.client.get('/api/reports/health-score/').json()['score'], 100)
+        self.assertEqual(self._summary()['totals']['budget'], 0)
+
+        budget = Budget.objects.create(user=self.user, category=self.food, amount=5, period=date.today().strftime('%Y-%m'))
+        self.assertEqual(self._summary()['totals']['budget'], 5.0)
+        self.assertEqual(self.client.get('/api/reports/health-score/').json()['score'], 0)
+
+        budget.delete()
+        self.assertEqual(self.client.get('/api/reports/health-score/').json()['score'], 100)
+
+        self.client.put(f'/api/categories/{self.food.id}/', {'name': 'Groceries', 'type': 'expense'})
+        self.assertEqual(self._summary()['summary'][0]['category'], 'Groceries')
+
+    def test_users_do_not_share_entries(self):
+        self._summary()
+        other = User.objects.create_user(username='othercache', password='otherpass')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self._summary()['totals']['spent'], 0)
+
+    def test_bulk_import_invalidates(self):
+        self._summary()
+        upload = SimpleUploadedFile('rows.csv', f'category_id,amount,date\n{self.food.id},4,{date.today().isoformat()}\n'.encode())
+        self.client.post('/api/transactions/import/', {'file': upload}, format='multipart')
+        self.assertEqual(self._summary()['totals']['spent'], 14.0)
+
+
+    def test_results_cached_before_commit_are_dropped_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with db_transaction.atomic():
+                Transaction.objects.create(user=self.user, category=self.food, amount=5, date=date.today())
+                # Another request caching a result here would use this version
+                pending = get_data_version(self.user.id)
+        self.assertGreater(get_data_version(self.user.id), pending)
+
+
+class ReportConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='etagreport', password='etagpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        Transaction.objects.create(user=self.user, category=self.food, amount=10, date=date.today())
+
+    def test_summary_revalidates_until_budget_changes(self):
+        etag = self.client.get('/api/reports/summary/')['ETag']
+        response = self.client.get('/api/reports/summary/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Budget.objects.create(user=self.user, category=self.food, amount=50, period=date.today().strftime('%Y-%m'))
+        response = self.client.get('/api/reports/summary/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['totals']['budget'], 50.0)
+
+
+class SpendingTrendsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='trenduser', password='trendpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        self.rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        for category, amount, txn_date in [
+            (self.food, '10.10', date(2024, 1, 1)), (self.food, '5.20', date(2024, 1, 7)),
+            (self.food, '3.00', date(2024, 1, 8)), (self.rent, '500.00', date(2024, 3, 1)),
+            (self.rent, '1.00', date(2024, 4, 1)),
+        ]:
+            Transaction.objects.create(user=self.user, category=category, amount=amount, date=txn_date)
+
+    def _trends(self, queries=1, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/reports/trends/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(ctx.captured_queries), queries)
+        return response.json()
+
+    def test_monthly_buckets_are_zero_filled(self):
+        # Whole months from the rollup, the partial December from raw transactions
+        data = self._trends(queries=2, start_date='2023-12-15', end_date='2024-03-31')
+        self.assertEqual(data['buckets'], ['2023-12-01', '2024-01-01', '2024-02-01', '2024-03-01'])
+        food, rent = data['series']
+        self.assertEqual((food['category'], food['values'], food['total']), ('Food', [0.0, 18.3, 0.0, 0.0], 18.3))
+        self.assertEqual((rent['category'], rent['values']), ('Rent', [0.0, 0.0, 0.0, 500.0]))
+        self.assertEqual(data['totals'], [0.0, 18.3, 0.0, 500.0])
+
+        data = self._trends(start_date='2024-01-01', end_date='2024-04-30', category=self.rent.id)
+        self.assertEqual(data['totals'], [0.0, 0.0, 500.0, 1.0])
+        self.assertEqual(
+            self._trends(start_date='2024-01-02', end_date='2024-01-07')['totals'], [5.2]
+        )
+
+    def test_income_is_not_spending(self):
+        salary = Category.objects.create(name='Salary', type='income', user=self.user)
+        Transaction.objects.create(user=self.user, category=salary, amount=3000, date=date(2024, 3, 15))
+        Transaction.objects.create(user=self.user, category=salary, amount=3000, date=date(2024, 4, 2))
+        # March from the rollup, April from raw transactions
+        data = self._trends(queries=2, start_date='2024-03-01', end_date='2024-04-10')
+        self.assertEqual(data['totals'], [500.0, 1.0])
+        self.assertEqual([entry['category'] for entry in data['series']], ['Rent'])
+
+    def test_weekly_and_daily_buckets(self):
+        data = self._trends(interval='week', start_date='2024-01-01', end_date='2024-01-14')
+        self.assertEqual(data['buckets'], ['2024-01-01', '2024-01-08'])
+        self.assertEqual(data['series'][0]['values'], [15.3, 3.0])
+
+        data = self._trends(interval='day', start_date='2024-01-06', end_date='2024-01-08', category=self.food.id)
+        self.assertEqual(data['buckets'], ['2024-01-06', '2024-01-07', '2024-01-08'])
+        self.assertEqual(data['series'][0]['values'], [0.0, 5.2, 3.0])
+
+    def test_buckets_are_grouped_in_sql(self):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=self.food, amount=1, currency='USD', home_amount=1,
+                        date=date(2024, 12, 20) + timedelta(days=offset))
+            for offset in range(20)
+        ])
+        rows = Transaction.objects.filter(user=self.user).annotate(
+            week=BucketWeek('date'), month=BucketMonth('date')
+        ).values_list('date', 'week', 'month')
+        for day, week, month in rows:
+            self.assertEqual((week, month), (bucket_start(day, 'week'), bucket_start(day, 'month')), day)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self._trends(interval='week', start_date='2024-12-01', end_date='2025-01-31')
+        self.assertNotIn('django_date_trunc', ctx.captured_queries[0]['sql'])
+
+    def test_invalid_parameters(self):
+        for params in [
+            {'interval': 'year'},
+            {'start_date': '2024-02-01', 'end_date': '2024-01-01'},
+            {'interval': 'day', 'start_date': '2000-01-01', 'end_date': '2024-01-01'},
+            {'month': 1},
+            {'year': 2024, 'start_date': '2024-01-01'},
+        ]:
+            response = self.client.get('/api/reports/trends/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_defaults_to_last_twelve_months(self):
+        data = self._trends(queries=2, end_date='2024-04-15')
+        self.assertEqual((data['start_date'], len(data['buckets'])), ('2023-05-01', 12))
+        self.assertEqual(data['totals'][-2:], [500.0, 1.0])
+
+
+class CashFlowTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='flowuser', password='flowpass')
+        self.client.force_authenticate(user=self.user)
+        self.salary = Category.objects.create(name='Salary', type='income', user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        for category, amount, txn_date in [
+            (self.salary, '1000.00', date(2024, 7, 1)), (self.food, '250.50', date(2024, 7, 3)),
+            (self.food, '80.00', date(2024, 8, 2)), (self.salary, '1000.00', date(2024, 9, 1)),
+        ]:
+            Transaction.objects.create(user=self.user, category=category, amount=amount, date=txn_date)
+
+    def test_cash_flow_per_period(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/reports/cash-flow/', {'year': 2024}).json()
+        self.assertEqual(data['periods'], [
+            {'period': '2024-07', 'income': 1000.0, 'expenses': 250.5, 'net': 749.5, 'savings_rate': 74.95},
+            {'period': '2024-08', 'income': 0.0, 'expenses': 80.0, 'net': -80.0, 'savings_rate': None},
+            {'period': '2024-09', 'income': 1000.0, 'expenses': 0.0, 'net': 1000.0, 'savings_rate': 100.0},
+        ])
+        self.assertEqual(data['totals'], {'income': 2000.0, 'expenses': 330.5, 'net': 1669.5, 'savings_rate': 83.48})
+
+    def test_date_range_matches_rollup(self):
+        by_year = self.client.get('/api/reports/cash-flow/', {'year': 2024}).json()
+        by_range = self.client.get('/api/reports/cash-flow/', {'start_date': '2024-01-01', 'end_date': '2024-12-31'}).json()
+        self.assertEqual(by_year, by_range)
+        data = self.client.get('/api/reports/cash-flow/', {'start_date': '2024-07-02', 'end_date': '2024-08-31'}).json()
+        self.assertEqual([entry['income'] for entry in data['periods']], [0.0, 0.0])
+
+    def test_income_is_not_spending(self):
+        period = date.today().strftime('%Y-%m')
+        Transaction.objects.create(user=self.user, category=self.salary, amount=5000, date=date.today())
+        Transaction.objects.create(user=self.user, category=self.food, amount=90, date=date.today())
+        Budget.objects.create(user=self.user, category=self.food, amount=100, period=period)
+        self.assertEqual(self.client.get('/api/reports/health-score/').json()['score'], 100)
+        summary = self.client.get('/api/reports/summary/', {'start_date': date.today().isoformat()}).json()
+        self.assertEqual([row['category'] for row in summary['summary']], ['Food'])
+        self.assertEqual(summary['totals']['spent'], 90.0)
+
+
+class HealthScoreSnapshotTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.day = date(2024, 8, 31)
+        self.users = []
+        for index, spent in enumerate([50, 150, 300]):
+            user = User.objects.create_user(username=f'snapshot{index}', password='snapshotpass')
+            food = Category.objects.create(name='Food', type='expense', user=user)
+            salary = Category.objects.create(name='Salary', type='income', user=user)
+            Transaction.objects.create(user=user, category=food, amount=spent, date=self.day)
+            Transaction.objects.create(user=user, category=salary, amount=1000, date=self.day)
+            Budget.objects.create(user=user, category=food, amount=100, period='2024-08')
+            self.users.append(user)
+        self.idle = User.objects.create_user(username='snapshotidle', password='snapshotpass')
+
+    def test_command_scores_every_user_in_shards(self):
+        out = StringIO()
+        with self.assertNumQueries(1 + 2 * 5):
+            # Bounds, then per shard: users, spend, later spend, budgets and one upsert
+            call_command('snapshot_health_scores', '--date', '2024-08-31', '--shard-size', '2', stdout=out)
+        self.assertIn('Stored 4 health score snapshots', out.getvalue())
+        scores = dict(HealthScoreSnapshot.objects.filter(date=self.day).values_list('user_id', 'score'))
+        self.assertEqual(scores, {self.users[0].id: 100, self.users[1].id: 50, self.users[2].id: 0, self.idle.id: 100})
+
+        # Re-running a day updates the rows in place
+        Budget.objects.filter(user=self.users[2]).update(amount=1000)
+        call_command('snapshot_health_scores', '--date', '2024-08-31', stdout=StringIO())
+        self.assertEqual(HealthScoreSnapshot.objects.count(), 4)
+        self.assertEqual(HealthScoreSnapshot.objects.get(user=self.users[2], date=self.day).score, 100)
+
+    def test_snapshot_leaves_out_expenses_dated_after_its_day(self):
+        user = self.users[0]
+        food = user.categories.get(name='Food')
+        Transaction.objects.create(user=user, category=food, amount=100, date=date(2024, 8, 15))
+        Transaction.objects.create(user=user, category=food, amount=500, date=date(2024, 8, 20))
+        snapshot = score_users(user.id, user.id, date(2024, 8, 19))[0]
+        self.assertEqual((snapshot.spent, snapshot.score), (Decimal('100.00'), 100))
+        snapshot = score_users(user.id, user.id, self.day)[0]
+        self.assertEqual((snapshot.spent, snapshot.score), (Decimal('650.00'), 0))
+
+    def test_endpoint_serves_history_and_live_today(self):
+        user = self.users[1]
+        for offset, score in [(1, 80), (2, 90), (40, 10)]:
+            HealthScoreSnapshot.objects.create(user=user, date=date.today() - timedelta(days=offset), score=score)
+        self.client.force_authenticate(user=user)
+
+        data = self.client.get('/api/reports/health-score/').json()
+        self.assertEqual((data['date'], data['score']), (date.today().isoformat(), 100))
+        self.assertEqual([entry['score'] for entry in data['history']], [80, 90])
+        self.assertEqual(data['history'][0]['message'], "Good job! You're within most of your budgets.")
+
+        data = self.client.get('/api/reports/health-score/', {'days': 60}).json()
+        self.assertEqual([entry['score'] for entry in data['history']], [80, 90, 10])
+        self.assertEqual(self.client.get('/api/reports/health-score/', {'days': 1000}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_new_snapshots_reach_cached_responses_without_a_version_bump(self):
+        user = self.users[1]
+        self.client.force_authenticate(user=user)
+        first = self.client.get('/api/reports/health-score/')
+        self.assertEqual(first.json()['history'], [])
+
+        # The nightly job runs in another process and leaves this one's cache alone
+        version = get_data_version(user.id)
+        snapshot_shard(user.id, user.id, date.today() - timedelta(days=1))
+        self.assertEqual(get_data_version(user.id), version)
+
+        second = self.client.get('/api/reports/health-score/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual([entry['score'] for entry in second.json()['history']], [100])
+
+
+class AsyncReportViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='asyncreports', password='asyncpass')
+        self.client.force_authenticate(user=self.user)
+        food = Category.objects.create(name='Food', type='expense', user=self.user)
+        rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        for day, category, amount in [(date(2024, 3, 5), food, '12.50'), (date(2025, 3, 9), food, '7.25'),
+                                      (date(2025, 4, 1), rent, '900.00')]:
+            Transaction.objects.create(user=self.user, category=category, amount=amount, date=day)
+        Budget.objects.create(user=self.user, category=food, amount='20.00', period='2025-03')
+        HealthScoreSnapshot.objects.create(user=self.user, date=date.today() - timedelta(days=1), score=70)
+
+    def get_async(self, view_class, url, params=None):
+        request = AsyncRequestFactory().get(url, params or {})
+        force_authenticate(request, user=self.user)
+        response = async_to_sync(view_class.as_view())(request)
+        response.render()
+        return response.status_code, json.loads(response.content)
+
+    def test_summary_matches_sync_view(self):
+        for params in [{}, {'month': 3}, {'year': 2025}, {'month': 3, 'start_date': '2025-01-01'},
+                       {'start_date': '2025-03-01', 'end_date': '2025-03-31'}]:
+            cache.clear()
+            expected = self.client.get('/api/reports/summary/', params).json()
+            cache.clear()
+            self.assertEqual(self.get_async(AsyncReportSummaryView, '/api/reports/summary/', params), (200, expected))
+
+    def test_summary_rejects_bad_filters(self):
+        status_code, data = self.get_async(AsyncReportSummaryView, '/api/reports/summary/', {'month': 13})
+        self.assertEqual(status_code, 400)
+        self.assertIn('error', data)
+
+    def test_health_score_matches_sync_view(self):
+        expected = self.client.get('/api/reports/health-score/').json()
+        cache.clear()
+        self.assertEqual(self.get_async(AsyncFinancialHealthScoreView, '/api/reports/health-score/'), (200, expected))
+        self.assertEqual(expected['history'][0]['score'], 70)
@@ -1,8 +1,16 @@
 
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_VIEWS:
+	SummaryView, HealthScoreView = views.AsyncReportSummaryView, views.AsyncFinancialHealthScoreView
+else:
+	SummaryView, HealthScoreView = views.ReportSummaryView, views.FinancialHealthScoreView
+
 urlpatterns = [
-	path('summary/', views.ReportSummaryView.as_view(), name='report-summary'),
-	path('health-score/', views.FinancialHealthScoreView.as_view(), name='report-health-score'),
+	path('summary/', SummaryView.as_view(), name='report-summary'),
+	path('trends/', views.SpendingTrendsView.as_view(), name='report-trends'),
+	path('cash-flow/', views.CashFlowView.as_view(), name='report-cash-flow'),
+	path('health-score/', HealthScoreView.as_view(), name='report-health-score'),
 ]
@@ -1,163 +1,575 @@
 
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from django.db.models import Sum
+from django.db.models import DecimalField, F, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from categories.models import Category
-from transactions.models import Transaction
+from transactions.models import SpendRollup, Transaction, spend_period
 from budgets.models import Budget
+from .health import ascore_users, health_message, score_users
+from .models import HealthScoreSnapshot
 from .serializers import ReportSummarySerializer, ReportSummaryTotalsSerializer, FinancialHealthScoreSerializer
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from utils.async_views import AsyncAPIView
+from utils.cache import acached_report, cached_report
+from utils.conditional import ConditionalGetMixin
+from utils.periods import (
+    TREND_INTERVALS, BucketMonth, BucketWeek, bucket_starts, date_range_q, filter_by_date, month_bounds,
+    month_last_day, parse_date_filters, parse_period, period_bounds, period_values
+)
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
-class ReportSummaryView(APIView):
+def filter_periods(rollups, month=None, year=None):
+    """
+    The ``YYYY-MM`` periods a month/year filter covers, or None when there is no filter.
+
+    Month-only filters span the years the given rollup rows cover.
+    """
+    bounds = None
+    if month and not year:
+        bounds = rollups.aggregate(first=Min('period'), last=Max('period'))
+    return covered_periods(bounds, month, year)
+
+
+async def afilter_periods(rollups, month=None, year=None):
+    bounds = None
+    if month and not year:
+        bounds = await rollups.aaggregate(first=Min('period'), last=Max('period'))
+    return covered_periods(bounds, month, year)
+
+
+def covered_periods(bounds, month, year):
+    years = None
+    if bounds and bounds['first']:
+        years = (parse_period(bounds['first'])[0], parse_period(bounds['last'])[0])
+    return period_values(month, year, years)
+
+
+def cash_flow(user, filters):
+    """
+    Income, expenses, net and savings rate per ``YYYY-MM`` period with any activity.
+
+    Income and expenses come out of a single pass using conditional aggregation on the
+    category type, from the monthly rollup for whole periods or from raw transactions
+    for arbitrary date ranges.
+    """
+    def sums(field):
+        return {
+            'income': Sum(field, filter=Q(category__type='income')),
+            'expenses': Sum(field, filter=Q(category__type='expense')),
+        }
+
+    if filters['start_date'] or filters['end_date']:
+        transactions = filter_by_date(Transaction.objects.filter(user=user), **filters)
+        transactions = transactions.annotate(bucket=BucketMonth('date'))
+        rows = [
+            {'period': spend_period(row['bucket']), 'income': row['income'], 'expenses': row['expenses']}
+            for row in transactions.values('bucket').annotate(**sums('home_amount')).order_by()
+        ]
+    else:
+        rollups = SpendRollup.objects.filter(user=user, count__gt=0)
+        periods = filter_periods(rollups, filters['month'], filters['year'])
+        if periods is not None:
+            rollups = rollups.filter(period__in=periods)
+        rows = rollups.values('period').annotate(**sums('total')).order_by()
+
+    zero = Decimal('0.00')
+    by_period = {}
+    for row in rows:
+        income, expenses = by_period.get(row['period'], (zero, zero))
+        by_period[row['period']] = (income + (row['income'] or zero), expenses + (row['expenses'] or zero))
+
+    def flow(income, expenses):
+        net = income - expenses
+        savings_rate = (net * 100 / income).quantize(Decimal('0.01')) if income else None
+        return {'income': income, 'expenses': expenses, 'net': net, 'savings_rate': savings_rate}
+
+    periods = [{'period': period, **flow(*by_period[period])} for period in sorted(by_period)]
+    return {
+        'periods': periods,
+        'totals': flow(
+            sum((entry['income'] for entry in periods), zero),
+            sum((entry['expenses'] for entry in periods), zero)
+        )
+    }
+
+
+summary_schema = extend_schema(
+    summary="Get spending summary",
+    description="Get spending summary grouped by category with budget comparison. Supports date filtering.",
+    parameters=[
+        OpenApiParameter(name='start_date', type=OpenApiTypes.DATE, description='Start date filter (YYYY-MM-DD)'),
+        OpenApiParameter(name='end_date', type=OpenApiTypes.DATE, description='End date filter (YYYY-MM-DD)'),
+        OpenApiParameter(name='month', type=OpenApiTypes.INT, description='Month filter (1-12)'),
+        OpenApiParameter(name='year', type=OpenApiTypes.INT, description='Year filter (e.g., 2024)'),
+    ],
+    responses={
+        200: {
+            "type": "object",
+            "properties": {
+                "summary": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "category_id": {"type": "integer"},
+                            "category": {"type": "string"},
+                            "spent": {"type": "number"},
+                            "budget": {"type": "number"},
+                            "remaining": {"type": "number"}
+                        }
+                    }
+                },
+                "totals": {
+                    "type": "object",
+                    "properties": {
+                        "spent": {"type": "number"},
+                        "budget": {"type": "number"},
+                        "remaining": {"type": "number"}
+                    }
+                }
+            }
+        }
+    }
+)
+
+
+class ReportSummaryView(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    query_budget = 4
+    serializer_class = None  # Will be handled by @extend_schema
+
+    @summary_schema
+    def get(self, request):
+        user = request.user
+        # Filters
+        try:
+            filters = parse_date_filters(request.query_params)
+        except ValueError as exc:
+            return Response({
+                'error': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Served from the per-user report cache until the user's data changes
+        return Response(cached_report(
+            'summary', user.id, request.query_params, lambda: self.summarize(user, filters)
+        ))
+
+    def summarize(self, user, filters):
+        rollups = SpendRollup.objects.filter(user=user, count__gt=0)
+        periods = filter_periods(rollups, filters['month'], filters['year'])
+        return summary_totals(list(self.summary_rows(user, filters, periods)))
+
+    def summary_rows(self, user, filters, periods):
+        """One row per category with spend or a budget in range, amounts stay Decimal end to end"""
+        rollups = SpendRollup.objects.filter(user=user, count__gt=0)
+        budgets = Budget.objects.filter(user=user)
+        if periods is not None:
+            budgets = budgets.filter(period__in=periods)
+        if filters['start_date'] or filters['end_date']:
+            # Arbitrary date ranges don't line up with whole periods, aggregate raw transactions
+            spending = filter_by_date(Transaction.objects.filter(user=user), filters['start_date'], filters['end_date'])
+            if periods is not None:
+                spending = spending.filter(date_range_q([period_bounds(period) for period in periods]))
+            spend = spending.filter(category=OuterRef('pk')).values('category').annotate(
+                total=Sum('home_amount')
+            ).values('total')
+            if filters['start_date']:
+                budgets = budgets.filter(period__gte=filters['start_date'].strftime('%Y-%m'))
+            if filters['end_date']:
+                budgets = budgets.filter(period__lte=filters['end_date'].strftime('%Y-%m'))
+        else:
+            # Whole-period filters are served from the monthly spend rollup
+            if periods is not None:
+                rollups = rollups.filter(period__in=periods)
+            spending = rollups
+            spend = rollups.filter(category=OuterRef('pk')).values('category').annotate(
+                total=Sum('total')
+            ).values('total')
+        budget = budgets.filter(category=OuterRef('pk')).values('category').annotate(
+            total=Sum('amount')
+        ).values('total')
+
+        # Filtering with IN keeps each correlated subquery out of the WHERE clause
+        money = DecimalField(max_digits=14, decimal_places=2)
+        zero = Value(Decimal('0.00'))
+        return Category.objects.filter(user=user, type='expense').filter(
+            Q(pk__in=spending.values('category')) | Q(pk__in=budgets.values('category'))
+        ).annotate(
+            spent=Coalesce(Subquery(spend), zero, output_field=money),
+            budget=Coalesce(Subquery(budget), zero, output_field=money),
+        ).order_by('name', 'pk').values('spent', 'budget', category_id=F('pk'), category=F('name'))
+
+
+class AsyncReportSummaryView(ReportSummaryView, AsyncAPIView):
+    """``ReportSummaryView`` on the async ORM, for ASGI deployments"""
+
+    @summary_schema
+    async def get(self, request):
+        user = request.user
+        try:
+            filters = parse_date_filters(request.query_params)
+        except ValueError as exc:
+            return Response({
+                'error': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(await acached_report(
+            'summary', user.id, request.query_params, lambda: self.asummarize(user, filters)
+        ))
+
+    async def asummarize(self, user, filters):
+        rollups = SpendRollup.objects.filter(user=user, count__gt=0)
+        periods = await afilter_periods(rollups, filters['month'], filters['year'])
+        return summary_totals([row async for row in self.summary_rows(user, filters, periods)])
+
+
+def summary_totals(rows):
+    # SQLite has no GROUP BY ROLLUP, the totals are summed from the fetched rows
+    total_spent = total_budget = Decimal('0.00')
+    for row in rows:
+        row['remaining'] = row['budget'] - row['spent']
+        total_spent += row['spent']
+        total_budget += row['budget']
+    return {
+        'summary': rows,
+        'totals': {
+            'spent': total_spent,
+            'budget': total_budget,
+            'remaining': total_budget - total_spent
+        }
+    }
+
+
+class SpendingTrendsView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 3
     serializer_class = None  # Will be handled by @extend_schema
+    max_buckets = 1000
+    truncators = {'week': BucketWeek, 'month': BucketMonth}
+
+    def get_etag_extra(self, request):
+        # The default range ends today
+        return (datetime.today().date().isoformat(),)
 
     @extend_schema(
-        summary="Get spending summary",
-        description="Get spending summary grouped by category with budget comparison. Supports date filtering.",
+        summary="Get spending trends",
+        description=(
+            "Spending per expense category per day, week (starting Monday) or month over a date range. "
+            "Buckets without transactions are returned as zero. Defaults to the last 12 months."
+        ),
         parameters=[
-            OpenApiParameter(name='start_date', type=OpenApiTypes.DATE, description='Start date filter (YYYY-MM-DD)'),
-            OpenApiParameter(name='end_date', type=OpenApiTypes.DATE, description='End date filter (YYYY-MM-DD)'),
-            OpenApiParameter(name='month', type=OpenApiTypes.INT, description='Month filter (1-12)'),
-            OpenApiParameter(name='year', type=OpenApiTypes.INT, description='Year filter (e.g., 2024)'),
+            OpenApiParameter(name='interval', type=OpenApiTypes.STR, enum=list(TREND_INTERVALS), description='Bucket size (default month)'),
+            OpenApiParameter(name='start_date', type=OpenApiTypes.DATE, description='Start date (YYYY-MM-DD)'),
+            OpenApiParameter(name='end_date', type=OpenApiTypes.DATE, description='End date (YYYY-MM-DD), defaults to today'),
+            OpenApiParameter(name='category', type=OpenApiTypes.INT, description='Only include this category id'),
         ],
         responses={
             200: {
                 "type": "object",
                 "properties": {
-                    "summary": {
+                    "interval": {"type": "string"},
+                    "start_date": {"type": "string", "format": "date"},
+                    "end_date": {"type": "string", "format": "date"},
+                    "buckets": {"type": "array", "items": {"type": "string", "format": "date"}},
+                    "series": {
                         "type": "array",
                         "items": {
                             "type": "object",
                             "properties": {
+                                "category_id": {"type": "integer"},
                                 "category": {"type": "string"},
-                                "spent": {"type": "number"},
-                                "budget": {"type": "number"},
-                                "remaining": {"type": "number"}
+                                "values": {"type": "array", "items": {"type": "number"}},
+                                "total": {"type": "number"}
                             }
                         }
                     },
-                    "totals": {
-                        "type": "object",
-                        "properties": {
-                            "spent": {"type": "number"},
-                            "budget": {"type": "number"},
-                            "remaining": {"type": "number"}
-                        }
-                    }
+                    "totals": {"type": "array", "items": {"type": "number"}}
                 }
             }
         }
     )
     def get(self, request):
         user = request.user
-        # Filters
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        month = request.query_params.get('month')
-        year = request.query_params.get('year')
-
-        transactions = Transaction.objects.filter(user=user)
-        if start_date:
-            transactions = transactions.filter(date__gte=start_date)
-        if end_date:
-            transactions = transactions.filter(date__lte=end_date)
-        if month and year:
-            transactions = transactions.filter(date__month=month, date__year=year)
-        elif month:
-            transactions = transactions.filter(date__month=month)
-        elif year:
-            transactions = transactions.filter(date__year=year)
-
-        # Group by category
-        category_sums = transactions.values('category__name').annotate(spent=Sum('amount'))
-
-        # Get budgets for the period (if month/year provided, match period)
-        # Optimize with select_related
-        period = None
-        if month and year:
-            period = f"{year}-{str(month).zfill(2)}"
-        budgets = Budget.objects.filter(user=user).select_related('category')
-        if period:
-            budgets = budgets.filter(period=period)
-        budget_map = {b.category.name: b.amount for b in budgets}
-
-        summary = []
-        total_spent = 0
-        total_budget = 0
-        for cat in category_sums:
-            cat_name = cat['category__name']
-            spent = float(cat['spent'])
-            budget = float(budget_map.get(cat_name, 0))
-            remaining = budget - spent
-            summary.append({
-                'category': cat_name,
-                'spent': spent,
-                'budget': budget,
-                'remaining': remaining
+        today = datetime.today().date()
+        interval = request.query_params.get('interval', 'month')
+        try:
+            if interval not in TREND_INTERVALS:
+                raise ValueError(f"interval must be one of {', '.join(TREND_INTERVALS)}")
+            filters = parse_date_filters(request.query_params)
+            if filters['month'] or filters['year']:
+                raise ValueError('Trends take start_date and end_date, not month or year')
+            end_date = filters['end_date'] or today
+            start_date = filters['start_date']
+            if not start_date:
+                # First day of the month eleven months back, so the default is a 12-month chart
+                year, month = divmod(end_date.year * 12 + end_date.month - 12, 12)
+                start_date = month_bounds(year, month + 1)[0]
+            if start_date > end_date:
+                raise ValueError('start_date must not be after end_date')
+            category = request.query_params.get('category')
+            category = int(category) if category else None
+            buckets = bucket_starts(start_date, end_date, interval, limit=self.max_buckets)
+        except ValueError as exc:
+            return Response({
+                'error': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(cached_report(
+            'trends', user.id, request.query_params,
+            lambda: self.trends(user, interval, start_date, end_date, buckets, category),
+            extra=(today.isoformat(),)
+        ))
+
+    def trends(self, user, interval, start_date, end_date, buckets, category=None):
+        positions = {bucket: index for index, bucket in enumerate(buckets)}
+        zero = Decimal('0.00')
+        series = {}
+        totals = [zero] * len(buckets)
+        for row in self.spend_rows(user, interval, start_date, end_date, buckets, category):
+            entry = series.setdefault(row['category_id'], {
+                'category_id': row['category_id'],
+                'category': row['category__name'],
+                'values': [zero] * len(buckets),
+                'total': zero,
             })
-            total_spent += spent
-            total_budget += budget
+            index = positions[row['bucket']]
+            entry['values'][index] += row['spent']
+            entry['total'] += row['spent']
+            totals[index] += row['spent']
 
-        totals = {
-            'spent': total_spent,
-            'budget': total_budget,
-            'remaining': total_budget - total_spent
+        return {
+            'interval': interval,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'buckets': [bucket.isoformat() for bucket in buckets],
+            'series': sorted(series.values(), key=lambda entry: (entry['category'], entry['category_id'])),
+            'totals': totals,
         }
 
-        return Response({
-            'summary': summary,
-            'totals': totals
-        })
+    def spend_rows(self, user, interval, start_date, end_date, buckets, category=None):
+        """One row per bucket and category with spend, grouped in the database"""
+        rows = []
+        ranges = [(start_date, end_date)]
+        if interval == 'month':
+            # Months wholly inside the range come from the spend rollup, like the summary;
+            # only partial months at either end are aggregated from raw transactions
+            whole = [bucket for bucket in buckets if start_date <= bucket and month_last_day(bucket) <= end_date]
+            if whole:
+                rollups = SpendRollup.objects.filter(
+                    user=user, count__gt=0, category__type='expense', period__gte=spend_period(whole[0]), period__lte=spend_period(whole[-1])
+                )
+                if category is not None:
+                    rollups = rollups.filter(category_id=category)
+                rows = [
+                    {'bucket': date(*parse_period(period), 1), 'category_id': category_id, 'category__name': name, 'spent': total}
+                    for period, category_id, name, total in rollups.values_list('period', 'category_id', 'category__name', 'total')
+                ]
+                ranges = []
+                if start_date < whole[0]:
+                    ranges.append((start_date, whole[0] - timedelta(days=1)))
+                if month_last_day(whole[-1]) < end_date:
+                    ranges.append((month_last_day(whole[-1]) + timedelta(days=1), end_date))
+                if not ranges:
+                    return rows
+
+        in_range = Q()
+        for first, last in ranges:
+            in_range |= Q(date__gte=first, date__lte=last)
+        # Income is not spending, as in the summary and health score
+        transactions = Transaction.objects.filter(in_range, user=user, category__type='expense')
+        if category is not None:
+            transactions = transactions.filter(category_id=category)
+        if interval == 'day':
+            transactions = transactions.annotate(bucket=F('date'))
+        else:
+            transactions = transactions.annotate(bucket=self.truncators[interval]('date'))
+        return rows + list(transactions.values('bucket', 'category_id', 'category__name').annotate(
+            spent=Sum('home_amount')
+        ).order_by())
 
 
-class FinancialHealthScoreView(APIView):
+class CashFlowView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 3
     serializer_class = None  # Will be handled by @extend_schema
 
     @extend_schema(
-        summary="Get financial health score",
-        description="Calculate a financial health score (0-100) based on budget adherence for the current month.",
+        summary="Get cash flow",
+        description=(
+            "Income, expenses, net and savings rate (net as a percentage of income) per month, "
+            "based on each category's type. Supports the same date filters as the summary."
+        ),
+        parameters=[
+            OpenApiParameter(name='start_date', type=OpenApiTypes.DATE, description='Start date filter (YYYY-MM-DD)'),
+            OpenApiParameter(name='end_date', type=OpenApiTypes.DATE, description='End date filter (YYYY-MM-DD)'),
+            OpenApiParameter(name='month', type=OpenApiTypes.INT, description='Month filter (1-12)'),
+            OpenApiParameter(name='year', type=OpenApiTypes.INT, description='Year filter (e.g., 2024)'),
+        ],
         responses={
             200: {
                 "type": "object",
                 "properties": {
-                    "score": {"type": "integer", "minimum": 0, "maximum": 100},
-                    "message": {"type": "string"}
+                    "periods": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "period": {"type": "string"},
+                                "income": {"type": "number"},
+                                "expenses": {"type": "number"},
+                                "net": {"type": "number"},
+                                "savings_rate": {"type": "number", "nullable": True}
+                            }
+                        }
+                    },
+                    "totals": {
+                        "type": "object",
+                        "properties": {
+                            "income": {"type": "number"},
+                            "expenses": {"type": "number"},
+                            "net": {"type": "number"},
+                            "savings_rate": {"type": "number", "nullable": True}
+                        }
+                    }
                 }
             }
         }
     )
     def get(self, request):
         user = request.user
-        # Calculate total spent and total budget for the current month
-        today = datetime.today()
-        period = today.strftime('%Y-%m')
-        transactions = Transaction.objects.filter(user=user, date__month=today.month, date__year=today.year)
-        spent = transactions.aggregate(total=Sum('amount'))['total'] or 0
-        budgets = Budget.objects.filter(user=user, period=period)
-        budget_total = budgets.aggregate(total=Sum('amount'))['total'] or 0
-        
-        overspending = 0
-        if budget_total > 0:
-            overspending = max(0, (spent - budget_total) / budget_total)
-        
-        score = max(0, 100 - int(overspending * 100))
-        
-        if score >= 90:
-            message = "Excellent! You're well within your budgets."
-        elif score >= 75:
-            message = "Good job! You're within most of your budgets."
-        elif score >= 50:
-            message = "Caution: You're approaching your budget limits."
-        else:
-            message = "Warning: You're overspending. Review your budgets."
-        
-        return Response({
-            'score': score,
-            'message': message
-        })
+        try:
+            filters = parse_date_filters(request.query_params)
+        except ValueError as exc:
+            return Response({
+                'error': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(cached_report(
+            'cash-flow', user.id, request.query_params, lambda: cash_flow(user, filters)
+        ))
+
+
+health_score_schema = extend_schema(
+    summary="Get financial health score",
+    description=(
+        "Calculate a financial health score (0-100) based on budget adherence for the current month. "
+        "Today's score is computed live, earlier days come from the nightly snapshots (newest first)."
+    ),
+    parameters=[
+        OpenApiParameter(name='days', type=OpenApiTypes.INT, description='Days of history to return (default 30, max 366)'),
+    ],
+    responses={
+        200: {
+            "type": "object",
+            "properties": {
+                "date": {"type": "string", "format": "date"},
+                "score": {"type": "integer", "minimum": 0, "maximum": 100},
+                "message": {"type": "string"},
+                "history": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "date": {"type": "string", "format": "date"},
+                            "score": {"type": "integer", "minimum": 0, "maximum": 100},
+                            "message": {"type": "string"}
+                        }
+                    }
+                }
+            }
+        }
+    }
+)
+
+
+class FinancialHealthScoreView(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    query_budget = 6
+    serializer_class = None  # Will be handled by @extend_schema
+    default_days = 30
+    max_days = 366
+
+    def get_etag_extra(self, request):
+        # The score covers the current month, so it changes with the date too. The snapshot
+        # job runs in another process, so a new snapshot shows up as a new latest date
+        # rather than as a data version bump
+        return (datetime.today().date().isoformat(), self.latest_snapshot(request.user))
+
+    def latest_snapshot(self, user):
+        if not hasattr(self, '_latest_snapshot'):
+            self._latest_snapshot = HealthScoreSnapshot.objects.filter(user=user).aggregate(latest=Max('date'))['latest']
+        return self._latest_snapshot
+
+    @health_score_schema
+    def get(self, request):
+        user = request.user
+        today = datetime.today().date()
+        try:
+            days = self.parse_days(request)
+        except ValueError:
+            return Response({
+                'error': f'days must be between 0 and {self.max_days}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(cached_report(
+            'health-score', user.id, request.query_params, lambda: self.score(user, today, days),
+            extra=self.get_etag_extra(request)
+        ))
+
+    def parse_days(self, request):
+        days = int(request.query_params.get('days', self.default_days))
+        if not 0 <= days <= self.max_days:
+            raise ValueError(days)
+        return days
+
+    def score(self, user, today, days):
+        # Only the current, partial day is computed live
+        live = score_users(user.id, user.id, today)[0]
+        return health_report(today, live, self.history(user, today, days))
+
+    def history(self, user, today, days):
+        return HealthScoreSnapshot.objects.filter(
+            user=user, date__lt=today, date__gte=today - timedelta(days=days)
+        ).order_by('-date').values('date', 'score')
+
+
+class AsyncFinancialHealthScoreView(FinancialHealthScoreView, AsyncAPIView):
+    """``FinancialHealthScoreView`` on the async ORM, for ASGI deployments"""
+
+    @health_score_schema
+    async def get(self, request):
+        user = request.user
+        today = datetime.today().date()
+        try:
+            days = self.parse_days(request)
+        except ValueError:
+            return Response({
+                'error': f'days must be between 0 and {self.max_days}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(await acached_report(
+            'health-score', user.id, request.query_params, lambda: self.ascore(user, today, days),
+            extra=await sync_to_async(self.get_etag_extra)(request)
+        ))
+
+    async def ascore(self, user, today, days):
+        live = (await ascore_users(user.id, user.id, today))[0]
+        return health_report(today, live, [row async for row in self.history(user, today, days)])
+
+
+def health_report(today, live, history):
+    return {
+        'date': today.isoformat(),
+        'score': live.score,
+        'message': health_message(live.score),
+        'history': [
+            {'date': row['date'].isoformat(), 'score': row['score'], 'message': health_message(row['score'])}
+            for row in history
+        ]
+    }
@@ -0,0 +1,42 @@
+import csv
+import json
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_COLUMNS = ('id', 'date', 'category_id', 'category', 'category_type', 'amount', 'currency', 'home_amount', 'description')
+EXPORT_FIELDS = ('id', 'date', 'category_id', 'category__name', 'category__type', 'amount', 'currency', 'home_amount', 'description')
+
+
+class Echo:
+	"""File-like object whose write() hands the formatted line back to the caller"""
+
+	def write(self, value):
+		return value
+
+
+def export_rows(queryset, chunk_size=2000):
+	"""Stream (id, date, ...) tuples from a server-side cursor without building model instances"""
+	return queryset.order_by('date', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(rows):
+	writer = csv.writer(Echo())
+	yield writer.writerow(EXPORT_COLUMNS)
+	for txn_id, txn_date, category_id, category, category_type, amount, currency, home_amount, description in rows:
+		yield writer.writerow((
+			txn_id, txn_date.isoformat(), category_id, category, category_type, amount, currency, home_amount, description
+		))
+
+
+def iter_ndjson(rows):
+	for txn_id, txn_date, category_id, category, category_type, amount, currency, home_amount, description in rows:
+		yield json.dumps({
+			'id': txn_id,
+			'date': txn_date.isoformat(),
+			'category_id': category_id,
+			'category': category,
+			'category_type': category_type,
+			'amount': str(amount),
+			'currency': currency,
+			'home_amount': str(home_amount),
+			'description': description,
+		}) + '\n'
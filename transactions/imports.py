@@ -0,0 +1,202 @@
+import codecs
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from django.db import transaction as db_transaction
+from transactions.models import SpendRollup, Transaction, spend_period
+from transactions.serializers import build_budget_alert, build_budget_spend_map
+from users.models import home_currency
+from utils.cache import bump_data_version
+from utils.rates import HistoricalConverter, UnknownCurrencyError
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+MAX_AMOUNT = Decimal('10') ** 10  # max_digits=12, decimal_places=2
+
+
+class ImportFormatError(Exception):
+	"""The upload could not be parsed as the requested format."""
+
+
+def detect_format(name, requested=None):
+	"""Pick the import format from an explicit value or the uploaded file's extension"""
+	if requested:
+		requested = requested.lower()
+		if requested in ('ndjson', 'json'):
+			requested = 'jsonl'
+		if requested not in IMPORT_FORMATS:
+			raise ImportFormatError(f"Unsupported format {requested!r}, expected csv or jsonl.")
+		return requested
+	extension = (name or '').rsplit('.', 1)[-1].lower()
+	if extension == 'csv':
+		return 'csv'
+	if extension in ('jsonl', 'ndjson', 'json'):
+		return 'jsonl'
+	raise ImportFormatError('Could not detect the file format, pass file_format=csv or file_format=jsonl.')
+
+
+def iter_rows(upload, file_format):
+	"""Yield (row_number, dict) pairs without reading the whole upload into memory"""
+	lines = codecs.iterdecode(upload, 'utf-8-sig')
+	if file_format == 'csv':
+		reader = csv.DictReader(lines)
+		for number, row in enumerate(reader, start=1):
+			yield number, row
+		return
+	number = 0
+	for line in lines:
+		if not line.strip():
+			continue
+		number += 1
+		try:
+			row = json.loads(line)
+		except ValueError:
+			row = None
+		yield number, row if isinstance(row, dict) else None
+
+
+class TransactionImporter:
+	"""
+	Validate and insert uploaded rows for one user.
+
+	Categories are resolved through a single lookup map, valid rows are written with
+	bulk_create in batches inside one database transaction, and the spend rollup and
+	budget alerts are updated once per affected (category, period) at the end. Rows in
+	another currency are converted to the user's home currency with one rate lookup per
+	(currency, date); RateProviderError escapes when a needed rate cannot be fetched.
+	Every row is validated and converted before the transaction opens, so a live rate
+	fetch never holds the database write lock.
+	"""
+
+	def __init__(self, user, batch_size=1000, max_errors=1000):
+		self.user = user
+		self.batch_size = batch_size
+		self.max_errors = max_errors
+		self.created = 0
+		self.failed = 0
+		self.errors = []
+		self.deltas = {}
+		self.converter = HistoricalConverter(home_currency(user))
+
+		categories = list(user.categories.all())
+		self.categories_by_id = {category.id: category for category in categories}
+		self.categories_by_name = {}
+		for category in categories:
+			key = category.name.strip().lower()
+			# Ambiguous names can only be imported by id
+			self.categories_by_name[key] = None if key in self.categories_by_name else category
+
+	def clean_row(self, row):
+		"""Return (Transaction, None) for a valid row or (None, errors)"""
+		if row is None:
+			return None, {'row': ['Row is not a JSON object.']}
+		errors = {}
+
+		category = None
+		category_id = row.get('category_id')
+		category_name = row.get('category')
+		if category_id not in (None, ''):
+			try:
+				category = self.categories_by_id.get(int(category_id))
+			except (TypeError, ValueError):
+				pass
+			if category is None:
+				errors['category_id'] = ['Invalid category.']
+		elif category_name not in (None, ''):
+			category = self.categories_by_name.get(str(category_name).strip().lower())
+			if category is None:
+				errors['category'] = ['Unknown or ambiguous category name.']
+		else:
+			errors['category_id'] = ['This field is required.']
+
+		try:
+			amount = Decimal(str(row.get('amount', '')).strip())
+			if not amount.is_finite():
+				raise InvalidOperation
+		except (InvalidOperation, ValueError):
+			errors['amount'] = ['A valid number is required.']
+		else:
+			if amount <= 0:
+				errors['amount'] = ['Amount must be positive.']
+			elif amount >= MAX_AMOUNT or amount.as_tuple().exponent < -2:
+				errors['amount'] = ['Ensure there are no more than 12 digits and 2 decimal places.']
+
+		try:
+			txn_date = date.fromisoformat(str(row.get('date', '')).strip())
+		except ValueError:
+			errors['date'] = ['Date has wrong format. Use YYYY-MM-DD.']
+
+		currency = str(row.get('currency') or '').strip().upper()
+		if currency and (len(currency) != 3 or not currency.isalpha()):
+			errors['currency'] = ['Currency codes must be 3 letters (e.g., USD, KES).']
+
+		if errors:
+			return None, errors
+		description = row.get('description') or ''
+		txn = Transaction(
+			user=self.user,
+			category=category,
+			amount=amount,
+			currency=currency,
+			date=txn_date,
+			description=str(description)
+		)
+		try:
+			txn.convert_to_home_currency(self.converter)
+		except UnknownCurrencyError as exc:
+			return None, {'currency': [f'{exc}.']}
+		return txn, None
+
+	def add_error(self, number, errors):
+		self.failed += 1
+		if len(self.errors) < self.max_errors:
+			self.errors.append({'row': number, 'errors': errors})
+
+	def flush(self, batch):
+		if not batch:
+			return
+		Transaction.objects.bulk_create(batch, batch_size=self.batch_size)
+		for txn in batch:
+			key = (self.user.id, txn.category_id, spend_period(txn.date))
+			total, count = self.deltas.get(key, (Decimal('0.00'), 0))
+			self.deltas[key] = (total + txn.home_amount, count + 1)
+		self.created += len(batch)
+
+	def run(self, rows):
+		valid = []
+		for number, row in rows:
+			txn, errors = self.clean_row(row)
+			if errors:
+				self.add_error(number, errors)
+				continue
+			valid.append(txn)
+
+		with db_transaction.atomic():
+			for start in range(0, len(valid), self.batch_size):
+				self.flush(valid[start:start + self.batch_size])
+
+			# bulk_create bypasses Transaction.save(), apply the rollup once per key
+			for (user_id, category_id, period), (total, count) in self.deltas.items():
+				SpendRollup.objects.adjust(user_id, category_id, period, total, count)
+		if self.created:
+			bump_data_version(self.user.id)
+		return self.result()
+
+	def budget_alerts(self):
+		"""One alert check per affected (category, period), not per imported row"""
+		keys = {(category_id, period) for _, category_id, period in self.deltas}
+		alerts = []
+		for (category_id, period), (budget_amount, total_spent) in sorted(build_budget_spend_map(self.user, keys).items()):
+			alert = build_budget_alert(self.categories_by_id[category_id].name, budget_amount, total_spent)
+			if alert:
+				alerts.append({'category_id': category_id, 'period': period, **alert})
+		return alerts
+
+	def result(self):
+		return {
+			'created': self.created,
+			'failed': self.failed,
+			'errors': self.errors,
+			'errors_truncated': self.failed > len(self.errors),
+			'budget_alerts': self.budget_alerts(),
+		}
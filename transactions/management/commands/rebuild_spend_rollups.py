@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from transactions.models import SpendRollup
+
+
+class Command(BaseCommand):
+	help = "Rebuild the per-user monthly spend rollup from the Transaction table and verify it."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Limit to this user id (repeatable)')
+		parser.add_argument('--verify-only', action='store_true', help='Only compare the rollup with raw aggregates')
+
+	def handle(self, *args, **options):
+		user_ids = options['user_ids']
+
+		if not options['verify_only']:
+			written = SpendRollup.objects.rebuild(user_ids)
+			self.stdout.write(f"Rebuilt {written} rollup rows.")
+
+		mismatches = SpendRollup.objects.mismatches(user_ids)
+		for (user_id, category_id, period), (stored, raw) in sorted(mismatches.items()):
+			self.stderr.write(
+				f"user={user_id} category={category_id} period={period}: "
+				f"rollup total={stored[0]} count={stored[1]}, raw total={raw[0]} count={raw[1]}"
+			)
+		if mismatches:
+			raise CommandError(f"{len(mismatches)} rollup rows do not match the raw aggregates.")
+		self.stdout.write(self.style.SUCCESS("Rollup matches raw transaction aggregates."))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:40
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_rollups(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    SpendRollup = apps.get_model('transactions', 'SpendRollup')
+    rows = Transaction.objects.annotate(month=TruncMonth('date')).values(
+        'user_id', 'category_id', 'month'
+    ).annotate(total=Sum('amount'), count=Count('id'))
+    SpendRollup.objects.bulk_create([
+        SpendRollup(
+            user_id=row['user_id'],
+            category_id=row['category_id'],
+            period=row['month'].strftime('%Y-%m'),
+            total=row['total'],
+            count=row['count'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('transactions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=7)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spend_rollups', to='categories.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spend_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'category', 'period')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
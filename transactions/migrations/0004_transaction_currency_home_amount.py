@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:10
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_home_amounts(apps, schema_editor):
+    # Every existing row was entered in the single currency the app used to assume
+    Transaction = apps.get_model('transactions', 'Transaction')
+    Transaction.objects.update(
+        currency=getattr(settings, 'DEFAULT_HOME_CURRENCY', 'USD'),
+        home_amount=F('amount'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='currency',
+            field=models.CharField(default='', max_length=3),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='home_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=18, null=True),
+        ),
+        migrations.RunPython(backfill_home_amounts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='transaction',
+            name='home_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=18),
+        ),
+        migrations.AlterField(
+            model_name='spendrollup',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18),
+        ),
+    ]
@@ -1,13 +1,257 @@
-from django.db import models
+from decimal import Decimal
+from django.db import connections, models, transaction as db_transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
 from django.contrib.auth.models import User
 from categories.models import Category
+from users.models import home_currency
+from utils.cache import bump_data_version
+from utils.rates import HistoricalConverter
+
+
+def spend_period(value):
+	"""Return the YYYY-MM budget period a transaction date falls in"""
+	return value.strftime('%Y-%m')
+
+
+class SpendRollupManager(models.Manager):
+	def adjust(self, user_id, category_id, period, amount, count):
+		"""
+		Apply an incremental change to one (user, category, period) rollup row.
+
+		A single ``INSERT ... ON CONFLICT DO UPDATE`` (PostgreSQL and SQLite 3.24+), so two
+		writers creating the same row at once add up instead of one failing on the unique
+		constraint. The ORM's ``update_conflicts`` can only overwrite, not increment.
+		"""
+		connection = connections[self.db]
+		meta = self.model._meta
+		quote = connection.ops.quote_name
+		table = quote(meta.db_table)
+		user, category, period_col, total, count_col = (
+			quote(meta.get_field(name).column) for name in ('user', 'category', 'period', 'total', 'count')
+		)
+		with connection.cursor() as cursor:
+			cursor.execute(
+				f'INSERT INTO {table} ({user}, {category}, {period_col}, {total}, {count_col}) '
+				f'VALUES (%s, %s, %s, %s, %s) '
+				f'ON CONFLICT ({user}, {category}, {period_col}) DO UPDATE SET '
+				f'{total} = {table}.{total} + EXCLUDED.{total}, {count_col} = {table}.{count_col} + EXCLUDED.{count_col}',
+				[user_id, category_id, period, meta.get_field('total').get_db_prep_save(amount, connection), count]
+			)
+
+	def raw_totals(self, user_ids=None):
+		"""Aggregate spend straight from the Transaction table, keyed like the rollup"""
+		transactions = Transaction.objects.all()
+		if user_ids is not None:
+			transactions = transactions.filter(user_id__in=user_ids)
+		rows = transactions.annotate(month=TruncMonth('date')).values(
+			'user_id', 'category_id', 'month'
+		).annotate(total=Sum('home_amount'), count=Count('id'))
+		return {
+			(row['user_id'], row['category_id'], spend_period(row['month'])): (row['total'], row['count'])
+			for row in rows
+		}
+
+	def rebuild(self, user_ids=None):
+		"""Recompute rollup rows from scratch; returns the number of rows written"""
+		totals = self.raw_totals(user_ids)
+		with db_transaction.atomic():
+			existing = self.all()
+			if user_ids is not None:
+				existing = existing.filter(user_id__in=user_ids)
+			existing.delete()
+			self.bulk_create([
+				SpendRollup(user_id=user_id, category_id=category_id, period=period, total=total, count=count)
+				for (user_id, category_id, period), (total, count) in totals.items()
+			], batch_size=1000)
+		return len(totals)
+
+	def mismatches(self, user_ids=None):
+		"""Compare rollup rows with raw aggregates; returns {key: (rollup, raw)} for every difference"""
+		raw = self.raw_totals(user_ids)
+		rollups = self.all()
+		if user_ids is not None:
+			rollups = rollups.filter(user_id__in=user_ids)
+		stored = {
+			(row.user_id, row.category_id, row.period): (row.total, row.count)
+			for row in rollups
+			if row.count
+		}
+		empty = (Decimal('0.00'), 0)
+		return {
+			key: (stored.get(key, empty), raw.get(key, empty))
+			for key in stored.keys() | raw.keys()
+			if stored.get(key, empty) != raw.get(key, empty)
+		}
+
+
+class SpendRollup(models.Model):
+	"""Running spend total and transaction count per user, category and YYYY-MM period"""
+	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='spend_rollups')
+	category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='spend_rollups')
+	period = models.CharField(max_length=7)  # YYYY-MM format, matches Budget.period
+	total = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+	count = models.IntegerField(default=0)
+
+	objects = SpendRollupManager()
+
+	class Meta:
+		unique_together = ('user', 'category', 'period')
+		indexes = [
+			models.Index(fields=['user', 'period'], name='rollup_user_period_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.user_id} - {self.category_id} - {self.period}: {self.total}"
+
+
+class TransactionQuerySet(models.QuerySet):
+	def lock_rollup_deltas(self):
+		"""
+		Lock the matched rows (``SELECT ... FOR UPDATE``) and return what they contribute to
+		the rollup, as {(user, category, period): (total, count)}. Call inside the transaction
+		that then writes through the same filter, so the rows cannot change in between.
+		"""
+		deltas = {}
+		rows = self.order_by().select_for_update().values_list('user_id', 'category_id', 'date', 'home_amount')
+		# Streamed in chunks, a batch can cover every transaction a user has
+		for user_id, category_id, day, home_amount in rows.iterator(chunk_size=2000):
+			key = (user_id, category_id, spend_period(day))
+			total, count = deltas.get(key, (Decimal('0.00'), 0))
+			deltas[key] = (total + home_amount, count + 1)
+		return deltas
+
+	def batch_update(self, **changes):
+		"""
+		Apply ``changes`` (``category_id`` and/or ``description``) with a single UPDATE and
+		move the rows' spend between rollup rows; returns the number of rows updated.
+		"""
+		with db_transaction.atomic():
+			deltas = self.lock_rollup_deltas()
+			updated = self.update(**changes)
+			new_category_id = changes.get('category_id')
+			for (user_id, category_id, period), (total, count) in deltas.items():
+				if new_category_id is not None and category_id != new_category_id:
+					SpendRollup.objects.adjust(user_id, category_id, period, -total, -count)
+					SpendRollup.objects.adjust(user_id, new_category_id, period, total, count)
+		for user_id in {key[0] for key in deltas}:
+			bump_data_version(user_id)
+		return updated
+
+	def batch_delete(self):
+		"""Delete the matched rows with a single DELETE and subtract them from the rollup"""
+		with db_transaction.atomic():
+			deltas = self.lock_rollup_deltas()
+			deleted, _ = self.delete()
+			for (user_id, category_id, period), (total, count) in deltas.items():
+				SpendRollup.objects.adjust(user_id, category_id, period, -total, -count)
+		for user_id in {key[0] for key in deltas}:
+			bump_data_version(user_id)
+		return deleted
+
+	def converted_to(self, currency):
+		"""
+		The matched rows with ``home_amount`` recomputed in ``currency``, for a home
+		currency change. Nothing is saved; raises like ``HistoricalConverter.convert``.
+		"""
+		converter = HistoricalConverter(currency)
+		transactions = list(self.only('id', 'user', 'amount', 'currency', 'date'))
+		for txn in transactions:
+			txn.home_amount = converter.convert(txn.amount, txn.currency, txn.date)
+		return transactions
+
 
 class Transaction(models.Model):
 	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions')
 	category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='transactions')
 	amount = models.DecimalField(max_digits=12, decimal_places=2)
+	currency = models.CharField(max_length=3)  # ISO 4217 code of ``amount``
+	# ``amount`` in the owner's home currency at the rate on ``date``, fixed at write time.
+	# Rollups, reports and budget alerts all sum this column.
+	home_amount = models.DecimalField(max_digits=18, decimal_places=2)
 	date = models.DateField()
 	description = models.TextField(blank=True)
 
+	objects = TransactionQuerySet.as_manager()
+
+	class Meta:
+		indexes = [
+			# Alert/budget spend lookups: (user, category, date range)
+			models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+			# Reports and listings: (user, date range)
+			models.Index(fields=['user', 'date'], name='txn_user_date_idx'),
+		]
+
 	def __str__(self):
 		return f"{self.category.name}: {self.amount}"
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# Remember whether home_amount has to be converted again on save
+		if not instance.get_deferred_fields() & {'amount', 'currency', 'date'}:
+			instance._converted_from = instance._get_conversion_inputs()
+		return instance
+
+	def _get_rollup_state(self):
+		date = self._meta.get_field('date').to_python(self.date)
+		home_amount = self._meta.get_field('home_amount').to_python(self.home_amount)
+		return (self.user_id, self.category_id, spend_period(date), home_amount)
+
+	def _get_conversion_inputs(self):
+		return (
+			self._meta.get_field('amount').to_python(self.amount),
+			self.currency,
+			self._meta.get_field('date').to_python(self.date),
+		)
+
+	def convert_to_home_currency(self, converter=None):
+		"""
+		Set ``home_amount`` from the rate on ``date``. A blank ``currency`` means the
+		owner's home currency. Raises UnknownCurrencyError or RateProviderError.
+		"""
+		if converter is None:
+			converter = HistoricalConverter(home_currency(self.user))
+		self.currency = (self.currency or converter.currency).upper()
+		amount, currency, date = self._get_conversion_inputs()
+		self.home_amount = converter.convert(amount, currency, date)
+		self._converted_from = (amount, currency, date)
+
+	def _get_stored_rollup_state(self):
+		# Read from the row itself, locked until the write commits, rather than from this
+		# instance: another writer may have changed the row since it was loaded
+		if self.pk is None:
+			return None
+		stored = Transaction.objects.select_for_update().filter(pk=self.pk).values_list(
+			'user_id', 'category_id', 'date', 'home_amount'
+		).first()
+		if stored is None:
+			return None
+		user_id, category_id, date, home_amount = stored
+		return (user_id, category_id, spend_period(date), home_amount)
+
+	def save(self, *args, **kwargs):
+		# Rates are looked up before the write transaction opens
+		if self.home_amount is None or getattr(self, '_converted_from', None) != self._get_conversion_inputs():
+			self.convert_to_home_currency()
+		with db_transaction.atomic():
+			previous = None if self._state.adding else self._get_stored_rollup_state()
+			super().save(*args, **kwargs)
+			current = self._get_rollup_state()
+			if previous is not None and previous[:3] == current[:3]:
+				if previous[3] != current[3]:
+					SpendRollup.objects.adjust(*current[:3], current[3] - previous[3], 0)
+			else:
+				if previous is not None:
+					SpendRollup.objects.adjust(*previous[:3], -previous[3], -1)
+				SpendRollup.objects.adjust(*current[:3], current[3], 1)
+		bump_data_version(self.user_id)
+
+	def delete(self, *args, **kwargs):
+		with db_transaction.atomic():
+			previous = self._get_stored_rollup_state()
+			result = super().delete(*args, **kwargs)
+			if previous is not None:
+				SpendRollup.objects.adjust(*previous[:3], -previous[3], -1)
+		bump_data_version(self.user_id)
+		return result
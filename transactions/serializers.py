@@ -1,20 +1,25 @@
 from rest_framework import serializers
-from transactions.models import Transaction
+from transactions.models import SpendRollup, Transaction, spend_period
 from categories.serializers import CategorySerializer
 from budgets.models import Budget
-from django.db.models import Sum
 from datetime import datetime
 from drf_spectacular.utils import extend_schema_field
+from utils.periods import filter_by_date
+from utils.profiling import ProfiledSerializerMixin
+from utils.serializers import CurrencyCodeField, conversion_errors
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
 	from categories.models import Category
 	category = CategorySerializer(read_only=True)
 	category_id = serializers.PrimaryKeyRelatedField(queryset=Category.objects.none(), write_only=True, source='category', required=True)
+	# Defaults to the user's home currency
+	currency = CurrencyCodeField(required=False)
 	budget_alert = serializers.SerializerMethodField(read_only=True)
 
 	class Meta:
 		model = Transaction
-		fields = ['id', 'category', 'category_id', 'amount', 'date', 'description', 'budget_alert']
+		fields = ['id', 'category', 'category_id', 'amount', 'currency', 'home_amount', 'date', 'description', 'budget_alert']
+		read_only_fields = ['home_amount']
 
 	def __init__(self, *args, **kwargs):
 		user = kwargs.pop('user', None)
@@ -28,6 +33,15 @@ class TransactionSerializer(serializers.ModelSerializer):
 			raise serializers.ValidationError('Amount must be positive.')
 		return value
 
+	def create(self, validated_data):
+		# Transaction.save() converts to the home currency, unknown codes surface as 400s
+		with conversion_errors():
+			return super().create(validated_data)
+
+	def update(self, instance, validated_data):
+		with conversion_errors():
+			return super().update(instance, validated_data)
+
 	@extend_schema_field(serializers.JSONField(allow_null=True))
 	def get_budget_alert(self, obj):
 		"""Check if spending is nearing or exceeding budget for the category and month"""
@@ -38,6 +52,15 @@ class TransactionSerializer(serializers.ModelSerializer):
 		transaction_date = obj.date
 		period = transaction_date.strftime('%Y-%m')
 		
+		# List views precompute budgets and spend for the whole page
+		alert_map = self.context.get('budget_alert_map')
+		if alert_map is not None:
+			entry = alert_map.get((obj.category_id, period))
+			if entry is None:
+				return None
+			budget_amount, total_spent = entry
+			return build_budget_alert(obj.category.name, budget_amount, total_spent)
+		
 		# Find budget for this category and period
 		try:
 			budget = Budget.objects.get(
@@ -48,28 +71,137 @@ class TransactionSerializer(serializers.ModelSerializer):
 		except Budget.DoesNotExist:
 			return None
 		
-		# Calculate total spending for this category in this period
-		total_spent = Transaction.objects.filter(
+		# Read total spending for this category in this period from the rollup
+		total_spent = SpendRollup.objects.filter(
 			user=self.user,
-			category=obj.category,
-			date__year=transaction_date.year,
-			date__month=transaction_date.month
-		).aggregate(total=Sum('amount'))['total'] or 0
-		
-		# Calculate percentage used
-		budget_amount = float(budget.amount)
-		spent_percentage = (float(total_spent) / budget_amount) * 100
-		
-		# Generate alerts based on thresholds
-		if spent_percentage > 100:
-			return {
-				"type": "exceeded",
-				"message": f"Warning: You have exceeded your {obj.category.name} budget by {spent_percentage - 100:.1f}%! Spent: {total_spent}, Budget: {budget_amount}"
-			}
-		elif spent_percentage >= 80:
-			return {
-				"type": "near_limit",
-				"message": f"Caution: You have used {spent_percentage:.1f}% of your {obj.category.name} budget. Spent: {total_spent}, Budget: {budget_amount}"
-			}
+			category_id=obj.category_id,
+			period=period
+		).values_list('total', flat=True).first() or 0
 		
-		return None
+		return build_budget_alert(obj.category.name, budget.amount, total_spent)
+
+
+def build_budget_alert(category_name, budget_amount, total_spent):
+	"""Return the alert payload for a category budget, or None below the 80% threshold"""
+	# Calculate percentage used
+	budget_amount = float(budget_amount)
+	spent_percentage = (float(total_spent) / budget_amount) * 100
+	
+	# Generate alerts based on thresholds
+	if spent_percentage > 100:
+		return {
+			"type": "exceeded",
+			"message": f"Warning: You have exceeded your {category_name} budget by {spent_percentage - 100:.1f}%! Spent: {total_spent}, Budget: {budget_amount}"
+		}
+	elif spent_percentage >= 80:
+		return {
+			"type": "near_limit",
+			"message": f"Caution: You have used {spent_percentage:.1f}% of your {category_name} budget. Spent: {total_spent}, Budget: {budget_amount}"
+		}
+	
+	return None
+
+
+def build_budget_alert_map(user, transactions):
+	"""
+	Precompute budget amounts and spend totals for every (category, period) on a page.
+
+	Returns a dict keyed by (category_id, 'YYYY-MM') holding (budget_amount, total_spent)
+	for pairs that have a budget. Uses one query for budgets and one for the spend
+	rollup, regardless of how many transactions are being serialized.
+	"""
+	return build_budget_spend_map(user, {(txn.category_id, spend_period(txn.date)) for txn in transactions})
+
+
+def build_budget_spend_map(user, keys):
+	"""(budget_amount, total_spent) for each budgeted (category_id, period) in ``keys``"""
+	if not keys:
+		return {}
+
+	category_ids = {category_id for category_id, _ in keys}
+	periods = {period for _, period in keys}
+	budgets = {
+		(category_id, period): amount
+		for category_id, period, amount in Budget.objects.filter(
+			user=user,
+			category_id__in=category_ids,
+			period__in=periods
+		).values_list('category_id', 'period', 'amount')
+		if (category_id, period) in keys
+	}
+	if not budgets:
+		return {}
+
+	spent = {
+		(category_id, period): total
+		for category_id, period, total in SpendRollup.objects.filter(
+			user=user,
+			category_id__in={category_id for category_id, _ in budgets},
+			period__in={period for _, period in budgets}
+		).values_list('category_id', 'period', 'total')
+	}
+
+	return {
+		key: (amount, spent.get(key) or 0)
+		for key, amount in budgets.items()
+	}
+
+
+class TransactionBatchFilterSerializer(serializers.Serializer):
+	start_date = serializers.DateField(required=False)
+	end_date = serializers.DateField(required=False)
+	month = serializers.IntegerField(required=False, min_value=1, max_value=12)
+	year = serializers.IntegerField(required=False, min_value=1, max_value=9999)
+	category = serializers.IntegerField(required=False)
+
+	def validate(self, data):
+		if not data:
+			raise serializers.ValidationError('Give at least one of start_date, end_date, month, year or category.')
+		return data
+
+
+class TransactionBatchSerializer(serializers.Serializer):
+	"""Select transactions by an id list or by a filter, never by an empty selection"""
+	ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=10000)
+	filter = TransactionBatchFilterSerializer(required=False)
+
+	def validate(self, data):
+		if ('ids' in data) == ('filter' in data):
+			raise serializers.ValidationError('Give either ids or filter.')
+		return data
+
+	def get_queryset(self, user):
+		transactions = Transaction.objects.filter(user=user)
+		if 'ids' in self.validated_data:
+			return transactions.filter(id__in=self.validated_data['ids'])
+		filters = dict(self.validated_data['filter'])
+		category = filters.pop('category', None)
+		if category is not None:
+			transactions = transactions.filter(category_id=category)
+		return filter_by_date(transactions, **filters)
+
+
+class TransactionBatchUpdateSerializer(TransactionBatchSerializer):
+	from categories.models import Category
+	category_id = serializers.PrimaryKeyRelatedField(queryset=Category.objects.none(), required=False)
+	description = serializers.CharField(required=False, allow_blank=True)
+
+	def __init__(self, *args, **kwargs):
+		user = kwargs.pop('user', None)
+		super().__init__(*args, **kwargs)
+		if user:
+			self.fields['category_id'].queryset = user.categories.all()
+
+	def validate(self, data):
+		data = super().validate(data)
+		if 'category_id' not in data and 'description' not in data:
+			raise serializers.ValidationError('Give category_id and/or description to update.')
+		return data
+
+	def get_changes(self):
+		changes = {}
+		if 'category_id' in self.validated_data:
+			changes['category_id'] = self.validated_data['category_id'].id
+		if 'description' in self.validated_data:
+			changes['description'] = self.validated_data['description']
+		return changes
@@ -3,7 +3,25 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth.models import User
 from categories.models import Category
-from transactions.models import Transaction
+from transactions.models import SpendRollup, Transaction
+from transactions.serializers import TransactionSerializer
+from budgets.models import Budget
+import csv
+import json
+import sqlite3
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import override_settings
+from unittest import skipUnless
+from django.test.utils import CaptureQueriesContext
+from users.models import Profile
+from utils.models import ExchangeRate
+from utils.rates import get_rate_cache, reset_rate_cache
 
 class TransactionAPITests(APITestCase):
     def setUp(self):
@@ -25,7 +43,7 @@ class TransactionAPITests(APITestCase):
         url = reverse('transaction-list-create')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_update_transaction(self):
         txn = Transaction.objects.create(user=self.user, category=self.category, amount=10, date='2025-08-24')
@@ -49,3 +67,582 @@ class TransactionAPITests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('amount', response.data)
+
+
+class TransactionBudgetAlertListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alertuser', password='alertpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        self.rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        Budget.objects.create(user=self.user, category=self.food, amount=100, period='2025-07')
+        Budget.objects.create(user=self.user, category=self.food, amount=1000, period='2025-08')
+        Budget.objects.create(user=self.user, category=self.rent, amount=500, period='2025-08')
+
+    def _create_transactions(self, count):
+        rows = []
+        for i in range(count):
+            category = self.food if i % 2 else self.rent
+            rows.append(Transaction(user=self.user, category=category, amount=7, currency='USD', home_amount=7, date=date(2025, 7 + i % 3, 1 + i % 28)))
+        Transaction.objects.bulk_create(rows)
+        SpendRollup.objects.rebuild([self.user.id])
+
+    def test_list_query_count_is_constant(self):
+        self._create_transactions(10)
+        url = reverse('transaction-list-create')
+        with self.assertNumQueries(3):
+            self.client.get(url, {'page_size': 500})
+        self._create_transactions(200)
+        with self.assertNumQueries(3):
+            self.client.get(url, {'page_size': 500})
+
+    def test_list_alerts_match_per_transaction_alerts(self):
+        self._create_transactions(90)
+        response = self.client.get(reverse('transaction-list-create'), {'page_size': 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        listed = {row['id']: row['budget_alert'] for row in response.data['results']}
+
+        expected = {}
+        for txn in Transaction.objects.filter(user=self.user).select_related('category'):
+            expected[txn.id] = TransactionSerializer(txn, user=self.user).data['budget_alert']
+        self.assertEqual(listed, expected)
+        self.assertTrue(any(alert is not None for alert in listed.values()))
+
+
+class TransactionPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pageuser', password='pagepass')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Food', type='expense', user=self.user)
+        # Several rows share a date so the id tiebreaker matters
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=self.category, amount=1, currency='USD', home_amount=1, date=date(2025, 1 + i % 6, 1 + i % 3))
+            for i in range(47)
+        ])
+        self.expected = list(
+            Transaction.objects.filter(user=self.user).order_by('-date', '-id').values_list('id', flat=True)
+        )
+
+    def test_cursor_walks_every_row_once_in_order(self):
+        url, seen = reverse('transaction-list-create') + '?page_size=10', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 10)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_link_returns_to_earlier_page(self):
+        first = self.client.get(reverse('transaction-list-create'), {'page_size': 10})
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual([row['id'] for row in back.data['results']], self.expected[:10])
+
+    def test_page_size_is_capped(self):
+        with self.settings(API_MAX_PAGE_SIZE=20):
+            response = self.client.get(reverse('transaction-list-create'), {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_deep_page_costs_the_same_queries_as_first_page(self):
+        url = reverse('transaction-list-create')
+        # Page query plus the budget lookup for alerts (no budgets, so no rollup query)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'page_size': 5})
+        for _ in range(5):
+            response = self.client.get(response.data['next'])
+        with self.assertNumQueries(2):
+            self.client.get(response.data['next'])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('transaction-list-create'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SpendRollupTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='rollupuser', password='rolluppass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        self.rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+
+    def _rollup(self, category, period):
+        row = SpendRollup.objects.filter(user=self.user, category=category, period=period).first()
+        return (row.total, row.count) if row else (Decimal('0.00'), 0)
+
+    def test_create_update_delete_keep_rollup_current(self):
+        url = reverse('transaction-list-create')
+        first = self.client.post(url, {'category_id': self.food.id, 'amount': 40, 'date': '2025-08-02'}).data['id']
+        self.client.post(url, {'category_id': self.food.id, 'amount': 10, 'date': '2025-08-20'})
+        self.assertEqual(self._rollup(self.food, '2025-08'), (Decimal('50.00'), 2))
+
+        # Amount change within the same period
+        detail = reverse('transaction-detail', args=[first])
+        self.client.put(detail, {'category_id': self.food.id, 'amount': 45, 'date': '2025-08-02'})
+        self.assertEqual(self._rollup(self.food, '2025-08'), (Decimal('55.00'), 2))
+
+        # Moving to another category and month
+        self.client.put(detail, {'category_id': self.rent.id, 'amount': 45, 'date': '2025-09-01'})
+        self.assertEqual(self._rollup(self.food, '2025-08'), (Decimal('10.00'), 1))
+        self.assertEqual(self._rollup(self.rent, '2025-09'), (Decimal('45.00'), 1))
+
+        self.client.delete(detail)
+        self.assertEqual(self._rollup(self.rent, '2025-09'), (Decimal('0.00'), 0))
+        self.assertEqual(SpendRollup.objects.mismatches([self.user.id]), {})
+
+    def test_stale_instances_apply_deltas_from_the_stored_row(self):
+        txn = Transaction.objects.create(user=self.user, category=self.food, amount=40, date=date(2025, 8, 2))
+        first, second = Transaction.objects.get(pk=txn.pk), Transaction.objects.get(pk=txn.pk)
+        first.amount = 60
+        first.save()
+        # ``second`` still holds the amount it was loaded with
+        second.category, second.date = self.rent, date(2025, 9, 1)
+        second.save()
+        self.assertEqual(self._rollup(self.food, '2025-08'), (Decimal('0.00'), 0))
+        self.assertEqual(self._rollup(self.rent, '2025-09'), (Decimal('40.00'), 1))
+        first.delete()
+        second.delete()
+        self.assertEqual(self._rollup(self.rent, '2025-09'), (Decimal('0.00'), 0))
+        self.assertEqual(SpendRollup.objects.mismatches([self.user.id]), {})
+
+    def test_adjust_is_a_single_upsert(self):
+        for amount, count in [(Decimal('12.50'), 1), (Decimal('7.25'), 2), (Decimal('-2.75'), -1)]:
+            with self.assertNumQueries(1):
+                SpendRollup.objects.adjust(self.user.id, self.food.id, '2025-08', amount, count)
+        self.assertEqual(self._rollup(self.food, '2025-08'), (Decimal('17.00'), 2))
+        self.assertEqual(SpendRollup.objects.filter(user=self.user).count(), 1)
+
+    def test_rebuild_command_restores_and_verifies(self):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=self.food, amount=5, currency='USD', home_amount=5, date=date(2025, 8, day))
+            for day in range(1, 11)
+        ])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_spend_rollups', verify_only=True, stdout=StringIO(), stderr=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_spend_rollups', stdout=out)
+        self.assertIn('matches', out.getvalue())
+        self.assertEqual(self._rollup(self.food, '2025-08'), (Decimal('50.00'), 10))
+
+
+class QueryPlanIndexTests(APITestCase):
+    """EXPLAIN the queries hot endpoints run and check they are index searches, not table scans."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='planuser', password='planpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        Budget.objects.create(user=self.user, category=self.food, amount=100, period='2025-08')
+        Transaction.objects.create(user=self.user, category=self.food, amount=10, date='2025-08-02')
+
+    def _plans(self, queries, table):
+        plans = []
+        for query in queries:
+            sql = query['sql']
+            if table not in sql or not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.append(' | '.join(row[-1] for row in cursor.fetchall()))
+        self.assertTrue(plans, f'no queries against {table}')
+        return plans
+
+    def assertUsesIndex(self, plans, table, index_name=None):
+        for plan in plans:
+            self.assertNotRegex(plan, rf'SCAN {table}\b', plan)
+            if index_name:
+                self.assertIn(index_name, plan)
+
+    def test_report_date_range_query_uses_composite_index(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/reports/summary/', {'start_date': '2025-08-01', 'end_date': '2025-08-31'})
+        plans = self._plans(ctx.captured_queries, 'transactions_transaction')
+        # The per-category spend subquery seeks (user, category, date)
+        self.assertUsesIndex(plans, 'transactions_transaction', 'txn_user_category_date_idx')
+        self.assertUsesIndex(self._plans(ctx.captured_queries, 'budgets_budget'), 'budgets_budget')
+
+    def test_category_date_range_query_uses_composite_index(self):
+        queryset = Transaction.objects.filter(
+            user=self.user, category=self.food, date__gte='2025-08-01', date__lt='2025-09-01'
+        )
+        self.assertIn('txn_user_category_date_idx', queryset.explain())
+
+    def test_budget_period_query_uses_user_period_index(self):
+        self.assertIn('budget_user_period_idx', Budget.objects.filter(user=self.user, period='2025-08').explain())
+
+    def test_alert_queries_use_indexes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('transaction-list-create'), {
+                'category_id': self.food.id, 'amount': 75, 'date': '2025-08-10'
+            })
+        self.assertIsNotNone(response.data['budget_alert'])
+        self.assertUsesIndex(self._plans(ctx.captured_queries, 'budgets_budget'), 'budgets_budget')
+        self.assertUsesIndex(self._plans(ctx.captured_queries, 'transactions_spendrollup'), 'transactions_spendrollup')
+
+
+class TransactionImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='importuser', password='importpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        self.rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        other = User.objects.create_user(username='other', password='otherpass')
+        self.foreign = Category.objects.create(name='Theirs', type='expense', user=other)
+        Budget.objects.create(user=self.user, category=self.food, amount=100, period='2025-08')
+        self.url = reverse('transaction-import')
+
+    def _upload(self, name, content, **extra):
+        upload = SimpleUploadedFile(name, content.encode('utf-8'))
+        return self.client.post(self.url, {'file': upload, **extra}, format='multipart')
+
+    def test_csv_import_reports_counts_errors_and_alerts(self):
+        rows = ['category_id,amount,date,description']
+        rows += [f'{self.food.id},9.50,2025-08-{day:02d},Lunch' for day in range(1, 11)]
+        rows += [
+            f'{self.rent.id},500,2025-09-01,Rent',
+            f'{self.foreign.id},5,2025-08-01,Not mine',
+            f'{self.food.id},-3,2025-08-01,Negative',
+            f'{self.food.id},3,2025-02-30,Bad date',
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._upload('export.csv', '\n'.join(rows), batch_size=4)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 11)
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual([error['row'] for error in response.data['errors']], [12, 13, 14])
+        self.assertIn('category_id', response.data['errors'][0]['errors'])
+        self.assertEqual(response.data['budget_alerts'], [{
+            'category_id': self.food.id,
+            'period': '2025-08',
+            'type': 'near_limit',
+            'message': 'Caution: You have used 95.0% of your Food budget. Spent: 95.00, Budget: 100.0',
+        }])
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "transactions_transaction"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(SpendRollup.objects.mismatches([self.user.id]), {})
+
+    def test_jsonl_import_resolves_categories_by_name(self):
+        lines = [
+            '{"category": "food", "amount": 12.25, "date": "2025-08-03"}',
+            '',
+            'not json',
+            '{"category": "Unknown", "amount": 1, "date": "2025-08-03"}',
+        ]
+        response = self._upload('export.jsonl', '\n'.join(lines))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertEqual(Transaction.objects.get().amount, Decimal('12.25'))
+
+    def test_unknown_format_and_missing_file(self):
+        self.assertEqual(self._upload('export.xlsx', 'x').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.url, {}, format='multipart').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TransactionExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exportuser', password='exportpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        self.salary = Category.objects.create(name='Salary', type='income', user=self.user)
+        Transaction.objects.create(user=self.user, category=self.food, amount='12.50', date='2025-08-02', description='Lunch, with "friends"')
+        Transaction.objects.create(user=self.user, category=self.salary, amount=3000, date='2025-08-01')
+        Transaction.objects.create(user=self.user, category=self.food, amount=7, date='2024-08-15')
+        Transaction.objects.create(user=self.user, category=self.food, amount=9, date='2025-09-01')
+        self.url = reverse('transaction-export')
+
+    def _content(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_export_streams_all_rows_in_date_order(self):
+        content = self._content(self.client.get(self.url))
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0], [
+            'id', 'date', 'category_id', 'category', 'category_type', 'amount', 'currency', 'home_amount', 'description'
+        ])
+        self.assertEqual([row[1] for row in rows[1:]], ['2024-08-15', '2025-08-01', '2025-08-02', '2025-09-01'])
+        self.assertEqual(rows[3][5:], ['12.50', 'USD', '12.50', 'Lunch, with "friends"'])
+
+    def test_ndjson_export_with_report_filters(self):
+        response = self.client.get(self.url, {'file_format': 'ndjson', 'month': 8, 'category': self.food.id})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([(row['date'], row['amount']) for row in rows], [('2024-08-15', '7.00'), ('2025-08-02', '12.50')])
+
+        response = self.client.get(self.url, {'file_format': 'ndjson', 'start_date': '2025-08-02', 'end_date': '2025-08-31'})
+        self.assertEqual(len(self._content(response).splitlines()), 1)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'file_format': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'start_date': 'yesterday'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TransactionConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='etaguser', password='etagpass')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Food', type='expense', user=self.user)
+        Transaction.objects.create(user=self.user, category=self.category, amount=10, date=date(2024, 8, 1))
+        self.url = reverse('transaction-list-create')
+
+    def test_matching_etag_returns_304_without_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_etag_changes_with_writes_and_query(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'page_size': 1})['ETag'], etag)
+
+        Transaction.objects.create(user=self.user, category=self.category, amount=5, date=date(2024, 8, 2))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etags_are_per_user(self):
+        etag = self.client.get(self.url)['ETag']
+        other = User.objects.create_user(username='etagother', password='etagpass')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TransactionBatchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='batchuser', password='batchpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        self.rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        self.txns = [
+            Transaction.objects.create(user=self.user, category=self.food, amount=amount, date=txn_date)
+            for amount, txn_date in [(10, date(2025, 7, 5)), (20, date(2025, 8, 1)), (30, date(2025, 8, 20)), (40, date(2025, 9, 1))]
+        ]
+        other = User.objects.create_user(username='batchother', password='batchpass')
+        other_food = Category.objects.create(name='Food', type='expense', user=other)
+        self.other_txn = Transaction.objects.create(user=other, category=other_food, amount=5, date=date(2025, 8, 2))
+
+    def _rollup(self):
+        return {
+            (row.category_id, row.period): (row.total, row.count)
+            for row in SpendRollup.objects.filter(user=self.user, count__gt=0)
+        }
+
+    def test_update_by_filter_moves_rollup_spend(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('transaction-batch-update'), {
+                'filter': {'start_date': '2025-08-01', 'end_date': '2025-08-31'}, 'category_id': self.rent.id
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "transactions_transaction"') for query in ctx.captured_queries), 1)
+        self.assertEqual(set(Transaction.objects.filter(category=self.rent).values_list('amount', flat=True)), {20, 30})
+        self.assertEqual(self._rollup(), {
+            (self.food.id, '2025-07'): (Decimal('10.00'), 1),
+            (self.rent.id, '2025-08'): (Decimal('50.00'), 2),
+            (self.food.id, '2025-09'): (Decimal('40.00'), 1),
+        })
+        self.assertEqual(SpendRollup.objects.mismatches(), {})
+
+    def test_update_and_delete_by_ids_are_scoped_to_user(self):
+        ids = [self.txns[0].id, self.other_txn.id]
+        response = self.client.post(reverse('transaction-batch-update'), {'ids': ids, 'description': 'Groceries'}, format='json')
+        self.assertEqual(response.data, {'updated': 1})
+        self.assertEqual(Transaction.objects.get(id=self.txns[0].id).description, 'Groceries')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('transaction-batch-delete'), {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'deleted': 1})
+        self.assertEqual(sum(query['sql'].startswith('DELETE') for query in ctx.captured_queries), 1)
+        self.assertTrue(Transaction.objects.filter(id=self.other_txn.id).exists())
+        self.assertNotIn((self.food.id, '2025-07'), self._rollup())
+        self.assertEqual(SpendRollup.objects.mismatches(), {})
+
+    def test_delete_by_category_and_month(self):
+        response = self.client.post(reverse('transaction-batch-delete'), {
+            'filter': {'category': self.food.id, 'month': 8}
+        }, format='json')
+        self.assertEqual(response.data, {'deleted': 2})
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(SpendRollup.objects.mismatches(), {})
+
+    @skipUnless(connection.vendor == 'sqlite', 'lowers the SQLite bind parameter limit')
+    def test_filter_selection_is_not_bound_row_by_row(self):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=self.food, amount=1, currency='USD', home_amount=1, date=date(2025, 10, 1 + i % 28))
+            for i in range(300)
+        ])
+        SpendRollup.objects.rebuild([self.user.id])
+        connection.ensure_connection()
+        limit = connection.connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        connection.connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 100)
+        try:
+            response = self.client.post(reverse('transaction-batch-update'), {
+                'filter': {'year': 2025, 'month': 10}, 'category_id': self.rent.id
+            }, format='json')
+            self.assertEqual(response.data, {'updated': 300})
+            response = self.client.post(reverse('transaction-batch-delete'), {'filter': {'year': 2025}}, format='json')
+            self.assertEqual(response.data, {'deleted': 304})
+        finally:
+            connection.connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+        self.assertEqual(SpendRollup.objects.mismatches(), {})
+
+    def test_requires_a_selection(self):
+        for payload in [{}, {'filter': {}}, {'ids': []}, {'ids': [1], 'filter': {'month': 8}}, {'filter': {'year': 10000}}]:
+            response = self.client.post(reverse('transaction-batch-delete'), payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, payload)
+        response = self.client.post(reverse('transaction-batch-update'), {'ids': [self.txns[0].id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('transaction-batch-update'), {
+            'ids': [self.txns[0].id], 'category_id': self.other_txn.category_id
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+
+
+@override_settings(EXCHANGE_RATES={
+    'PROVIDER': 'utils.tests.FakeRateProvider',
+    'OPTIONS': {'rates': {'USD': '1', 'EUR': '0.5', 'KES': '130', 'JPY': '150'}},
+    'BASE_CURRENCY': 'USD',
+    'TTL': 3600,
+})
+class MultiCurrencyTransactionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='travelling', password='travelpass')
+        self.client.force_authenticate(user=self.user)
+        self.food = Category.objects.create(name='Food', type='expense', user=self.user)
+        reset_rate_cache()
+        ExchangeRate.objects.bulk_create([
+            ExchangeRate(date=date(2025, 1, 1), base='USD', quote='EUR', rate=Decimal('0.8')),
+            ExchangeRate(date=date(2025, 6, 1), base='USD', quote='EUR', rate=Decimal('0.9')),
+            ExchangeRate(date=date(2025, 6, 1), base='USD', quote='KES', rate=Decimal('125')),
+        ])
+        self.url = reverse('transaction-list-create')
+
+    def _create(self, amount, txn_date, **extra):
+        return self.client.post(self.url, {'category_id': self.food.id, 'amount': amount, 'date': txn_date, **extra})
+
+    def test_home_amount_uses_the_newest_stored_rate_on_or_before_the_date(self):
+        response = self._create('90', '2025-07-15', currency='eur')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['currency'], response.data['home_amount']), ('EUR', '100.00'))
+        response = self._create('80', '2025-05-31', currency='EUR')
+        self.assertEqual(response.data['home_amount'], '100.00')
+        response = self._create('250', '2025-07-01', currency='KES')
+        self.assertEqual(response.data['home_amount'], '2.00')
+        self.assertEqual(get_rate_cache().provider.calls, 0)
+        self.assertEqual(SpendRollup.objects.get(user=self.user, period='2025-07').total, Decimal('102.00'))
+
+    def test_three_decimal_home_currency_is_stored_to_two_places(self):
+        Profile.objects.create(user=self.user, home_currency='KWD')
+        ExchangeRate.objects.create(date=date(2025, 6, 1), base='USD', quote='KWD', rate=Decimal('0.3075'))
+        response = self._create('10', '2025-07-15', currency='USD')
+        self.assertEqual(response.data['home_amount'], '3.08')
+        txn = Transaction.objects.get(pk=response.data['id'])
+        self.assertEqual(txn.home_amount, Decimal('3.08'))
+        self.assertEqual(SpendRollup.objects.get(user=self.user, period='2025-07').total, Decimal('3.08'))
+        self.assertEqual(SpendRollup.objects.mismatches([self.user.id]), {})
+
+    def test_currency_defaults_to_the_home_currency(self):
+        response = self._create('12.50', '2025-07-15')
+        self.assertEqual((response.data['currency'], response.data['home_amount']), ('USD', '12.50'))
+
+    def test_only_current_dates_fall_back_to_the_live_table(self):
+        response = self._create('300', date.today().isoformat(), currency='JPY')
+        self.assertEqual(response.data['home_amount'], '2.00')
+        self.assertEqual(get_rate_cache().provider.calls, 1)
+        self.assertTrue(ExchangeRate.objects.filter(date=date.today(), base='USD', quote='JPY', rate=Decimal('150')).exists())
+        # A past date never borrows today's rate
+        response = self._create('10', '2024-12-31', currency='EUR')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['currency'], ['No stored rate for EUR on or before 2024-12-31.'])
+
+    def test_provider_outage_and_unknown_currency(self):
+        get_rate_cache().provider.fail = True
+        response = self._create('10', date.today().isoformat(), currency='JPY')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        get_rate_cache().provider.fail = False
+        response = self._create('10', '2025-07-15', currency='XYZ')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('currency', response.data)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_editing_amount_reconverts_but_other_edits_do_not(self):
+        txn = Transaction.objects.create(user=self.user, category=self.food, amount=45, currency='EUR', date=date(2025, 7, 1))
+        self.assertEqual(txn.home_amount, Decimal('50.00'))
+        url = reverse('transaction-detail', args=[txn.id])
+        # Load, locked re-read of the stored row, update and budget lookup: no rate queries
+        with self.assertNumQueries(6):
+            self.client.patch(url, {'description': 'Dinner'})
+        response = self.client.patch(url, {'amount': '90'})
+        self.assertEqual(response.data['home_amount'], '100.00')
+        self.assertEqual(SpendRollup.objects.get(user=self.user, period='2025-07').total, Decimal('100.00'))
+
+    def test_reports_and_alerts_sum_home_amounts(self):
+        Budget.objects.create(user=self.user, category=self.food, amount=100, period='2025-07')
+        self._create('45', '2025-07-01', currency='EUR')
+        response = self._create('40', '2025-07-02')
+        self.assertEqual(response.data['budget_alert']['type'], 'near_limit')
+        summary = self.client.get(reverse('report-summary'), {'month': 7, 'year': 2025}).json()
+        self.assertEqual(Decimal(str(summary['totals']['spent'])), Decimal('90.00'))
+        summary = self.client.get(reverse('report-summary'), {'start_date': '2025-07-01', 'end_date': '2025-07-31'}).json()
+        self.assertEqual(Decimal(str(summary['totals']['spent'])), Decimal('90.00'))
+
+    def test_changing_home_currency_reconverts_history_and_budgets(self):
+        Budget.objects.create(user=self.user, category=self.food, amount=100, period='2025-07')
+        # Malformed stored periods convert at today's rate instead of failing the change
+        Budget.objects.create(user=self.user, category=self.food, amount=100, period='2025-7')
+        self._create('45', '2025-07-01', currency='EUR')
+        self._create('10', '2025-07-02')
+        response = self.client.put(reverse('profile'), {'home_currency': 'eur'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['home_currency'], 'EUR')
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('currency', 'home_amount')),
+            [('EUR', Decimal('45.00')), ('USD', Decimal('9.00'))]
+        )
+        self.assertEqual(SpendRollup.objects.mismatches([self.user.id]), {})
+        # Budgets follow at the rate of their period's last day, so spend and budget still compare
+        self.assertEqual(Budget.objects.get(period='2025-07').amount, Decimal('90.00'))
+        self.assertEqual(Budget.objects.get(period='2025-7').amount, Decimal('90.00'))
+        Budget.objects.filter(period='2025-7').delete()
+        totals = self.client.get(reverse('report-summary'), {'month': 7, 'year': 2025}).json()['totals']
+        self.assertEqual((Decimal(str(totals['spent'])), Decimal(str(totals['budget']))), (Decimal('54.00'), Decimal('90.00')))
+        self.assertEqual(self._create('3', '2025-07-03').data['currency'], 'EUR')
+        response = self.client.put(reverse('profile'), {'home_currency': 'XYZ'})
+        self.assertIn('home_currency', response.data)
+
+    def test_import_converts_rows_with_a_currency_column(self):
+        rows = ['category_id,amount,currency,date', f'{self.food.id},90,EUR,2025-07-15', f'{self.food.id},5,,2025-07-15',
+                f'{self.food.id},9,XYZ,2025-07-15', f'{self.food.id},9,EURO,2025-07-15']
+        upload = SimpleUploadedFile('rows.csv', '\n'.join(rows).encode('utf-8'))
+        response = self.client.post(reverse('transaction-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([set(error['errors']) for error in response.data['errors']], [{'currency'}, {'currency'}])
+        self.assertEqual(sorted(Transaction.objects.values_list('home_amount', flat=True)), [Decimal('5.00'), Decimal('100.00')])
+        self.assertEqual(SpendRollup.objects.mismatches([self.user.id]), {})
+
+    def test_import_fetches_rates_before_the_write_transaction(self):
+        provider, depths = get_rate_cache().provider, []
+        fetch = provider.fetch
+        baseline = len(connection.atomic_blocks)
+
+        def recording_fetch(base):
+            depths.append(len(connection.atomic_blocks))
+            return fetch(base)
+
+        provider.fetch = recording_fetch
+        rows = ['category_id,amount,currency,date', f'{self.food.id},300,JPY,{date.today().isoformat()}']
+        upload = SimpleUploadedFile('rows.csv', '\n'.join(rows).encode('utf-8'))
+        response = self.client.post(reverse('transaction-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(depths, [baseline])
@@ -1,7 +1,14 @@
 from django.urls import path
-from transactions.views import TransactionListCreateView, TransactionDetailView
+from transactions.views import (
+	TransactionListCreateView, TransactionDetailView, TransactionImportView, TransactionExportView,
+	TransactionBatchUpdateView, TransactionBatchDeleteView
+)
 
 urlpatterns = [
 	path('', TransactionListCreateView.as_view(), name='transaction-list-create'),
 	path('<int:pk>/', TransactionDetailView.as_view(), name='transaction-detail'),
+	path('import/', TransactionImportView.as_view(), name='transaction-import'),
+	path('export/', TransactionExportView.as_view(), name='transaction-export'),
+	path('batch/update/', TransactionBatchUpdateView.as_view(), name='transaction-batch-update'),
+	path('batch/delete/', TransactionBatchDeleteView.as_view(), name='transaction-batch-delete'),
 ]
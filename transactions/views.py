@@ -1,10 +1,29 @@
-from rest_framework import generics, permissions
+import csv
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import generics, permissions, status
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from transactions.models import Transaction
-from transactions.serializers import TransactionSerializer
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from transactions.serializers import (
+	TransactionBatchSerializer, TransactionBatchUpdateSerializer, TransactionSerializer, build_budget_alert_map
+)
+from transactions.exports import EXPORT_FORMATS, export_rows, iter_csv, iter_ndjson
+from transactions.imports import ImportFormatError, TransactionImporter, detect_format, iter_rows
+from utils.conditional import ConditionalGetMixin
+from utils.pagination import KeysetPagination
+from utils.rates import RateProviderError
+from utils.views import provider_error_response
+from utils.periods import filter_by_date, parse_date_filters
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from drf_spectacular.types import OpenApiTypes
 
-class TransactionListCreateView(generics.ListCreateAPIView):
+class TransactionListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
 	permission_classes = [permissions.IsAuthenticated]
+	query_budget = 10
+	pagination_class = KeysetPagination
+	ordering = ('-date', '-id')
 
 	def get_serializer(self, *args, **kwargs):
 		kwargs['user'] = self.request.user
@@ -17,9 +36,24 @@ class TransactionListCreateView(generics.ListCreateAPIView):
 	def perform_create(self, serializer):
 		serializer.save(user=self.request.user)
 
+	def list(self, request, *args, **kwargs):
+		queryset = self.filter_queryset(self.get_queryset())
+		page = self.paginate_queryset(queryset)
+		transactions = list(page if page is not None else queryset)
+
+		# Resolve budget alerts for the whole page in a fixed number of queries
+		context = {
+			'request': request,
+			'budget_alert_map': build_budget_alert_map(request.user, transactions),
+		}
+		serializer = self.get_serializer(transactions, many=True, context=context)
+		if page is not None:
+			return self.get_paginated_response(serializer.data)
+		return Response(serializer.data)
+
 	@extend_schema(
 		summary="List user transactions",
-		description="Retrieve all transactions for the authenticated user with budget alerts.",
+		description="Retrieve the authenticated user's transactions with budget alerts, newest first. Results are cursor-paginated; follow the `next` link for older transactions.",
 		responses={
 			200: TransactionSerializer(many=True),
 			401: OpenApiResponse(description="Authentication required")
@@ -41,8 +75,9 @@ class TransactionListCreateView(generics.ListCreateAPIView):
 	def post(self, request, *args, **kwargs):
 		return super().post(request, *args, **kwargs)
 
-class TransactionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TransactionDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
 	permission_classes = [permissions.IsAuthenticated]
+	query_budget = 10
 
 	def get_serializer(self, *args, **kwargs):
 		kwargs['user'] = self.request.user
@@ -89,3 +124,146 @@ class TransactionDetailView(generics.RetrieveUpdateDestroyAPIView):
 	)
 	def delete(self, request, *args, **kwargs):
 		return super().delete(request, *args, **kwargs)
+
+
+class TransactionImportView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
+	parser_classes = [MultiPartParser, FormParser]
+
+	def get_batch_size(self, request):
+		default = getattr(settings, 'TRANSACTION_IMPORT_BATCH_SIZE', 1000)
+		maximum = getattr(settings, 'TRANSACTION_IMPORT_MAX_BATCH_SIZE', 10000)
+		try:
+			requested = int(request.data.get('batch_size') or request.query_params.get('batch_size') or default)
+		except ValueError:
+			requested = default
+		return max(1, min(requested, maximum))
+
+	@extend_schema(
+		summary="Bulk import transactions",
+		description="Upload a CSV or JSON-lines file (multipart field `file`) with `category_id` or `category` (name), `amount`, `date` and optional `currency` and `description` per row. Amounts in another currency are converted to the user's home currency at the rate on their date. Valid rows are inserted in batches in one database transaction; invalid rows are reported with their row numbers. Budget alerts are returned once per affected category and period.",
+		request={
+			'multipart/form-data': {
+				'type': 'object',
+				'properties': {
+					'file': {'type': 'string', 'format': 'binary'},
+					'file_format': {'type': 'string', 'enum': ['csv', 'jsonl']},
+					'batch_size': {'type': 'integer'},
+				},
+				'required': ['file'],
+			}
+		},
+		responses={
+			201: OpenApiResponse(description="Rows imported; body has created/failed counts, per-row errors and budget alerts"),
+			400: OpenApiResponse(description="Missing file, unknown format or no valid rows"),
+			401: OpenApiResponse(description="Authentication required"),
+			503: OpenApiResponse(description="An exchange rate was needed but the conversion service is unavailable")
+		}
+	)
+	def post(self, request):
+		upload = request.FILES.get('file')
+		if upload is None:
+			return Response({'error': 'Upload a file in the "file" field.'}, status=status.HTTP_400_BAD_REQUEST)
+		try:
+			file_format = detect_format(upload.name, request.data.get('file_format') or request.query_params.get('file_format'))
+		except ImportFormatError as exc:
+			return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+		importer = TransactionImporter(
+			request.user,
+			batch_size=self.get_batch_size(request),
+			max_errors=getattr(settings, 'TRANSACTION_IMPORT_MAX_ERRORS', 1000)
+		)
+		try:
+			result = importer.run(iter_rows(upload, file_format))
+		except (UnicodeDecodeError, csv.Error) as exc:
+			return Response({'error': f'Could not read the upload: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+		except RateProviderError as exc:
+			return provider_error_response(exc)
+
+		return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST)
+
+
+class TransactionExportView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
+	query_budget = 3
+
+	@extend_schema(
+		summary="Export transactions",
+		description="Stream the authenticated user's transactions, oldest first, as CSV or NDJSON. Supports the same date filters as the reports plus a category filter. Memory use stays flat regardless of the number of rows.",
+		parameters=[
+			OpenApiParameter(name='file_format', type=OpenApiTypes.STR, enum=list(EXPORT_FORMATS), description='Output format (default csv)'),
+			OpenApiParameter(name='start_date', type=OpenApiTypes.DATE, description='Start date filter (YYYY-MM-DD)'),
+			OpenApiParameter(name='end_date', type=OpenApiTypes.DATE, description='End date filter (YYYY-MM-DD)'),
+			OpenApiParameter(name='month', type=OpenApiTypes.INT, description='Month filter (1-12)'),
+			OpenApiParameter(name='year', type=OpenApiTypes.INT, description='Year filter (e.g., 2024)'),
+			OpenApiParameter(name='category', type=OpenApiTypes.INT, description='Category id filter'),
+		],
+		responses={
+			(200, 'text/csv'): OpenApiTypes.STR,
+			(200, 'application/x-ndjson'): OpenApiTypes.STR,
+			400: OpenApiResponse(description="Invalid filter or format"),
+			401: OpenApiResponse(description="Authentication required")
+		}
+	)
+	def get(self, request):
+		file_format = (request.query_params.get('file_format') or 'csv').lower()
+		if file_format not in EXPORT_FORMATS:
+			return Response({'error': 'file_format must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+		try:
+			filters = parse_date_filters(request.query_params)
+			category = int(request.query_params['category']) if request.query_params.get('category') else None
+		except ValueError as exc:
+			return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+		transactions = filter_by_date(Transaction.objects.filter(user=request.user), **filters)
+		if category is not None:
+			transactions = transactions.filter(category_id=category)
+		rows = export_rows(transactions, chunk_size=getattr(settings, 'TRANSACTION_EXPORT_CHUNK_SIZE', 2000))
+
+		if file_format == 'csv':
+			response = StreamingHttpResponse(iter_csv(rows), content_type='text/csv')
+		else:
+			response = StreamingHttpResponse(iter_ndjson(rows), content_type='application/x-ndjson')
+		response['Content-Disposition'] = f'attachment; filename="transactions.{file_format}"'
+		return response
+
+
+class TransactionBatchUpdateView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
+
+	@extend_schema(
+		summary="Update transactions in bulk",
+		description="Recategorize and/or set the description of the authenticated user's transactions selected by `ids` or by a `filter` (`start_date`, `end_date`, `month`, `year`, `category`) with a single UPDATE. Budget spend is adjusted incrementally.",
+		request=TransactionBatchUpdateSerializer,
+		responses={
+			200: OpenApiResponse(description="Number of updated transactions"),
+			400: OpenApiResponse(description="Bad request - missing selection or invalid changes"),
+			401: OpenApiResponse(description="Authentication required")
+		}
+	)
+	def post(self, request):
+		serializer = TransactionBatchUpdateSerializer(data=request.data, user=request.user)
+		serializer.is_valid(raise_exception=True)
+		updated = serializer.get_queryset(request.user).batch_update(**serializer.get_changes())
+		return Response({'updated': updated})
+
+
+class TransactionBatchDeleteView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
+
+	@extend_schema(
+		summary="Delete transactions in bulk",
+		description="Delete the authenticated user's transactions selected by `ids` or by a `filter` (`start_date`, `end_date`, `month`, `year`, `category`) with a single DELETE. Budget spend is adjusted incrementally.",
+		request=TransactionBatchSerializer,
+		responses={
+			200: OpenApiResponse(description="Number of deleted transactions"),
+			400: OpenApiResponse(description="Bad request - missing selection"),
+			401: OpenApiResponse(description="Authentication required")
+		}
+	)
+	def post(self, request):
+		serializer = TransactionBatchSerializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+		deleted = serializer.get_queryset(request.user).batch_delete()
+		return Response({'deleted': deleted})
@@ -0,0 +1,19 @@
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    name = 'users'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from django.db.models.signals import post_delete, post_save
+        from users.authentication import user_cache
+
+        def invalidate_cached_user(sender, instance, **kwargs):
+            # Deactivation and password changes both go through User.save()
+            user_cache.invalidate(getattr(instance, 'pk', None))
+
+        post_save.connect(invalidate_cached_user, sender=User, weak=False,
+                          dispatch_uid='users.invalidate_cached_user')
+        post_delete.connect(invalidate_cached_user, sender=User, weak=False,
+                            dispatch_uid='users.invalidate_cached_user_delete')
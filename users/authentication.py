@@ -0,0 +1,71 @@
+"""
+JWT authentication with an in-process user cache.
+
+simplejwt's ``JWTAuthentication`` loads the ``User`` row on every request. For cheap
+endpoints that lookup is a large share of the latency, so ``CachedJWTAuthentication``
+keeps recently authenticated users in a bounded LRU keyed by user id for
+``AUTH_USER_CACHE_TTL`` seconds. Saving or deleting a user (deactivation, password
+change, profile edits) drops the entry in this process; other processes notice within
+the TTL.
+"""
+import copy
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from utils.lru import LRUCache
+
+
+class UserCache(LRUCache):
+    """``LRUCache`` of user objects keyed by ``str(user_id)``."""
+
+    def get(self, user_id):
+        user = super().get(str(user_id))
+        # Callers may modify request.user, never hand out the cached instance itself
+        return None if user is None else copy.copy(user)
+
+    def set(self, user_id, user):
+        super().set(str(user_id), copy.copy(user))
+
+    def invalidate(self, user_id):
+        super().invalidate(str(user_id))
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that resolves users through ``user_cache`` before the database."""
+    cache = user_cache
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = self.cache.get(user_id)
+        if user is None:
+            # Runs simplejwt's own checks (missing, inactive, revoked) before caching
+            user = super().get_user(validated_token)
+            self.cache.set(user_id, user)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Document CachedJWTAuthentication as the same bearer scheme as simplejwt's."""
+    target_class = 'users.authentication.CachedJWTAuthentication'
@@ -1 +1,25 @@
-# Placeholder for User models
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import models
+
+
+def default_home_currency():
+	return getattr(settings, 'DEFAULT_HOME_CURRENCY', 'USD')
+
+
+class Profile(models.Model):
+	"""Per-user preferences that do not belong on ``auth.User``"""
+	user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
+	# Transactions are converted into this currency when they are saved
+	home_currency = models.CharField(max_length=3, default=default_home_currency)
+
+	def __str__(self):
+		return f"{self.user_id}: {self.home_currency}"
+
+
+def home_currency(user):
+	"""The user's home currency, ``DEFAULT_HOME_CURRENCY`` until they pick one"""
+	try:
+		return user.profile.home_currency
+	except Profile.DoesNotExist:
+		return default_home_currency()
@@ -1,5 +1,13 @@
+from datetime import date
 from django.contrib.auth.models import User
+from django.db import transaction as db_transaction
 from rest_framework import serializers
+from budgets.models import Budget
+from transactions.models import SpendRollup, Transaction
+from users.models import Profile, default_home_currency, home_currency as get_home_currency
+from utils.cache import bump_data_version
+from utils.rates import historical_rate
+from utils.serializers import CurrencyCodeField, conversion_errors
 
 class RegisterSerializer(serializers.ModelSerializer):
 	password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
@@ -16,6 +24,35 @@ class RegisterSerializer(serializers.ModelSerializer):
 		return user
 
 class UserProfileSerializer(serializers.ModelSerializer):
+	home_currency = CurrencyCodeField(source='profile.home_currency', default=default_home_currency)
+
 	class Meta:
 		model = User
-		fields = ('id', 'username', 'email', 'first_name', 'last_name')
+		fields = ('id', 'username', 'email', 'first_name', 'last_name', 'home_currency')
+
+	def update(self, instance, validated_data):
+		currency = validated_data.pop('profile', {}).get('home_currency')
+		instance = super().update(instance, validated_data)
+		previous = get_home_currency(instance)
+		if currency is not None and currency != previous:
+			set_home_currency(instance, previous, currency)
+		return instance
+
+
+def set_home_currency(user, previous, currency):
+	"""
+	Switch ``user`` to ``currency``, re-converting every transaction's home_amount and
+	every budget so spend and budgets stay comparable.
+	"""
+	# Rates (possibly a live fetch) are resolved before the write transaction opens
+	with conversion_errors('home_currency'):
+		# Rejects unknown codes even when there is nothing to convert yet
+		historical_rate(previous, currency, date.today())
+		transactions = Transaction.objects.filter(user=user).converted_to(currency)
+		budgets = Budget.objects.filter(user=user).converted_to(previous, currency)
+	with db_transaction.atomic():
+		user.profile, _ = Profile.objects.update_or_create(user=user, defaults={'home_currency': currency})
+		Transaction.objects.bulk_update(transactions, ['home_amount'], batch_size=1000)
+		Budget.objects.bulk_update(budgets, ['amount'], batch_size=1000)
+		SpendRollup.objects.rebuild([user.id])
+	bump_data_version(user.id)
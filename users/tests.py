@@ -2,6 +2,11 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+from users.authentication import UserCache, user_cache
 
 class UserAuthTests(APITestCase):
     def test_register(self):
@@ -36,3 +41,67 @@ class UserAuthTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['first_name'], 'Test')
         self.assertEqual(response.data['last_name'], 'User')
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(username='cached', password='testpass123', email='cached@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.url = reverse('profile')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q['sql'] for q in ctx.captured_queries if 'auth_user' in q['sql']]
+
+    def test_second_request_skips_user_lookup(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+    def test_deactivated_user_is_rejected(self):
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_rejected(self):
+        self.user_queries()
+        self.user.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_is_visible_on_next_request(self):
+        self.user_queries()
+        self.client.put(self.url, {'first_name': 'Changed'})
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['first_name'], 'Changed')
+
+
+class UserCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = UserCache(max_size=2, ttl=60, clock=lambda: self.now)
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.set(1, User(pk=1, username='a'))
+        self.now = 59
+        self.assertEqual(self.cache.get('1').username, 'a')
+        self.now = 60
+        self.assertIsNone(self.cache.get(1))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set(1, User(pk=1))
+        self.cache.set(2, User(pk=2))
+        self.cache.get(1)
+        self.cache.set(3, User(pk=3))
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get(2))
+        self.assertIsNotNone(self.cache.get(1))
+
+    def test_get_returns_a_copy(self):
+        self.cache.set(1, User(pk=1, first_name='a'))
+        self.cache.get(1).first_name = 'b'
+        self.assertEqual(self.cache.get(1).first_name, 'a')
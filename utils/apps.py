@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class UtilsConfig(AppConfig):
+    name = 'utils'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from utils.database import configure_sqlite
+
+        connection_created.connect(configure_sqlite, dispatch_uid='utils.configure_sqlite')
@@ -0,0 +1,47 @@
+"""
+Async DRF views.
+
+DRF's ``APIView`` only dispatches synchronously. ``AsyncAPIView`` keeps its request
+lifecycle (authentication, permissions, throttling, conditional GET, exception handling)
+but awaits ``async def`` handlers, so a view waiting on the database or an outbound HTTP
+call gives the event loop back instead of holding a worker thread.
+
+The checks in ``initial()`` stay synchronous and run in one ``sync_to_async`` hop, which
+covers the JWT user lookup. Under WSGI Django still serves these views, through
+``async_to_sync``.
+"""
+import inspect
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """An ``APIView`` whose handlers are coroutines."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def options(self, request, *args, **kwargs):
+        # Django requires every handler of an async view to be async
+        return super().options(request, *args, **kwargs)
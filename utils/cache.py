@@ -0,0 +1,130 @@
+"""
+Per-user data versions and the report result cache.
+
+Every Transaction, Budget or Category write bumps the owning user's data version.
+Cached report results are keyed by that version, so a write makes every earlier
+entry unreachable at once and a stale result can never be served.
+
+Versions live in the report cache. With the default local-memory backend every worker
+process has its own versions, so the guarantee only spans one process; multi-process
+deployments need a shared backend such as Redis or Memcached.
+"""
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = 'finwell:data-version:{user_id}'
+REPORT_KEY = 'finwell:report:{endpoint}:{user_id}:{version}:{params}'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _cache():
+    return caches[getattr(settings, 'REPORT_CACHE_ALIAS', 'default')]
+
+
+def get_data_version(user_id):
+    """Current data version for a user, seeding it if the cache has none."""
+    key = VERSION_KEY.format(user_id=user_id)
+    version = _cache().get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses a version that is still cached
+        _cache().add(key, time.time_ns(), timeout=None)
+        version = _cache().get(key)
+    return version
+
+
+def _incr_data_version(user_id):
+    key = VERSION_KEY.format(user_id=user_id)
+    try:
+        return _cache().incr(key)
+    except ValueError:
+        _cache().add(key, time.time_ns(), timeout=None)
+        return _cache().incr(key)
+
+
+def bump_data_version(user_id):
+    """
+    Advance a user's data version after a write; returns the new version.
+
+    Inside a transaction the version is bumped again once it commits. A request that
+    reads between the two bumps still sees the old rows and may cache them under the
+    first new version; the commit bump makes that entry unreachable.
+    """
+    version = _incr_data_version(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _incr_data_version(user_id))
+    return version
+
+
+async def aget_data_version(user_id):
+    """``get_data_version()`` for async views."""
+    key = VERSION_KEY.format(user_id=user_id)
+    version = await _cache().aget(key)
+    if version is None:
+        await _cache().aadd(key, time.time_ns(), timeout=None)
+        version = await _cache().aget(key)
+    return version
+
+
+def normalize_params(params):
+    """Stable digest of query parameters, independent of their order."""
+    items = sorted((name, tuple(sorted(params.getlist(name)))) for name in params.keys())
+    return hashlib.sha1(repr(items).encode('utf-8')).hexdigest()
+
+
+def report_key(endpoint, user_id, version, params, extra=()):
+    return REPORT_KEY.format(
+        endpoint=endpoint,
+        user_id=user_id,
+        version=version,
+        params=normalize_params(params) + ''.join(f':{value}' for value in extra)
+    )
+
+
+def cached_report(endpoint, user_id, params, compute, extra=()):
+    """
+    Return ``compute()`` for this user, endpoint and query, reusing a cached result
+    until the user's data version changes.
+    """
+    key = report_key(endpoint, user_id, get_data_version(user_id), params, extra)
+    result = _cache().get(key)
+    if result is not None:
+        _record('hits')
+        return result
+    _record('misses')
+    result = compute()
+    _cache().set(key, result, timeout=getattr(settings, 'REPORT_CACHE_TIMEOUT', 300))
+    return result
+
+
+async def acached_report(endpoint, user_id, params, compute, extra=()):
+    """``cached_report()`` for async views, ``compute`` is a coroutine function."""
+    key = report_key(endpoint, user_id, await aget_data_version(user_id), params, extra)
+    result = await _cache().aget(key)
+    if result is not None:
+        _record('hits')
+        return result
+    _record('misses')
+    result = await compute()
+    await _cache().aset(key, result, timeout=getattr(settings, 'REPORT_CACHE_TIMEOUT', 300))
+    return result
+
+
+def _record(counter):
+    with _stats_lock:
+        _stats[counter] += 1
+
+
+def report_cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_report_cache_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
@@ -0,0 +1,63 @@
+"""
+Conditional GET support for per-user API views.
+
+The ETag is derived from the user's data version (see ``utils.cache``), the request
+path, query and Accept header, so it can be computed without touching the database
+or serializing anything. A matching ``If-None-Match`` short-circuits the request with
+a 304 right after authentication, before the handler builds any queryset.
+"""
+import hashlib
+from rest_framework import status
+from rest_framework.response import Response
+from utils.cache import get_data_version, normalize_params
+
+
+class NotModified(Exception):
+    pass
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in [candidate.strip() for candidate in header.split(',')]
+
+
+class ConditionalGetMixin:
+    """Add strong ETags and If-None-Match handling to an APIView's GET requests."""
+
+    def get_etag_extra(self, request):
+        """Extra values the representation depends on besides the user's data"""
+        return ()
+
+    def get_etag(self, request):
+        parts = [
+            str(request.user.pk),
+            str(get_data_version(request.user.pk)),
+            request.path,
+            normalize_params(request.query_params),
+            request.META.get('HTTP_ACCEPT', ''),
+            *map(str, self.get_etag_extra(request)),
+        ]
+        return '"%s"' % hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method in ('GET', 'HEAD') and request.user.is_authenticated:
+            self.etag = self.get_etag(request)
+            if etag_matches(request.headers.get('If-None-Match'), self.etag):
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = self.etag
+            response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,86 @@
+"""
+Database profiles.
+
+``database_config()`` builds ``DATABASES['default']`` from environment variables.
+``DATABASE_ENGINE=postgresql`` selects PostgreSQL with persistent, health-checked
+connections or psycopg's connection pool. Anything else keeps a SQLite file for
+single-node deployments. ``configure_sqlite`` tunes each new SQLite connection
+(WAL journal, ``synchronous=NORMAL``, busy timeout, mmap) from ``connection_created``.
+"""
+from django.conf import settings
+
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer and the writer no longer blocks readers
+    'journal_mode': 'WAL',
+    # Safe with WAL: a power loss can drop the last commits but never corrupts the file
+    'synchronous': 'NORMAL',
+    # Wait this many milliseconds for the write lock instead of failing with "database is locked"
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def env_flag(environ, name, default=False):
+    value = environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.strip().lower() in TRUE_VALUES
+
+
+def database_config(environ, base_dir):
+    """
+    The ``default`` database settings for this environment.
+
+    PostgreSQL reads ``DATABASE_NAME``, ``DATABASE_USER``, ``DATABASE_PASSWORD``,
+    ``DATABASE_HOST`` and ``DATABASE_PORT``. Connections are kept for
+    ``DATABASE_CONN_MAX_AGE`` seconds and checked before reuse unless
+    ``DATABASE_CONN_HEALTH_CHECKS`` is off. ``DATABASE_POOL=true`` switches to
+    psycopg 3's pool (``DATABASE_POOL_MIN_SIZE``/``DATABASE_POOL_MAX_SIZE``), which
+    replaces persistent connections. Set ``DATABASE_DISABLE_SERVER_SIDE_CURSORS``
+    behind a transaction-mode pooler such as PgBouncer.
+    """
+    engine = environ.get('DATABASE_ENGINE', 'sqlite').strip().lower()
+    if engine not in ('postgres', 'postgresql'):
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': environ.get('DATABASE_NAME') or base_dir / 'db.sqlite3',
+            'CONN_MAX_AGE': int(environ.get('DATABASE_CONN_MAX_AGE', 0)),
+            'OPTIONS': {
+                # Take the write lock at BEGIN so concurrent writers queue on busy_timeout
+                # instead of failing when a read transaction tries to upgrade
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ.get('DATABASE_NAME', 'finwell'),
+        'USER': environ.get('DATABASE_USER', ''),
+        'PASSWORD': environ.get('DATABASE_PASSWORD', ''),
+        'HOST': environ.get('DATABASE_HOST', 'localhost'),
+        'PORT': environ.get('DATABASE_PORT', '5432'),
+        'CONN_MAX_AGE': int(environ.get('DATABASE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': env_flag(environ, 'DATABASE_CONN_HEALTH_CHECKS', True),
+        'DISABLE_SERVER_SIDE_CURSORS': env_flag(environ, 'DATABASE_DISABLE_SERVER_SIDE_CURSORS'),
+        'OPTIONS': {},
+    }
+    if env_flag(environ, 'DATABASE_POOL'):
+        # Django refuses persistent connections together with a pool
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': int(environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+        }
+    return config
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """``connection_created`` receiver applying ``SQLITE_PRAGMAS`` to new SQLite connections."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+    # Straight on the driver connection, so the PRAGMAs stay out of query counts and budgets
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from utils.models import ExchangeRate
+from utils.rate_dumps import RateDumpError, RateLoader, detect_format, iter_records
+from utils.rates import get_rate_history, rate_config
+
+
+class Command(BaseCommand):
+    help = "Bulk-load historical exchange rates from CSV, JSON or JSON-lines dumps."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Dump files to load')
+        parser.add_argument('--format', dest='file_format', help='csv, json or jsonl (default: from the extension)')
+        parser.add_argument('--base', help='Base currency for records without one (default: EXCHANGE_RATES BASE_CURRENCY)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        base = rate_config()['BASE_CURRENCY'].upper()
+        loader = RateLoader((options['base'] or base).upper(), batch_size=options['batch_size'])
+
+        before = ExchangeRate.objects.count()
+        for path in options['paths']:
+            try:
+                file_format = detect_format(path, options['file_format'])
+                with open(path, newline='', encoding='utf-8-sig') as stream:
+                    loader.run(iter_records(stream, file_format), source=path)
+            except (OSError, UnicodeDecodeError, RateDumpError) as exc:
+                raise CommandError(f'Could not read {path}: {exc}')
+        stored = ExchangeRate.objects.count() - before
+        # Drop this process's cached misses; web workers pick the rows up within HISTORY_CACHE_TTL
+        get_rate_history().cache.clear()
+
+        for source, number, errors in loader.errors:
+            self.stderr.write(f"{source} record {number}: {errors}")
+        if loader.failed > len(loader.errors):
+            self.stderr.write(f"... and {loader.failed - len(loader.errors)} more invalid records.")
+        other_bases = sorted(loader.bases - {base})
+        if other_bases:
+            self.stderr.write(self.style.WARNING(
+                f"Rates against {', '.join(other_bases)} are stored but conversions only read base {base}."
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {loader.read} rates ({stored} new), skipped {loader.failed} invalid records."
+        ))
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class ExchangeRate(models.Model):
+    """Units of ``quote`` per unit of ``base`` on ``date``"""
+    date = models.DateField()
+    base = models.CharField(max_length=3)
+    quote = models.CharField(max_length=3)
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+
+    class Meta:
+        # The constraint's index also serves "newest rate on or before a date" lookups
+        unique_together = ('base', 'quote', 'date')
+
+    def __str__(self):
+        return f"{self.date} {self.base}/{self.quote}: {self.rate}"
@@ -0,0 +1,146 @@
+import base64
+import json
+from datetime import date
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique composite ordering, e.g. ``('-date', '-id')``.
+
+    The cursor stores the ordering values of the last (or first) row of a page and the
+    next page is fetched with a ``WHERE (date, id) < (...)`` style filter, so a deep page
+    costs the same as the first one. The ordering is taken from the view's ``ordering``
+    attribute and must end with a unique field.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-id',)
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return max(1, min(requested, max_page_size))
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'ordering', None) or self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [(field.lstrip('-'), field.startswith('-')) for field in self.get_ordering(view)]
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [f"{'-' if descending != reverse else ''}{name}" for name, descending in self.fields]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(position, reverse))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound('Invalid cursor')
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = results
+        return results
+
+    def _after(self, position, reverse):
+        # Lexicographic "comes after" filter: (a > x) OR (a = x AND b > y) ...
+        query = Q()
+        for index, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != reverse else 'gt'
+            clause = Q(**{f'{name}__{lookup}': position[index]})
+            for prev_index, (prev_name, _) in enumerate(self.fields[:index]):
+                clause &= Q(**{prev_name: position[prev_index]})
+            query |= clause
+        # Redundant bound on the leading column so the database can seek the index to the cursor
+        name, descending = self.fields[0]
+        lookup = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{name}__{lookup}': position[0]}) & query
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position, reverse = payload['p'], bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound('Invalid cursor')
+        return position, reverse
+
+    def encode_cursor(self, obj, reverse):
+        position = []
+        for name, _ in self.fields:
+            value = getattr(obj, name)
+            position.append(value.isoformat() if isinstance(value, date) else value)
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
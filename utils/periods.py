@@ -0,0 +1,208 @@
+"""
+Budget period helpers.
+
+Periods are stored as ``YYYY-MM`` strings. Filters on transaction dates are built as
+half-open ``[first_day, next_month_first_day)`` ranges so the database can use an
+index range scan on ``date`` instead of evaluating EXTRACT() on every row. The last
+month and year ``date`` can represent (up to 9999-12-31) have no next first day, so
+their ranges are open-ended and end with None.
+"""
+from datetime import date, timedelta
+from django.db.models import Max, Min, Q
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def parse_period(period):
+    """Split a ``YYYY-MM`` period into ``(year, month)``; raises ValueError if malformed."""
+    try:
+        year, month = period.split('-')
+        year, month = int(year), int(month)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid period {period!r}, expected YYYY-MM.")
+    if len(period) != 7 or not 1 <= month <= 12:
+        raise ValueError(f"Invalid period {period!r}, expected YYYY-MM.")
+    return year, month
+
+
+def format_period(year, month):
+    return f"{int(year):04d}-{int(month):02d}"
+
+
+def month_bounds(year, month):
+    """Return ``(first_day, next_month_first_day)`` for a month."""
+    year, month = int(year), int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month {month}, expected 1-12.")
+    first_day = date(year, month, 1)
+    if month == 12:
+        return first_day, year_bounds(year)[1]
+    return first_day, date(year, month + 1, 1)
+
+
+def month_last_day(value):
+    """Last day of the month containing ``value``."""
+    end = month_bounds(value.year, value.month)[1]
+    return end - timedelta(days=1) if end else date.max
+
+
+def period_bounds(period):
+    """Return the half-open date range covered by a ``YYYY-MM`` period."""
+    return month_bounds(*parse_period(period))
+
+
+def year_bounds(year):
+    year = int(year)
+    if year == date.max.year:
+        return date(year, 1, 1), None
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def month_ranges(month, first_year, last_year):
+    """One range per year for a month-only filter, e.g. every August between two years."""
+    return [month_bounds(year, month) for year in range(int(first_year), int(last_year) + 1)]
+
+
+def date_range_q(ranges, field='date'):
+    """OR together ``field >= start AND field < end`` for each ``(start, end)`` range."""
+    if not ranges:
+        return Q(pk__in=[])
+    query = Q()
+    for start, end in ranges:
+        if end is None:
+            query |= Q(**{f'{field}__gte': start})
+        else:
+            query |= Q(**{f'{field}__gte': start, f'{field}__lt': end})
+    return query
+
+
+def period_range_q(month=None, year=None, years=None, field='date'):
+    """
+    Build a sargable filter for the reports' ``month``/``year`` query parameters.
+
+    A month without a year expands to one range per year in ``years``, a
+    ``(first_year, last_year)`` span usually taken from the user's own data.
+    Returns None when neither month nor year is given.
+    """
+    if month and year:
+        return date_range_q([month_bounds(year, month)], field)
+    if year:
+        return date_range_q([year_bounds(year)], field)
+    if month:
+        if years is None:
+            return Q(pk__in=[])
+        return date_range_q(month_ranges(month, *years), field)
+    return None
+
+
+def period_values(month=None, year=None, years=None):
+    """
+    The ``YYYY-MM`` period strings matching a month/year filter, for period-keyed tables.
+
+    Returns None when neither month nor year is given (no filtering).
+    """
+    if month and year:
+        return [format_period(year, month)]
+    if year:
+        return [format_period(year, m) for m in range(1, 13)]
+    if month:
+        if years is None:
+            return []
+        return [format_period(y, month) for y in range(int(years[0]), int(years[1]) + 1)]
+    return None
+
+
+TREND_INTERVALS = ('day', 'week', 'month')
+
+
+def bucket_start(value, interval):
+    """First day of the day/week/month bucket containing ``value`` (weeks start on Monday)."""
+    if interval == 'day':
+        return value
+    if interval == 'week':
+        return value - timedelta(days=value.weekday())
+    if interval == 'month':
+        return value.replace(day=1)
+    raise ValueError(f"Invalid interval {interval!r}, expected one of {', '.join(TREND_INTERVALS)}.")
+
+
+class BucketWeek(TruncWeek):
+    """``TruncWeek`` on a date column, in native SQL on SQLite too"""
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Django's SQLite Trunc*() calls back into Python for every row. date() walks to
+        # the Monday on or before the value: back six days, then forward to a Monday.
+        sql, params = compiler.compile(self.lhs)
+        return f"date({sql}, '-6 days', 'weekday 1')", params
+
+
+class BucketMonth(TruncMonth):
+    """``TruncMonth`` on a date column, in native SQL on SQLite too"""
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return f"date({sql}, 'start of month')", params
+
+
+def bucket_starts(start, end, interval, limit=None):
+    """
+    Every bucket start from the bucket containing ``start`` up to the one containing ``end``.
+
+    Raises ValueError if there would be more than ``limit`` buckets.
+    """
+    current, last = bucket_start(start, interval), bucket_start(end, interval)
+    buckets = []
+    step = timedelta(days=1 if interval == 'day' else 7)
+    while current is not None and current <= last:
+        if limit is not None and len(buckets) >= limit:
+            raise ValueError(f'The range covers more than {limit} {interval} buckets, use a wider interval.')
+        buckets.append(current)
+        if interval == 'month':
+            current = month_bounds(current.year, current.month)[1]
+        else:
+            current = current + step if date.max - current >= step else None
+    return buckets
+
+
+def parse_date_filters(params):
+    """
+    Read the reports' ``start_date``/``end_date``/``month``/``year`` query parameters.
+
+    Returns a dict of parsed values (None when absent); raises ValueError with a
+    client-facing message when a value is malformed.
+    """
+    filters = {}
+    for name in ('start_date', 'end_date'):
+        value = params.get(name)
+        try:
+            filters[name] = date.fromisoformat(value) if value else None
+        except ValueError:
+            raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+    try:
+        month = int(params['month']) if params.get('month') else None
+        year = int(params['year']) if params.get('year') else None
+        if month is not None and not 1 <= month <= 12:
+            raise ValueError(month)
+        if year is not None and not date.min.year <= year <= date.max.year:
+            raise ValueError(year)
+    except ValueError:
+        raise ValueError(f'month must be 1-12 and year must be {date.min.year}-{date.max.year}')
+    filters.update(month=month, year=year)
+    return filters
+
+
+def filter_by_date(queryset, start_date=None, end_date=None, month=None, year=None, field='date'):
+    """Apply parsed date filters to a queryset using only range comparisons on ``field``."""
+    if start_date:
+        queryset = queryset.filter(**{f'{field}__gte': start_date})
+    if end_date:
+        queryset = queryset.filter(**{f'{field}__lte': end_date})
+    years = None
+    if month and not year:
+        # Expand month-only filters across the years the queryset actually covers
+        bounds = queryset.aggregate(first=Min(field), last=Max(field))
+        if bounds['first']:
+            years = (bounds['first'].year, bounds['last'].year)
+    date_filter = period_range_q(month, year, years, field)
+    if date_filter is not None:
+        queryset = queryset.filter(date_filter)
+    return queryset
@@ -0,0 +1,199 @@
+"""
+Per-request profiling.
+
+With ``REQUEST_PROFILING`` enabled, ``ProfilingMiddleware`` counts the SQL queries of each
+request and times the database, serializers (those using ``ProfiledSerializerMixin``) and
+the whole view. The numbers go out as a ``Server-Timing`` header and one JSON log line on
+the ``finwell.profiling`` logger.
+
+Views may declare ``query_budget``, the most queries one request may run. Going over it
+logs a warning, or raises ``QueryBudgetExceeded`` when ``QUERY_BUDGET_RAISE`` is set, as
+it is under the test runner. Streamed responses are counted, logged and checked once
+their body has been consumed.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('finwell.profiling')
+
+_current = ContextVar('request_profile', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.timings = {'db': 0.0, 'serializer': 0.0, 'view': 0.0}
+        self._open = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.timings['db'] += time.perf_counter() - start
+
+    @contextmanager
+    def section(self, name):
+        if name in self._open:
+            # Nested serializers are already inside the outer one's timing
+            yield
+            return
+        self._open.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+            self._open.discard(name)
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.timings["db"] * 1000:.2f};desc="{self.queries} queries"',
+            f'serializer;dur={self.timings["serializer"] * 1000:.2f}',
+            f'view;dur={self.timings["view"] * 1000:.2f}',
+        ])
+
+
+def current_profile():
+    """The profile of the request being handled, or None when profiling is off."""
+    return _current.get()
+
+
+@contextmanager
+def profile_section(name):
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    with profile.section(name):
+        yield
+
+
+class ProfiledSerializerMixin:
+    # Counts the time spent in to_representation() as serializer time. A comment rather than a
+    # docstring, drf-spectacular would otherwise use it as every serializer's schema description
+
+    def to_representation(self, instance):
+        with profile_section('serializer'):
+            return super().to_representation(instance)
+
+
+def get_view_class(view_func):
+    return getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Read per request so override_settings() can switch it in tests
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, profile)
+                response = self.get_response(request)
+        finally:
+            profile.timings['view'] = time.perf_counter() - start
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            return await self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # Async views run their queries through thread-sensitive sync_to_async, which is
+            # the thread these wrappers get installed on
+            await sync_to_async(wrap_connections)(stack, profile)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            profile.timings['view'] = time.perf_counter() - start
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        response['Server-Timing'] = profile.server_timing()
+        if response.streaming and not response.is_async:
+            # A streamed body runs its queries while the server iterates it, after this
+            # middleware has returned. Count those too, and log and check the budget once
+            # the stream is exhausted; Server-Timing only covers the view.
+            response.streaming_content = self.profile_stream(request, response, profile, response.streaming_content)
+            return response
+        self.report(request, response, profile)
+        return response
+
+    def profile_stream(self, request, response, profile, content):
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, profile)
+                yield from content
+        finally:
+            profile.timings['view'] += time.perf_counter() - start
+        self.report(request, response, profile)
+
+    def report(self, request, response, profile):
+        budget = getattr(request, 'query_budget', None)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request, 'profiled_view', None),
+            'status': response.status_code,
+            'queries': profile.queries,
+            'query_budget': budget,
+            'db_ms': round(profile.timings['db'] * 1000, 3),
+            'serializer_ms': round(profile.timings['serializer'] * 1000, 3),
+            'view_ms': round(profile.timings['view'] * 1000, 3),
+        }))
+        if budget is not None and profile.queries > budget:
+            message = (
+                f'{request.method} {request.path} ran {profile.queries} queries, '
+                f'over the {request.profiled_view} budget of {budget}'
+            )
+            if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(settings, 'REQUEST_PROFILING', False):
+            view_class = get_view_class(view_func)
+            request.query_budget = getattr(view_class, 'query_budget', None)
+            request.profiled_view = (view_class or view_func).__name__
+        return None
+
+
+def wrap_connections(stack, profile):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(profile))
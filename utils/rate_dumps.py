@@ -0,0 +1,159 @@
+"""
+Bulk loading of exchange-rate dumps into ``ExchangeRate``.
+
+Accepted layouts, one rate per row unless noted:
+
+* CSV with ``date``, ``quote`` (or ``currency``), ``rate`` and an optional ``base`` column
+* JSON (a list) or JSON lines of objects with the same keys
+* exchangerate.host-style tables, several rates per object:
+  ``{"base": "USD", "date": "2025-01-02", "rates": {"EUR": 0.91}}`` and time series
+  ``{"base": "USD", "rates": {"2025-01-02": {"EUR": 0.91}}}``
+"""
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from utils.models import ExchangeRate
+from utils.rates import RATE_PLACES
+
+RATE_FORMATS = ('csv', 'json', 'jsonl')
+MAX_RATE = Decimal('10') ** 10  # max_digits=20, decimal_places=10
+
+
+class RateDumpError(Exception):
+    """The dump could not be read as the requested format."""
+
+
+def detect_format(path, requested=None):
+    """Pick the dump format from an explicit value or the file extension"""
+    if requested:
+        requested = requested.lower()
+        if requested == 'ndjson':
+            requested = 'jsonl'
+        if requested not in RATE_FORMATS:
+            raise RateDumpError(f"Unsupported format {requested!r}, expected csv, json or jsonl.")
+        return requested
+    extension = str(path).rsplit('.', 1)[-1].lower()
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension in RATE_FORMATS:
+        return extension
+    raise RateDumpError(f'Could not detect the format of {path}, pass --format.')
+
+
+def iter_records(stream, file_format):
+    """Yield (record_number, dict or None) pairs, one per rate"""
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+        return
+    if file_format == 'json':
+        try:
+            data = json.load(stream)
+        except ValueError as exc:
+            raise RateDumpError(f'Invalid JSON: {exc}')
+        for number, item in enumerate(data if isinstance(data, list) else [data], start=1):
+            yield from expand_tables(number, item)
+        return
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            item = json.loads(line)
+        except ValueError:
+            item = None
+        yield from expand_tables(number, item)
+
+
+def expand_tables(number, item):
+    """Split a provider-style rate table into one record per rate; plain records pass through"""
+    if not isinstance(item, dict) or not isinstance(item.get('rates'), dict):
+        yield number, item if isinstance(item, dict) else None
+        return
+    base = item.get('base')
+    if item.get('date') is not None:
+        tables = {item['date']: item['rates']}
+    else:
+        tables = item['rates']
+    for day, table in tables.items():
+        if not isinstance(table, dict):
+            yield number, None
+            continue
+        for quote, rate in table.items():
+            yield number, {'date': day, 'base': base, 'quote': quote, 'rate': rate}
+
+
+def clean_currency(value):
+    code = str(value or '').strip().upper()
+    return code if len(code) == 3 and code.isalpha() else None
+
+
+def clean_record(record, default_base):
+    """Return (ExchangeRate, None) for a valid record or (None, errors)"""
+    if record is None:
+        return None, {'record': ['Not a rate object.']}
+    errors = {}
+    try:
+        day = date.fromisoformat(str(record.get('date', '')).strip())
+    except ValueError:
+        errors['date'] = ['Date has wrong format. Use YYYY-MM-DD.']
+    base = clean_currency(record.get('base') or default_base)
+    if base is None:
+        errors['base'] = ['Currency codes must be 3 letters (e.g., USD, KES).']
+    quote = clean_currency(record.get('quote') or record.get('currency'))
+    if quote is None:
+        errors['quote'] = ['Currency codes must be 3 letters (e.g., USD, KES).']
+    try:
+        rate = Decimal(str(record.get('rate', '')).strip())
+        if not rate.is_finite():
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        errors['rate'] = ['A valid number is required.']
+    else:
+        if not 0 < rate < MAX_RATE:
+            errors['rate'] = ['Rate must be positive and below 10^10.']
+    if errors:
+        return None, errors
+    return ExchangeRate(date=day, base=base, quote=quote, rate=rate.quantize(RATE_PLACES)), None
+
+
+class RateLoader:
+    """
+    Insert rate records in batches with ``bulk_create(ignore_conflicts=True)``.
+
+    A (base, quote, date) that is already stored keeps its rate, so loading overlapping
+    or repeated dumps is safe. Batches commit on their own; a failed run can simply be
+    started again.
+    """
+
+    def __init__(self, default_base, batch_size=5000, max_errors=100):
+        self.default_base = default_base
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.read = 0
+        self.failed = 0
+        self.errors = []
+        self.bases = set()
+
+    def flush(self, batch):
+        if batch:
+            ExchangeRate.objects.bulk_create(batch, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def run(self, records, source=''):
+        batch = []
+        for number, record in records:
+            rate, errors = clean_record(record, self.default_base)
+            if errors:
+                self.failed += 1
+                if len(self.errors) < self.max_errors:
+                    self.errors.append((source, number, errors))
+                continue
+            self.read += 1
+            self.bases.add(rate.base)
+            batch.append(rate)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
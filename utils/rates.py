@@ -0,0 +1,454 @@
+"""
+Exchange-rate cache for currency conversion.
+
+Rates are fetched as one table against a base currency (``{'EUR': 0.92, 'KES': 129.5, ...}``)
+and every cross rate is derived from it, so N currencies cost one provider call rather
+than one per pair. Entries live for ``EXCHANGE_RATES['TTL']`` seconds; once stale the old
+table keeps being served while a single background thread refreshes it.
+
+Async views use the ``a``-prefixed methods. Those fetch through the provider's
+``afetch()`` (httpx) and refresh stale tables in an event-loop task, so no thread waits
+on the provider.
+
+``historical_rate()`` answers "what was the rate on this date" from the ``ExchangeRate``
+table, filled by ``manage.py load_exchange_rates`` and read through an in-process LRU.
+Whenever it has to fall back to the live table, that table is stored under the date it
+was fetched, so the history also fills itself in as the app is used.
+"""
+import asyncio
+import threading
+import time
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from utils.lru import LRUCache
+from utils.models import ExchangeRate
+
+DEFAULTS = {
+    'PROVIDER': 'utils.rates.ExchangeRateHostProvider',
+    'OPTIONS': {},
+    'BASE_CURRENCY': 'USD',
+    'TTL': 3600,
+    'HISTORY_CACHE_SIZE': 4096,
+    'HISTORY_CACHE_TTL': 300,
+}
+
+# ISO 4217 minor units of the currencies that do not use two decimal places
+CURRENCY_EXPONENTS = {
+    'BIF': 0, 'CLP': 0, 'DJF': 0, 'GNF': 0, 'ISK': 0, 'JPY': 0, 'KMF': 0, 'KRW': 0, 'PYG': 0,
+    'RWF': 0, 'UGX': 0, 'UYI': 0, 'VND': 0, 'VUV': 0, 'XAF': 0, 'XOF': 0, 'XPF': 0,
+    'BHD': 3, 'IQD': 3, 'JOD': 3, 'KWD': 3, 'LYD': 3, 'OMR': 3, 'TND': 3,
+    'CLF': 4, 'UYW': 4,
+}
+DEFAULT_EXPONENT = 2
+# Decimal places of the stored money columns (transaction, budget and rollup amounts)
+STORED_PLACES = 2
+RATE_PLACES = Decimal('1e-10')
+MISSING = object()
+
+
+class RateProviderError(Exception):
+    """The rate provider could not be reached or returned an unusable response."""
+
+
+class RateProviderTimeout(RateProviderError):
+    pass
+
+
+class UnknownCurrencyError(Exception):
+    """A currency code is not present in the provider's rate table."""
+
+
+class RateNotStoredError(UnknownCurrencyError):
+    """The rate history has nothing for a currency on or before the requested day."""
+
+
+class ExchangeRateHostProvider:
+    """Fetch the latest base-currency table from exchangerate.host."""
+    url = 'https://api.exchangerate.host/latest'
+
+    def __init__(self, timeout=10, url=None):
+        self.timeout = timeout
+        if url:
+            self.url = url
+
+    def fetch(self, base):
+        try:
+            response = requests.get(self.url, params={'base': base}, timeout=self.timeout)
+        except requests.exceptions.Timeout:
+            raise RateProviderTimeout('Currency conversion service timeout')
+        except requests.exceptions.RequestException:
+            raise RateProviderError('Currency conversion service unavailable')
+        return self.parse_response(response)
+
+    async def afetch(self, base):
+        """``fetch()`` without blocking the event loop."""
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.get(self.url, params={'base': base})
+        except httpx.TimeoutException:
+            raise RateProviderTimeout('Currency conversion service timeout')
+        except httpx.HTTPError:
+            raise RateProviderError('Currency conversion service unavailable')
+        return self.parse_response(response)
+
+    def parse_response(self, response):
+        if response.status_code != 200:
+            raise RateProviderError('Currency conversion service temporarily unavailable')
+        try:
+            data = response.json()
+        except ValueError:
+            raise RateProviderError('Currency conversion service returned invalid JSON')
+        if not isinstance(data, dict):
+            raise RateProviderError('Currency conversion service returned invalid JSON')
+        if data.get('success') is False or not data.get('rates'):
+            raise RateProviderError('Currency conversion service returned no rates')
+        return parse_rates(data['rates'])
+
+
+class StaticRateProvider:
+    """Serve a fixed rate table, for offline use, tests and benchmarks."""
+
+    def __init__(self, rates=None, base='USD'):
+        self.base = base
+        self.rates = parse_rates(rates or {})
+        self.rates[base] = Decimal('1')
+
+    def fetch(self, base):
+        if base not in self.rates:
+            raise RateProviderError(f'No rates for base currency {base}')
+        divisor = self.rates[base]
+        return {code: rate / divisor for code, rate in self.rates.items()}
+
+    async def afetch(self, base):
+        return self.fetch(base)
+
+
+def parse_rates(rates):
+    """``{code: Decimal}`` from a provider's rate mapping; every rate must be finite and positive"""
+    try:
+        parsed = {code.upper(): Decimal(str(rate)) for code, rate in rates.items()}
+    except (InvalidOperation, AttributeError):
+        raise RateProviderError('Currency conversion service returned invalid rates')
+    # A zero would divide by zero in cross_rate(), NaN and Infinity would poison every result
+    if not all(rate.is_finite() and rate > 0 for rate in parsed.values()):
+        raise RateProviderError('Currency conversion service returned invalid rates')
+    return parsed
+
+
+class RateTable(dict):
+    """A live rate table, remembering the day it was fetched."""
+
+    def __init__(self, rates, fetched_on):
+        super().__init__(rates)
+        self.fetched_on = fetched_on
+
+
+class RateCache:
+    """Base-currency rate table with a TTL and stale-while-revalidate refreshes."""
+
+    def __init__(self, provider, base='USD', ttl=3600, clock=time.monotonic):
+        self.provider = provider
+        self.base = base.upper()
+        self.ttl = ttl
+        self.clock = clock
+        self.refresh_thread = None
+        self.refresh_task = None
+        self._table = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def is_stale(self):
+        return self._fetched_at is None or self.clock() - self._fetched_at >= self.ttl
+
+    def refresh(self):
+        """Fetch a new table now; concurrent callers share one provider call."""
+        fetched_at = self._fetched_at
+        with self._fetch_lock:
+            # Someone else refreshed while we were waiting for the lock
+            if self._table is not None and self._fetched_at != fetched_at:
+                return self._table
+            table = RateTable(self.provider.fetch(self.base), date.today())
+            table[self.base] = Decimal('1')
+            with self._lock:
+                self._table = table
+                self._fetched_at = self.clock()
+            return table
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except RateProviderError:
+            # Keep serving the stale table; the next stale read schedules another attempt
+            pass
+        finally:
+            with self._lock:
+                self.refresh_thread = None
+
+    def get_table(self):
+        with self._lock:
+            table = self._table
+            if table is not None and self.is_stale() and self.refresh_thread is None:
+                self.refresh_thread = threading.Thread(target=self._refresh_in_background, daemon=True)
+                self.refresh_thread.start()
+        if table is None:
+            table = self.refresh()
+        return table
+
+    def get_rate(self, from_currency, to_currency):
+        """Cross rate ``to_currency`` per unit of ``from_currency``."""
+        if from_currency.upper() == to_currency.upper():
+            return Decimal('1')
+        return cross_rate(self.get_table(), from_currency, to_currency)
+
+    async def _afetch(self):
+        afetch = getattr(self.provider, 'afetch', None)
+        if afetch is not None:
+            table = RateTable(await afetch(self.base), date.today())
+        else:
+            table = RateTable(await sync_to_async(self.provider.fetch, thread_sensitive=False)(self.base), date.today())
+        table[self.base] = Decimal('1')
+        with self._lock:
+            self._table = table
+            self._fetched_at = self.clock()
+        return table
+
+    def _start_refresh_task(self):
+        # Every caller on this event loop awaits the same task, so one provider call per refresh
+        loop = asyncio.get_running_loop()
+        task = self.refresh_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = self.refresh_task = loop.create_task(self._afetch())
+            # Mark a failure as retrieved; a background refresh keeps the stale table
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def arefresh(self):
+        # Shielded so one cancelled request does not cancel the fetch for everyone else
+        return await asyncio.shield(self._start_refresh_task())
+
+    async def aget_table(self):
+        with self._lock:
+            table = self._table
+        if table is None:
+            return await self.arefresh()
+        if self.is_stale():
+            self._start_refresh_task()
+        return table
+
+    async def aget_rate(self, from_currency, to_currency):
+        if from_currency.upper() == to_currency.upper():
+            return Decimal('1')
+        return cross_rate(await self.aget_table(), from_currency, to_currency)
+
+
+def cross_rate(table, from_currency, to_currency):
+    try:
+        return table[to_currency.upper()] / table[from_currency.upper()]
+    except KeyError as exc:
+        raise UnknownCurrencyError(f'Unknown currency {exc.args[0]}')
+
+
+def pair_rates(table, pairs):
+    """Cross rate for each distinct ``(from, to)`` pair, each derived from the table once."""
+    return {
+        (from_currency, to_currency): Decimal('1') if from_currency == to_currency
+        else cross_rate(table, from_currency, to_currency)
+        for from_currency, to_currency in set(pairs)
+    }
+
+
+def quantize_amount(amount, currency, max_places=None):
+    """
+    Round ``amount`` to the minor unit of ``currency``, two places unless CURRENCY_EXPONENTS
+    says otherwise, and to no more than ``max_places`` when given.
+    """
+    exponent = CURRENCY_EXPONENTS.get(currency.upper(), DEFAULT_EXPONENT)
+    if max_places is not None:
+        exponent = min(exponent, max_places)
+    return amount.quantize(Decimal(1).scaleb(-exponent), rounding=ROUND_HALF_UP)
+
+
+class RateHistory:
+    """
+    Stored ``ExchangeRate`` rows against one base currency.
+
+    Lookups return the newest rate on or before a day. Answers, misses included, are kept
+    in an in-process LRU for ``HISTORY_CACHE_TTL`` seconds, so hot pairs skip the database.
+    Rows loaded by another process become visible here within that TTL.
+    """
+
+    def __init__(self, base='USD', cache=None):
+        self.base = base.upper()
+        self.cache = cache if cache is not None else LRUCache()
+        self._stored_table = None
+
+    def quote(self, currency, day):
+        """Units of ``currency`` per base unit on or before ``day``, or None."""
+        currency = currency.upper()
+        if currency == self.base:
+            return Decimal('1')
+        key = (currency, day)
+        rate = self.cache.get(key, MISSING)
+        if rate is MISSING:
+            rate = ExchangeRate.objects.filter(
+                base=self.base, quote=currency, date__lte=day
+            ).order_by('-date').values_list('rate', flat=True).first()
+            self.cache.set(key, rate)
+        return rate
+
+    def quotes(self, currencies, day):
+        return {currency.upper(): self.quote(currency, day) for currency in currencies}
+
+    def store(self, table, day):
+        """Save ``table`` as the ``day`` rates; rows already stored are kept."""
+        ExchangeRate.objects.bulk_create([
+            ExchangeRate(date=day, base=self.base, quote=code, rate=rate.quantize(RATE_PLACES))
+            for code, rate in table.items()
+            if code != self.base
+        ], ignore_conflicts=True)
+        # Cached misses may now have an answer
+        self.cache.clear()
+
+    def store_live(self, table):
+        """
+        ``store()`` a live table once, under the day it was fetched. A stale table served
+        while refreshes fail is history of that day, not of today.
+        """
+        if self._stored_table is not table:
+            self.store(table, getattr(table, 'fetched_on', None) or date.today())
+            self._stored_table = table
+
+
+def fill_missing(quotes, table, day):
+    """
+    Take the quotes the history lacked from a live ``table``; codes in neither are dropped
+    so ``cross_rate()`` reports them. Without a table any gap raises RateNotStoredError.
+    """
+    if table is None:
+        missing = sorted(code for code, rate in quotes.items() if rate is None)
+        if missing:
+            raise RateNotStoredError(f'No stored rate for {missing[0]} on or before {day.isoformat()}')
+        return quotes
+    return {
+        code: table.get(code) if rate is None else rate
+        for code, rate in quotes.items()
+        if rate is not None or code in table
+    }
+
+
+def may_go_live(day, fallback=None):
+    # Today's live rates only stand in for today and later, never for a past day
+    return day >= date.today() if fallback is None else fallback
+
+
+def historical_rate(from_currency, to_currency, day, fallback=None):
+    """
+    Cross rate ``to_currency`` per unit of ``from_currency`` as of ``day``.
+
+    Both currencies are looked up in the stored history. With ``fallback`` (by default
+    only when ``day`` is today or later), a currency that has no stored rate on or
+    before ``day`` takes its rate from the live table, which is then stored under the
+    date it was fetched; without it such a currency raises RateNotStoredError. Raises
+    UnknownCurrencyError, or RateProviderError when the live table is needed but cannot
+    be fetched.
+    """
+    if from_currency.upper() == to_currency.upper():
+        return Decimal('1')
+    fallback = may_go_live(day, fallback)
+    history = get_rate_history()
+    quotes = history.quotes((from_currency, to_currency), day)
+    table = None
+    if fallback and None in quotes.values():
+        table = get_rate_cache().get_table()
+        history.store_live(table)
+    return cross_rate(fill_missing(quotes, table, day), from_currency, to_currency)
+
+
+async def ahistorical_rate(from_currency, to_currency, day, fallback=None):
+    """``historical_rate()`` that fetches a missing live table on the event loop."""
+    if from_currency.upper() == to_currency.upper():
+        return Decimal('1')
+    fallback = may_go_live(day, fallback)
+    history = get_rate_history()
+    quotes = await sync_to_async(history.quotes)((from_currency, to_currency), day)
+    table = None
+    if fallback and None in quotes.values():
+        table = await get_rate_cache().aget_table()
+        await sync_to_async(history.store_live)(table)
+    return cross_rate(fill_missing(quotes, table, day), from_currency, to_currency)
+
+
+class HistoricalConverter:
+    """
+    Convert amounts into ``currency`` at the rate of their date, each (currency, date)
+    looked up once. Past dates use stored rates only, see ``historical_rate()``. Results
+    are rounded to at most STORED_PLACES, since they are saved as home amounts.
+    """
+
+    def __init__(self, currency):
+        self.currency = currency.upper()
+        self.rates = {}
+
+    def rate(self, from_currency, day):
+        key = (from_currency.upper(), day)
+        if key not in self.rates:
+            self.rates[key] = historical_rate(key[0], self.currency, day)
+        return self.rates[key]
+
+    def convert(self, amount, from_currency, day):
+        return quantize_amount(amount * self.rate(from_currency, day), self.currency, STORED_PLACES)
+
+
+_rate_cache = None
+_rate_history = None
+_rate_cache_lock = threading.Lock()
+
+
+def rate_config():
+    return {**DEFAULTS, **getattr(settings, 'EXCHANGE_RATES', {})}
+
+
+def get_rate_cache():
+    """The process-wide RateCache built from ``settings.EXCHANGE_RATES``."""
+    global _rate_cache
+    if _rate_cache is None:
+        with _rate_cache_lock:
+            if _rate_cache is None:
+                config = rate_config()
+                provider = import_string(config['PROVIDER'])(**config['OPTIONS'])
+                _rate_cache = RateCache(provider, base=config['BASE_CURRENCY'], ttl=config['TTL'])
+    return _rate_cache
+
+
+def get_rate_history():
+    """The process-wide RateHistory for ``EXCHANGE_RATES['BASE_CURRENCY']``."""
+    global _rate_history
+    if _rate_history is None:
+        with _rate_cache_lock:
+            if _rate_history is None:
+                config = rate_config()
+                cache = LRUCache(max_size=config['HISTORY_CACHE_SIZE'], ttl=config['HISTORY_CACHE_TTL'])
+                _rate_history = RateHistory(config['BASE_CURRENCY'], cache)
+    return _rate_history
+
+
+def reset_rate_cache():
+    global _rate_cache, _rate_history
+    _rate_cache = None
+    _rate_history = None
+
+
+@receiver(setting_changed)
+def _exchange_rates_changed(setting, **kwargs):
+    if setting == 'EXCHANGE_RATES':
+        reset_rate_cache()
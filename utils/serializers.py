@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from decimal import Decimal
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from utils.rates import RateProviderError, UnknownCurrencyError
+
+
+class ExchangeRatesUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'No stored exchange rate applies and the currency conversion service is unavailable.'
+    default_code = 'exchange_rates_unavailable'
+
+
+@contextmanager
+def conversion_errors(field='currency'):
+    """Report an unknown currency as a validation error on ``field`` and a provider outage as a 503"""
+    try:
+        yield
+    except UnknownCurrencyError as exc:
+        raise serializers.ValidationError({field: [f'{exc}.']})
+    except RateProviderError:
+        raise ExchangeRatesUnavailable()
+
+
+class CurrencyCodeField(serializers.CharField):
+    def __init__(self, **kwargs):
+        super().__init__(min_length=3, max_length=3, **kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data).upper()
+        if not value.isalpha():
+            raise serializers.ValidationError('Currency codes must be 3 letters (e.g., USD, KES).')
+        return value
+
+
+class ConversionItemSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=20, decimal_places=8, min_value=Decimal('0.00000001'))
+
+    def get_fields(self):
+        # "from" is a keyword, so the currency fields can't be declared as class attributes
+        fields = super().get_fields()
+        fields['from'] = CurrencyCodeField()
+        fields['to'] = CurrencyCodeField()
+        return fields
+
+
+class BatchConversionSerializer(serializers.Serializer):
+    conversions = ConversionItemSerializer(many=True, allow_empty=False, max_length=1000)
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class ProfilingTestRunner(DiscoverRunner):
+    """Run the suite with request profiling on, so a view over its query budget fails its tests."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.REQUEST_PROFILING = True
+        settings.QUERY_BUDGET_RAISE = True
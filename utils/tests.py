@@ -0,0 +1,629 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import httpx
+from asgiref.sync import async_to_sync
+from datetime import date
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+from unittest import mock
+from django.db import connection
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+from categories.models import Category
+from transactions.models import Transaction
+from transactions.views import TransactionExportView, TransactionListCreateView
+from users.authentication import user_cache
+from utils.database import database_config
+from utils.lru import LRUCache
+from utils.models import ExchangeRate
+from utils.periods import bucket_starts, month_bounds, parse_period, period_bounds, period_range_q, period_values
+from utils.profiling import QueryBudgetExceeded
+from utils.rates import (
+    ExchangeRateHostProvider, RateCache, RateHistory, RateNotStoredError, RateProviderError, RateProviderTimeout,
+    RateTable, StaticRateProvider, UnknownCurrencyError, cross_rate, get_rate_cache, get_rate_history, historical_rate,
+    reset_rate_cache
+)
+from utils.views import AsyncBatchCurrencyConversionView, AsyncCurrencyConversionView
+
+
+class PeriodHelperTests(SimpleTestCase):
+    def test_period_bounds_are_half_open(self):
+        self.assertEqual(period_bounds('2025-08'), (date(2025, 8, 1), date(2025, 9, 1)))
+        self.assertEqual(month_bounds(2024, 12), (date(2024, 12, 1), date(2025, 1, 1)))
+        self.assertEqual(month_bounds(9999, 12), (date(9999, 12, 1), None))
+        self.assertEqual(bucket_starts(date(9999, 12, 20), date.max, 'week')[-1], date(9999, 12, 27))
+
+    def test_parse_period_rejects_malformed_values(self):
+        self.assertEqual(parse_period('2025-02'), (2025, 2))
+        for value in ('2025-13', '2025-2', '202508', None, 'abcd-ef'):
+            with self.assertRaises(ValueError):
+                parse_period(value)
+
+    def test_month_only_filter_expands_to_one_range_per_year(self):
+        query = period_range_q(month=8, years=(2023, 2025))
+        self.assertEqual(query.connector, 'OR')
+        self.assertEqual([dict(child.children) for child in query.children], [
+            {'date__gte': date(year, 8, 1), 'date__lt': date(year, 9, 1)}
+            for year in (2023, 2024, 2025)
+        ])
+
+    def test_period_values(self):
+        self.assertEqual(period_values(8, 2025), ['2025-08'])
+        self.assertEqual(len(period_values(year=2025)), 12)
+        self.assertEqual(period_values(month=3, years=(2024, 2025)), ['2024-03', '2025-03'])
+        self.assertIsNone(period_values())
+
+
+class FakeRateProvider:
+    """Local provider that counts fetches and can be made to block or fail."""
+
+    def __init__(self, rates=None):
+        self.rates = rates or {'USD': '1', 'EUR': '0.5', 'KES': '130'}
+        self.calls = 0
+        self.fail = False
+        self.gate = None
+
+    def fetch(self, base):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise RateProviderError('provider down')
+        return StaticRateProvider(self.rates).fetch(base)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.provider = FakeRateProvider()
+        self.clock = FakeClock()
+        self.cache = RateCache(self.provider, base='USD', ttl=60, clock=self.clock)
+
+    def test_cross_rates_come_from_one_fetch(self):
+        self.assertEqual(self.cache.get_rate('usd', 'KES'), Decimal('130'))
+        self.assertEqual(self.cache.get_rate('EUR', 'KES'), Decimal('260'))
+        self.assertEqual(self.cache.get_rate('KES', 'EUR'), Decimal('0.5') / Decimal('130'))
+        self.assertEqual(self.provider.calls, 1)
+
+    def test_unknown_currency(self):
+        with self.assertRaises(UnknownCurrencyError):
+            self.cache.get_rate('USD', 'XYZ')
+
+    def test_stale_entry_is_served_while_one_background_refresh_runs(self):
+        self.cache.get_rate('USD', 'EUR')
+        self.provider.rates = {'USD': '1', 'EUR': '0.8'}
+        self.provider.gate = threading.Event()
+        self.clock.now = 61
+
+        # Both reads return immediately with the stale rate, only one refresh starts
+        self.assertEqual(self.cache.get_rate('USD', 'EUR'), Decimal('0.5'))
+        thread = self.cache.refresh_thread
+        self.assertEqual(self.cache.get_rate('USD', 'EUR'), Decimal('0.5'))
+        self.assertIs(self.cache.refresh_thread, thread)
+
+        self.provider.gate.set()
+        thread.join(5)
+        self.assertEqual(self.provider.calls, 2)
+        self.assertEqual(self.cache.get_rate('USD', 'EUR'), Decimal('0.8'))
+
+    def test_failed_background_refresh_keeps_stale_table(self):
+        self.cache.get_rate('USD', 'EUR')
+        self.provider.fail = True
+        self.clock.now = 61
+        self.assertEqual(self.cache.get_rate('USD', 'EUR'), Decimal('0.5'))
+        self.cache.refresh_thread.join(5)
+        self.assertEqual(self.cache.get_rate('USD', 'EUR'), Decimal('0.5'))
+
+    def test_cold_cache_failure_propagates(self):
+        self.provider.fail = True
+        with self.assertRaises(RateProviderError):
+            self.cache.get_rate('USD', 'EUR')
+
+    def test_malformed_provider_payloads_are_rejected(self):
+        provider = ExchangeRateHostProvider()
+        for payload in [
+            [1, 2], 'rates', {'rates': ['EUR', 0.5]},
+            {'rates': {'EUR': 0}}, {'rates': {'EUR': -0.5}}, {'rates': {'EUR': 'NaN'}}, {'rates': {'EUR': 'Infinity'}},
+        ]:
+            with self.assertRaises(RateProviderError, msg=payload):
+                provider.parse_response(httpx.Response(200, json=payload))
+        self.assertEqual(provider.parse_response(httpx.Response(200, json={'rates': {'eur': 0.5}})), {'EUR': Decimal('0.5')})
+        with self.assertRaises(RateProviderError):
+            StaticRateProvider({'EUR': '0'})
+
+
+class FakeRateServer:
+    """exchangerate.host look-alike on localhost that counts requests and can be slowed down."""
+
+    def __init__(self, rates=None, delay=0.0):
+        self.rates = rates or {'USD': 1, 'EUR': 0.5, 'KES': 130}
+        self.delay = delay
+        self.status = 200
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.delay)
+                body = json.dumps({'success': True, 'rates': server.rates}).encode()
+                try:
+                    self.send_response(server.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client timed out first
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/latest'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class AsyncRateCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeRateServer(delay=0.2)
+        self.addCleanup(self.server.close)
+        self.clock = FakeClock()
+        self.cache = RateCache(ExchangeRateHostProvider(timeout=5, url=self.server.url), ttl=60, clock=self.clock)
+
+    async def test_concurrent_cold_reads_share_one_request(self):
+        rates = await asyncio.gather(*[self.cache.aget_rate('EUR', 'KES') for _ in range(200)])
+        self.assertEqual(set(rates), {Decimal('260')})
+        self.assertEqual(self.server.requests, 1)
+
+    async def test_stale_table_is_served_while_a_task_refreshes(self):
+        await self.cache.aget_rate('USD', 'EUR')
+        self.server.rates = {'USD': 1, 'EUR': 0.8}
+        self.clock.now = 61
+        self.assertEqual(await self.cache.aget_rate('USD', 'EUR'), Decimal('0.5'))
+        await self.cache.refresh_task
+        self.assertEqual(await self.cache.aget_rate('USD', 'EUR'), Decimal('0.8'))
+        self.assertEqual(self.server.requests, 2)
+
+    async def test_provider_errors(self):
+        self.server.status = 500
+        with self.assertRaises(RateProviderError):
+            await self.cache.aget_rate('USD', 'EUR')
+        self.server.status, self.server.delay = 200, 1
+        self.cache.provider.timeout = 0.1
+        with self.assertRaises(RateProviderTimeout):
+            await self.cache.aget_rate('USD', 'EUR')
+
+
+class AsyncCurrencyConversionTests(TestCase):
+    def setUp(self):
+        self.server = FakeRateServer(delay=0.5)
+        self.addCleanup(self.server.close)
+        override = override_settings(EXCHANGE_RATES={
+            'PROVIDER': 'utils.rates.ExchangeRateHostProvider',
+            'OPTIONS': {'url': self.server.url, 'timeout': 5},
+            'BASE_CURRENCY': 'USD',
+            'TTL': 3600,
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        reset_rate_cache()
+        self.view = AsyncCurrencyConversionView.as_view()
+
+    async def convert(self, **params):
+        request = AsyncRequestFactory().get('/api/convert/', params)
+        force_authenticate(request, user=User(pk=1, username='rateuser'))
+        response = await self.view(request)
+        response.render()
+        return response.status_code, json.loads(response.content)
+
+    async def test_slow_provider_does_not_serialize_requests(self):
+        # Hundreds of conversions against a cold cache wait on one 0.5s upstream call together
+        start = time.perf_counter()
+        results = await asyncio.gather(*[self.convert(amount=100, **{'from': 'USD', 'to': 'KES'}) for _ in range(300)])
+        elapsed = time.perf_counter() - start
+        self.assertEqual({status_code for status_code, _ in results}, {200})
+        self.assertEqual(results[0][1]['converted_amount'], 13000)
+        self.assertEqual(self.server.requests, 1)
+        self.assertLess(elapsed, 5)
+
+    async def test_errors_match_the_sync_view(self):
+        self.assertEqual((await self.convert(amount=-1, **{'from': 'USD', 'to': 'EUR'}))[0], 400)
+        self.server.status = 502
+        self.assertEqual((await self.convert(amount=1, **{'from': 'USD', 'to': 'EUR'}))[0], 503)
+        self.server.status = 200
+        reset_rate_cache()
+        self.assertEqual((await self.convert(amount=1, **{'from': 'USD', 'to': 'ABC'}))[0], 400)
+        self.assertEqual((await self.convert(amount=1, date='2020-01-01', **{'from': 'USD', 'to': 'EUR'}))[0], 404)
+
+
+@override_settings(EXCHANGE_RATES={
+    'PROVIDER': 'utils.tests.FakeRateProvider',
+    'OPTIONS': {},
+    'BASE_CURRENCY': 'USD',
+    'TTL': 3600,
+})
+class CurrencyConversionCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='rateuser', password='ratepass')
+        self.client.force_authenticate(user=self.user)
+        reset_rate_cache()
+
+    def test_conversions_share_one_provider_fetch(self):
+        response = self.client.get('/api/convert/', {'amount': 100, 'from': 'USD', 'to': 'KES'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['converted_amount'], 13000)
+        self.assertEqual(response.json()['rate'], 130)
+        response = self.client.get('/api/convert/', {'amount': 10, 'from': 'EUR', 'to': 'KES'})
+        self.assertEqual(response.json()['converted_amount'], 2600)
+        self.assertEqual(get_rate_cache().provider.calls, 1)
+
+    def test_unknown_currency_is_bad_request(self):
+        response = self.client.get('/api/convert/', {'amount': 10, 'from': 'USD', 'to': 'ABC'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_provider_outage_is_service_unavailable(self):
+        get_rate_cache().provider.fail = True
+        response = self.client.get('/api/convert/', {'amount': 10, 'from': 'USD', 'to': 'EUR'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@override_settings(EXCHANGE_RATES={
+    'PROVIDER': 'utils.tests.FakeRateProvider',
+    'OPTIONS': {'rates': {'USD': '1', 'EUR': '0.9', 'JPY': '149', 'KWD': '0.307', 'KES': '129.5'}},
+    'BASE_CURRENCY': 'USD',
+    'TTL': 3600,
+})
+class BatchCurrencyConversionTests(TestCase):
+    url = '/api/convert/batch/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='batchrates', password='ratepass')
+        self.client.force_authenticate(user=self.user)
+        reset_rate_cache()
+
+    def test_results_are_exact_and_in_input_order(self):
+        conversions = [
+            {'amount': '100', 'from': 'usd', 'to': 'KES'},
+            {'amount': '1000', 'from': 'JPY', 'to': 'EUR'},
+            {'amount': '19.99', 'from': 'EUR', 'to': 'JPY'},
+            {'amount': '10', 'from': 'USD', 'to': 'KWD'},
+            {'amount': '0.10', 'from': 'USD', 'to': 'KES'},
+            {'amount': '7.5', 'from': 'XTS', 'to': 'XTS'},
+        ]
+        response = self.client.post(self.url, {'conversions': conversions}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], [
+            {'amount': '100', 'from': 'USD', 'to': 'KES', 'converted_amount': '12950.00', 'rate': '129.5'},
+            {'amount': '1000', 'from': 'JPY', 'to': 'EUR', 'converted_amount': '6.04', 'rate': '0.0060402685'},
+            {'amount': '19.99', 'from': 'EUR', 'to': 'JPY', 'converted_amount': '3309', 'rate': '165.5555555556'},
+            {'amount': '10', 'from': 'USD', 'to': 'KWD', 'converted_amount': '3.070', 'rate': '0.307'},
+            {'amount': '0.1', 'from': 'USD', 'to': 'KES', 'converted_amount': '12.95', 'rate': '129.5'},
+            {'amount': '7.5', 'from': 'XTS', 'to': 'XTS', 'converted_amount': '7.50', 'rate': '1'},
+        ])
+        self.assertEqual(get_rate_cache().provider.calls, 1)
+
+    def test_distinct_pairs_are_resolved_once(self):
+        conversions = [{'amount': '1', 'from': 'USD', 'to': 'EUR'}] * 500 + [{'amount': '1', 'from': 'EUR', 'to': 'USD'}]
+        with mock.patch('utils.rates.cross_rate', wraps=cross_rate) as rates:
+            response = self.client.post(self.url, {'conversions': conversions}, format='json')
+        self.assertEqual(len(response.json()['results']), 501)
+        self.assertEqual(rates.call_count, 2)
+
+    def test_row_errors_are_keyed_by_index(self):
+        response = self.client.post(self.url, {'conversions': [
+            {'amount': '1', 'from': 'USD', 'to': 'EUR'},
+            {'amount': '-1', 'from': 'USD', 'to': 'EUR'},
+            {'amount': '1', 'from': 'US', 'to': 'EUR'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.json()['conversions']), {'1', '2'})
+
+        response = self.client.post(self.url, {'conversions': [
+            {'amount': '1', 'from': 'USD', 'to': 'EUR'},
+            {'amount': '1', 'from': 'ABC', 'to': 'EUR'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['conversions'], {'1': {'non_field_errors': ['Unknown currency ABC.']}})
+
+        response = self.client.post(self.url, {'conversions': [{'amount': '1', 'from': 'USD', 'to': 'EUR'}] * 1001}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_provider_outage_is_service_unavailable(self):
+        get_rate_cache().provider.fail = True
+        response = self.client.post(self.url, {'conversions': [{'amount': '1', 'from': 'USD', 'to': 'EUR'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_async_view_matches(self):
+        payload = {'conversions': [{'amount': '12.34', 'from': 'EUR', 'to': 'KWD'}, {'amount': '5', 'from': 'KES', 'to': 'JPY'}]}
+        expected = self.client.post(self.url, payload, format='json').json()
+        request = AsyncRequestFactory().post(self.url, json.dumps(payload), content_type='application/json')
+        force_authenticate(request, user=self.user)
+        response = async_to_sync(AsyncBatchCurrencyConversionView.as_view())(request)
+        response.render()
+        self.assertEqual(json.loads(response.content), expected)
+
+
+class RateHistoryTests(TestCase):
+    def setUp(self):
+        ExchangeRate.objects.bulk_create([
+            ExchangeRate(date=date(2025, 1, 1), base='USD', quote='EUR', rate=Decimal('0.8')),
+            ExchangeRate(date=date(2025, 3, 1), base='USD', quote='EUR', rate=Decimal('0.9')),
+            ExchangeRate(date=date(2025, 3, 1), base='EUR', quote='KES', rate=Decimal('140')),
+        ])
+        self.history = RateHistory('USD', LRUCache(max_size=10, ttl=60))
+
+    def test_newest_rate_on_or_before_the_day(self):
+        self.assertEqual(self.history.quote('eur', date(2025, 2, 28)), Decimal('0.8'))
+        self.assertEqual(self.history.quote('EUR', date(2025, 3, 1)), Decimal('0.9'))
+        self.assertIsNone(self.history.quote('EUR', date(2024, 12, 31)))
+        # Only rows against the history's own base count
+        self.assertIsNone(self.history.quote('KES', date(2025, 3, 1)))
+        self.assertEqual(self.history.quote('USD', date(2000, 1, 1)), Decimal('1'))
+
+    def test_lookups_and_misses_are_cached_until_new_rates_are_stored(self):
+        self.history.quotes(['EUR', 'KES'], date(2025, 3, 5))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.history.quotes(['EUR', 'KES'], date(2025, 3, 5)), {'EUR': Decimal('0.9'), 'KES': None})
+        self.history.store({'USD': Decimal('1'), 'KES': Decimal('129.5')}, date(2025, 3, 2))
+        self.assertEqual(self.history.quote('KES', date(2025, 3, 5)), Decimal('129.5'))
+
+    def test_live_tables_are_stored_once_under_their_fetch_date(self):
+        table = RateTable({'USD': Decimal('1'), 'JPY': Decimal('149')}, date(2025, 3, 4))
+        self.history.store_live(table)
+        with self.assertNumQueries(0):
+            self.history.store_live(table)
+        # A stale table served after failed refreshes is not today's history
+        self.assertEqual(ExchangeRate.objects.get(quote='JPY').date, date(2025, 3, 4))
+
+    def test_rate_cache_dates_its_tables(self):
+        cache = RateCache(FakeRateProvider(), ttl=60, clock=FakeClock())
+        self.assertEqual(cache.get_table().fetched_on, date.today())
+
+    @override_settings(EXCHANGE_RATES={'PROVIDER': 'utils.tests.FakeRateProvider', 'OPTIONS': {}})
+    def test_historical_rate_without_fallback_never_goes_live(self):
+        reset_rate_cache()
+        self.assertEqual(historical_rate('EUR', 'USD', date(2025, 3, 1), fallback=False), Decimal('1') / Decimal('0.9'))
+        with self.assertRaises(RateNotStoredError):
+            historical_rate('USD', 'KES', date(2025, 3, 1), fallback=False)
+        self.assertEqual(get_rate_cache().provider.calls, 0)
+
+
+class LoadExchangeRatesCommandTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        reset_rate_cache()
+
+    def _write(self, name, content):
+        path = Path(self.directory.name) / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def _load(self, *paths, **options):
+        out, err = StringIO(), StringIO()
+        call_command('load_exchange_rates', *paths, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_loads_csv_json_tables_and_json_lines(self):
+        csv_path = self._write('rates.csv', 'date,quote,rate\n2025-01-02,EUR,0.91\n2025-01-02,KES,129.1\n2025-01-03,EUR,bad\n')
+        json_path = self._write('latest.json', json.dumps({'base': 'USD', 'date': '2025-01-03', 'rates': {'EUR': 0.92, 'JPY': 157}}))
+        series_path = self._write('series.json', json.dumps({
+            'base': 'USD', 'rates': {'2025-01-04': {'EUR': 0.93}, '2025-01-05': {'EUR': 0.94}}
+        }))
+        lines_path = self._write('rates.jsonl', '{"date": "2025-01-06", "base": "usd", "currency": "EUR", "rate": "0.95"}\n\nnot json\n')
+        out, err = self._load(csv_path, json_path, series_path, lines_path, batch_size=2)
+        self.assertIn('Read 7 rates (7 new), skipped 2 invalid records.', out)
+        self.assertIn('rates.csv record 3', err)
+        self.assertIn('rates.jsonl record 2', err)
+        self.assertEqual(
+            list(ExchangeRate.objects.filter(quote='EUR').order_by('date').values_list('rate', flat=True)),
+            [Decimal('0.91'), Decimal('0.92'), Decimal('0.93'), Decimal('0.94'), Decimal('0.95')]
+        )
+
+    def test_reloading_keeps_stored_rates(self):
+        path = self._write('rates.csv', 'date,base,quote,rate\n2025-01-02,USD,EUR,0.91\n2025-01-02,EUR,KES,140\n')
+        self._load(path)
+        update = self._write('update.csv', 'date,base,quote,rate\n2025-01-02,USD,EUR,0.5\n2025-01-03,USD,EUR,0.92\n')
+        out, err = self._load(path, update)
+        self.assertIn('Read 4 rates (1 new)', out)
+        self.assertIn('Rates against EUR are stored but conversions only read base USD.', err)
+        self.assertEqual(ExchangeRate.objects.get(quote='EUR', date=date(2025, 1, 2)).rate, Decimal('0.91'))
+
+    def test_clears_cached_misses(self):
+        self.assertIsNone(get_rate_history().quote('EUR', date(2025, 1, 5)))
+        self._load(self._write('rates.csv', 'date,quote,rate\n2025-01-02,EUR,0.91\n'))
+        self.assertEqual(get_rate_history().quote('EUR', date(2025, 1, 5)), Decimal('0.91'))
+
+    def test_unreadable_input(self):
+        with self.assertRaises(CommandError):
+            self._load(self._write('rates.xml', '<rates/>'))
+        with self.assertRaises(CommandError):
+            self._load(self._write('rates.json', '{'))
+        with self.assertRaises(CommandError):
+            self._load(str(Path(self.directory.name) / 'missing.csv'))
+
+
+@override_settings(EXCHANGE_RATES={
+    'PROVIDER': 'utils.tests.FakeRateProvider',
+    'OPTIONS': {},
+    'BASE_CURRENCY': 'USD',
+    'TTL': 3600,
+})
+class OfflineCurrencyConversionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='offline', password='ratepass')
+        self.client.force_authenticate(user=self.user)
+        reset_rate_cache()
+        # Any provider call would fail, as with no network at all
+        get_rate_cache().provider.fail = True
+        ExchangeRate.objects.bulk_create([
+            ExchangeRate(date=date(2024, 6, 3), base='USD', quote='EUR', rate=Decimal('0.8')),
+            ExchangeRate(date=date(2024, 6, 3), base='USD', quote='KES', rate=Decimal('128')),
+            ExchangeRate(date=date(2025, 1, 2), base='USD', quote='EUR', rate=Decimal('0.5')),
+            ExchangeRate(date=date(2025, 1, 2), base='USD', quote='KES', rate=Decimal('130')),
+        ])
+
+    def convert(self, **params):
+        return self.client.get('/api/convert/', {'amount': 10, 'from': 'EUR', 'to': 'KES', **params})
+
+    def test_converts_from_stored_rates_without_the_provider(self):
+        response = self.convert(date='2024-12-31')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'amount': 10.0, 'from': 'EUR', 'to': 'KES', 'converted_amount': 1600.0, 'rate': 160.0, 'date': '2024-12-31'
+        })
+        response = self.convert()
+        self.assertEqual((response.json()['converted_amount'], response.json()['date']), (2600.0, date.today().isoformat()))
+        self.assertEqual(get_rate_cache().provider.calls, 0)
+
+    def test_hot_pairs_skip_the_database(self):
+        self.convert(date='2025-02-01')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.convert(date='2025-02-01').status_code, status.HTTP_200_OK)
+
+    def test_dates_before_the_history_and_invalid_dates(self):
+        response = self.convert(date='2024-06-02')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json()['error'], 'No stored rate for EUR on or before 2024-06-02')
+        self.assertEqual(self.convert(date='02/01/2025').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(get_rate_cache().provider.calls, 0)
+        # Only today's conversions may fall back to the live table
+        self.assertEqual(self.convert(to='JPY').status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_async_view_matches(self):
+        expected = self.convert(date='2024-12-31').json()
+        request = AsyncRequestFactory().get('/api/convert/', {'amount': 10, 'from': 'EUR', 'to': 'KES', 'date': '2024-12-31'})
+        force_authenticate(request, user=self.user)
+        response = async_to_sync(AsyncCurrencyConversionView.as_view())(request)
+        response.render()
+        self.assertEqual(json.loads(response.content), expected)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='profileuser', password='profilepass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Food', type='expense', user=self.user)
+        Transaction.objects.create(user=self.user, category=category, amount=10, date=date(2025, 8, 1))
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs('finwell.profiling', level='INFO') as logs:
+            response = self.client.get('/api/transactions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(metrics), {'db', 'serializer', 'view'})
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'TransactionListCreateView')
+        self.assertEqual(record['queries'], 2)
+        self.assertIn(f'desc="{record["queries"]} queries"', metrics['db'])
+        self.assertGreater(record['serializer_ms'], 0)
+        self.assertGreaterEqual(record['view_ms'], record['db_ms'])
+
+    def test_query_budget(self):
+        with mock.patch.object(TransactionListCreateView, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/transactions/')
+            with override_settings(QUERY_BUDGET_RAISE=False), self.assertLogs('finwell.profiling', 'WARNING') as logs:
+                response = self.client.get('/api/transactions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ran 2 queries, over the TransactionListCreateView budget of 1', logs.output[0])
+
+    def test_streamed_responses_are_counted_once_consumed(self):
+        with self.assertLogs('finwell.profiling', level='INFO') as logs:
+            response = self.client.get('/api/transactions/export/')
+            self.assertEqual(logs.records, [])
+            b''.join(response.streaming_content)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['view'], record['queries']), ('TransactionExportView', 1))
+        with mock.patch.object(TransactionExportView, 'query_budget', 0):
+            response = self.client.get('/api/transactions/export/')
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+    async def test_asgi_requests_are_profiled(self):
+        user_cache.clear()
+        token = AccessToken.for_user(self.user)
+        with self.assertLogs('finwell.profiling', level='INFO') as logs:
+            response = await self.async_client.get('/api/transactions/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Server-Timing', response)
+        # The JWT user lookup plus the two list queries
+        self.assertEqual(json.loads(logs.records[-1].getMessage())['queries'], 3)
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled(self):
+        response = self.client.get('/api/transactions/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    def test_sqlite_is_the_default(self):
+        config = database_config({}, Path('/srv/finwell'))
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], Path('/srv/finwell/db.sqlite3'))
+        self.assertEqual(config['OPTIONS'], {'transaction_mode': 'IMMEDIATE'})
+
+    def test_postgresql_keeps_health_checked_connections(self):
+        config = database_config({
+            'DATABASE_ENGINE': 'postgresql',
+            'DATABASE_NAME': 'finwell_prod',
+            'DATABASE_HOST': 'db',
+            'DATABASE_CONN_MAX_AGE': '300',
+        }, Path('.'))
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['NAME'], config['HOST'], config['PORT']), ('finwell_prod', 'db', '5432'))
+        self.assertEqual(config['CONN_MAX_AGE'], 300)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', config['OPTIONS'])
+
+    def test_pool_replaces_persistent_connections(self):
+        config = database_config({
+            'DATABASE_ENGINE': 'postgres',
+            'DATABASE_POOL': 'true',
+            'DATABASE_POOL_MAX_SIZE': '20',
+            'DATABASE_CONN_HEALTH_CHECKS': 'off',
+        }, Path('.'))
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20})
+        self.assertFalse(config['CONN_HEALTH_CHECKS'])
+
+
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
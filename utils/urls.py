@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_VIEWS:
+    ConversionView, BatchConversionView = views.AsyncCurrencyConversionView, views.AsyncBatchCurrencyConversionView
+else:
+    ConversionView, BatchConversionView = views.CurrencyConversionView, views.BatchCurrencyConversionView
+
 urlpatterns = [
-    path('convert/', views.CurrencyConversionView.as_view(), name='currency-convert'),
+    path('convert/', ConversionView.as_view(), name='currency-convert'),
+    path('convert/batch/', BatchConversionView.as_view(), name='currency-convert-batch'),
 ]
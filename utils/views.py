@@ -2,59 +2,111 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-import requests
-from drf_spectacular.utils import extend_schema, OpenApiParameter
+from datetime import date
+from decimal import Decimal
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from drf_spectacular.types import OpenApiTypes
+from utils.async_views import AsyncAPIView
+from utils.rates import (
+    RATE_PLACES, RateNotStoredError, RateProviderError, RateProviderTimeout, UnknownCurrencyError,
+    ahistorical_rate, get_rate_cache, historical_rate, pair_rates, quantize_amount
+)
+from utils.serializers import BatchConversionSerializer
+
+
+conversion_schema = extend_schema(
+    summary="Convert currency",
+    description="Convert an amount from one currency to another at the newest stored exchange rate on or before `date` (default today). Rates come from the local rate history, so no network access is needed once it is loaded. Only today's conversions fall back to the live rate service for currencies the history lacks.",
+    parameters=[
+        OpenApiParameter(
+            name='amount',
+            type=OpenApiTypes.FLOAT,
+            location=OpenApiParameter.QUERY,
+            required=True,
+            description='Amount to convert'
+        ),
+        OpenApiParameter(
+            name='from',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            required=True,
+            description='Source currency code (e.g., USD)'
+        ),
+        OpenApiParameter(
+            name='to',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            required=True,
+            description='Target currency code (e.g., KES)'
+        ),
+        OpenApiParameter(
+            name='date',
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.QUERY,
+            required=False,
+            description='Convert at the rate of this day (YYYY-MM-DD), default today'
+        ),
+    ],
+    responses={
+        200: {
+            "example": {
+                "amount": 100,
+                "from": "USD",
+                "to": "KES",
+                "converted_amount": 13000,
+                "rate": 130,
+                "date": "2025-08-24"
+            }
+        },
+        400: {"description": "Bad request - missing or invalid parameters"},
+        401: {"description": "Authentication required"},
+        404: {"description": "No stored rate on or before the requested date"},
+        503: {"description": "Currency conversion service unavailable"}
+    }
+)
+
+
+def provider_error_response(exc):
+    if isinstance(exc, RateNotStoredError):
+        return Response({'error': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+    if isinstance(exc, UnknownCurrencyError):
+        return Response({
+            'error': 'Invalid currency codes or conversion failed'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if isinstance(exc, RateProviderTimeout):
+        return Response({
+            'error': 'Currency conversion service timeout'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response({
+        'error': 'Currency conversion service unavailable'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
 
 class CurrencyConversionView(APIView):
     permission_classes = [IsAuthenticated]
+    # Two rate-history lookups and, on a cold day, storing the live table
+    query_budget = 3
 
-    @extend_schema(
-        summary="Convert currency",
-        description="Convert an amount from one currency to another using live exchange rates.",
-        parameters=[
-            OpenApiParameter(
-                name='amount',
-                type=OpenApiTypes.FLOAT,
-                location=OpenApiParameter.QUERY,
-                required=True,
-                description='Amount to convert'
-            ),
-            OpenApiParameter(
-                name='from',
-                type=OpenApiTypes.STR,
-                location=OpenApiParameter.QUERY,
-                required=True,
-                description='Source currency code (e.g., USD)'
-            ),
-            OpenApiParameter(
-                name='to',
-                type=OpenApiTypes.STR,
-                location=OpenApiParameter.QUERY,
-                required=True,
-                description='Target currency code (e.g., KES)'
-            ),
-        ],
-        responses={
-            200: {
-                "example": {
-                    "amount": 100,
-                    "from": "USD",
-                    "to": "KES",
-                    "converted_amount": 13000,
-                    "rate": 130
-                }
-            },
-            400: {"description": "Bad request - missing or invalid parameters"},
-            401: {"description": "Authentication required"},
-            503: {"description": "Currency conversion service unavailable"}
-        }
-    )
+    @conversion_schema
     def get(self, request):
-        # Get query parameters
+        params = self.parse_params(request)
+        if isinstance(params, Response):
+            return params
+        amount, from_currency, to_currency, day = params
+
+        try:
+            # Served from the stored history, hot pairs from its LRU; only today's rates may go live
+            rate = historical_rate(from_currency, to_currency, day)
+        except (RateProviderError, UnknownCurrencyError) as exc:
+            return provider_error_response(exc)
+        return self.conversion(amount, from_currency, to_currency, rate, day)
+
+    def parse_params(self, request):
+        """``(amount, from, to, date)`` from the query string, or a 400 response."""
         amount = request.query_params.get('amount')
         from_currency = request.query_params.get('from')
         to_currency = request.query_params.get('to')
+        day = request.query_params.get('date')
 
         # Validate parameters
         if not all([amount, from_currency, to_currency]):
@@ -80,45 +132,130 @@ class CurrencyConversionView(APIView):
                 'error': 'Currency codes must be 3 letters (e.g., USD, KES)'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # If same currency, return as-is
-        if from_currency.upper() == to_currency.upper():
+        try:
+            day = date.fromisoformat(day) if day else date.today()
+        except ValueError:
+            return Response({
+                'error': 'Date must be in YYYY-MM-DD format'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return amount, from_currency.upper(), to_currency.upper(), day
+
+    def conversion(self, amount, from_currency, to_currency, rate, day):
+        if from_currency == to_currency:
+            # Same currency, return as-is
             return Response({
                 'amount': amount,
-                'from': from_currency.upper(),
-                'to': to_currency.upper(),
+                'from': from_currency,
+                'to': to_currency,
                 'converted_amount': amount,
-                'rate': 1.0
+                'rate': 1.0,
+                'date': day.isoformat()
             })
+        return Response({
+            'amount': amount,
+            'from': from_currency,
+            'to': to_currency,
+            'converted_amount': float(Decimal(str(amount)) * rate),
+            'rate': float(rate),
+            'date': day.isoformat()
+        })
+
+
+class AsyncCurrencyConversionView(CurrencyConversionView, AsyncAPIView):
+    """
+    ``CurrencyConversionView`` for ASGI deployments.
+
+    When the history lacks a rate, the live table is fetched with httpx on the event
+    loop, so a slow provider holds no worker thread and concurrent requests share the
+    one fetch.
+    """
+
+    @conversion_schema
+    async def get(self, request):
+        params = self.parse_params(request)
+        if isinstance(params, Response):
+            return params
+        amount, from_currency, to_currency, day = params
 
         try:
-            # Use exchangerate.host API (free)
-            api_url = f"https://api.exchangerate.host/convert?from={from_currency}&to={to_currency}&amount={amount}"
-            response = requests.get(api_url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    return Response({
-                        'amount': amount,
-                        'from': from_currency.upper(),
-                        'to': to_currency.upper(),
-                        'converted_amount': data.get('result'),
-                        'rate': data.get('info', {}).get('rate')
-                    })
-                else:
-                    return Response({
-                        'error': 'Invalid currency codes or conversion failed'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                return Response({
-                    'error': 'Currency conversion service temporarily unavailable'
-                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-
-        except requests.exceptions.Timeout:
-            return Response({
-                'error': 'Currency conversion service timeout'
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        except requests.exceptions.RequestException:
-            return Response({
-                'error': 'Currency conversion service unavailable'
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            rate = await ahistorical_rate(from_currency, to_currency, day)
+        except (RateProviderError, UnknownCurrencyError) as exc:
+            return provider_error_response(exc)
+        return self.conversion(amount, from_currency, to_currency, rate, day)
+
+
+batch_conversion_schema = extend_schema(
+    summary="Convert currencies in bulk",
+    description=(
+        "Convert up to 1000 amounts in one request, results come back in input order. Every "
+        "distinct currency pair is resolved once against the same cached rate table. Amounts "
+        "are exact decimals rounded to the target currency's minor unit and returned as strings."
+    ),
+    request=BatchConversionSerializer,
+    responses={
+        200: {
+            "example": {
+                "results": [
+                    {"amount": "100", "from": "USD", "to": "KES", "converted_amount": "13000.00", "rate": "130"},
+                    {"amount": "5000", "from": "JPY", "to": "USD", "converted_amount": "33.56", "rate": "0.0067114094"}
+                ]
+            }
+        },
+        400: OpenApiResponse(description="Bad request - per-row validation errors or unknown currencies"),
+        401: OpenApiResponse(description="Authentication required"),
+        503: OpenApiResponse(description="Currency conversion service unavailable")
+    }
+)
+
+
+class BatchCurrencyConversionView(APIView):
+    permission_classes = [IsAuthenticated]
+    query_budget = 1
+
+    @batch_conversion_schema
+    def post(self, request):
+        serializer = BatchConversionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            table = get_rate_cache().get_table()
+        except RateProviderError as exc:
+            return provider_error_response(exc)
+        return batch_conversion(serializer.validated_data['conversions'], table)
+
+
+class AsyncBatchCurrencyConversionView(BatchCurrencyConversionView, AsyncAPIView):
+    """``BatchCurrencyConversionView`` for ASGI deployments."""
+
+    @batch_conversion_schema
+    async def post(self, request):
+        serializer = BatchConversionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            table = await get_rate_cache().aget_table()
+        except RateProviderError as exc:
+            return provider_error_response(exc)
+        return batch_conversion(serializer.validated_data['conversions'], table)
+
+
+def batch_conversion(items, table):
+    # Keyed by row index, like DRF's own errors for nested lists
+    errors = {}
+    for index, item in enumerate(items):
+        unknown = [code for code in (item['from'], item['to']) if code not in table]
+        if unknown and item['from'] != item['to']:
+            errors[index] = {'non_field_errors': [f"Unknown currency {', '.join(unknown)}."]}
+    if errors:
+        return Response({'conversions': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    rates = pair_rates(table, [(item['from'], item['to']) for item in items])
+    results = []
+    for item in items:
+        rate = rates[(item['from'], item['to'])]
+        results.append({
+            'amount': format(item['amount'].normalize(), 'f'),
+            'from': item['from'],
+            'to': item['to'],
+            'converted_amount': format(quantize_amount(item['amount'] * rate, item['to']), 'f'),
+            'rate': format(rate.quantize(RATE_PLACES).normalize(), 'f'),
+        })
+    return Response({'results': results})